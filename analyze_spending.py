@@ -1,5 +1,6 @@
 import pandas as pd
 import openpyxl
+import monthly_cube
 
 # Load Excel file
 wb = openpyxl.load_workbook(
@@ -24,8 +25,9 @@ for row in ws.iter_rows(min_row=3, values_only=True):
         })
 
 df = pd.DataFrame(data)
-df_filtered = df[df['Flow_Filter'] == 1].copy()
-expense = df_filtered[df_filtered['구분'] == '지출'].copy()
+
+# Monthly aggregate cube: every total below is read from it
+expense_cube = monthly_cube.slice_cube(monthly_cube.build_cube(df), types=['지출'], active=True)
 
 # Create analysis report
 with open(r'c:\Users\JTC7\Desktop\01.Python Project\01.Personal Expense Tracker\지출분석_보고서.txt', 'w', encoding='utf-8') as f:
@@ -33,16 +35,17 @@ with open(r'c:\Users\JTC7\Desktop\01.Python Project\01.Personal Expense Tracker\
     f.write("📊 지출 분석 보고서 (Flow_Filter = 1)\n")
     f.write("=" * 80 + "\n\n")
     
-    f.write(f"총 지출 금액: {expense['금액'].sum():,.0f}원\n")
-    f.write(f"거래 건수: {len(expense)}건\n\n")
+    f.write(f"총 지출 금액: {expense_cube['금액'].sum():,.0f}원\n")
+    f.write(f"거래 건수: {expense_cube['건수'].sum()}건\n\n")
     
     # Category analysis
     f.write("=" * 80 + "\n")
     f.write("🔥 대분류별 지출 (높은 순)\n")
     f.write("=" * 80 + "\n")
-    cat_sum = expense.groupby('대분류')['금액'].sum().sort_values(ascending=False)
-    cat_count = expense.groupby('대분류').size()
-    total_expense = expense['금액'].sum()
+    cat_totals = expense_cube.groupby('대분류')[['금액', '건수']].sum()
+    cat_sum = cat_totals['금액'].sort_values(ascending=False)
+    cat_count = cat_totals['건수']
+    total_expense = expense_cube['금액'].sum()
     
     for idx, (cat_name, amt) in enumerate(cat_sum.items(), 1):
         pct = (amt / total_expense * 100) if total_expense > 0 else 0
@@ -54,8 +57,9 @@ with open(r'c:\Users\JTC7\Desktop\01.Python Project\01.Personal Expense Tracker\
     f.write("\n" + "=" * 80 + "\n")
     f.write("📝 소분류별 지출 Top 20\n")
     f.write("=" * 80 + "\n")
-    sub_sum = expense.groupby('소분류')['금액'].sum().sort_values(ascending=False)
-    sub_count = expense.groupby('소분류').size()
+    sub_totals = expense_cube.groupby('소분류')[['금액', '건수']].sum()
+    sub_sum = sub_totals['금액'].sort_values(ascending=False)
+    sub_count = sub_totals['건수']
     
     for idx, (sub_name, amt) in enumerate(sub_sum.head(20).items(), 1):
         pct = (amt / total_expense * 100) if total_expense > 0 else 0
@@ -67,15 +71,14 @@ with open(r'c:\Users\JTC7\Desktop\01.Python Project\01.Personal Expense Tracker\
     f.write("\n" + "=" * 80 + "\n")
     f.write("📅 월별 지출 (높은 순)\n")
     f.write("=" * 80 + "\n")
-    expense['월'] = pd.to_datetime(expense['날짜']).dt.to_period('M')
-    monthly_sum = expense.groupby('월')['금액'].sum().sort_values(ascending=False)
+    monthly_sum = expense_cube.groupby(expense_cube['월'].dt.to_period('M'))['금액'].sum().sort_values(ascending=False)
     
     for month, amt in monthly_sum.items():
         f.write(f"{month}: {amt:12,.0f}원\n")
 
 print("보고서 저장 완료: 지출분석_보고서.txt")
 print("\n=== 요약 ===")
-print(f"총 지출: {expense['금액'].sum():,.0f}원")
+print(f"총 지출: {total_expense:,.0f}원")
 print(f"\nTop 3 대분류:")
 for idx, (cat, amt) in enumerate(cat_sum.head(3).items(), 1):
     pct = (amt / total_expense * 100) if total_expense > 0 else 0
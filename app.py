@@ -2,7 +2,23 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
-from data_manager import load_data, save_data, get_kpi_metrics, add_row_optimized
+import uuid
+# Offline-first (opt-in): the app reads / writes a local replica, synced with Google Sheets in the background
+# (local_replica.py). False (default): every load / save goes to the sheet directly.
+OFFLINE_FIRST = False
+if OFFLINE_FIRST:
+    from local_replica import load_data, save_changes, change_token, sync_status
+else:
+    from data_manager import load_data, save_changes, change_token
+from monthly_cube import build_cube, update_cube, slice_cube, monthly_by_type, category_totals, kpis
+from flow_filter import apply_flow_filter
+from search_index import SearchIndex
+from filter_engine import FilterEngine
+from date_index import DateIndex, month_bounds
+from data_normalize import compact_frame, expand_frame, format_amounts, assign_tx_ids
+from change_set import change_set_from_editor, apply_change_set, include_unsaved_rows, is_empty, empty_change_set, insert_sorted, merge_change_sets
+from save_worker import SaveWorker
+from revision_cache import RevisionCache
 
 # Page Config
 st.set_page_config(
@@ -36,16 +52,111 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ----------------- LOAD DATA (Cached) -----------------
-@st.cache_data
+# Compact typed schema (categorical codes, int seconds / won): several times less memory per session
+COMPACT_SCHEMA = False
+# Seconds a change-token check is reused (reruns within this window don't ask the backend)
+TOKEN_CHECK_INTERVAL = 10
+
+# One loaded frame shared by all sessions (no per-call copy), validated by the backend's change token:
+# refetched only when the sheet changed (edits from another device included), not on a timer.
+# The working frame is never modified in place: filters return views / position takes,
+# quick entry and save build new frames, so sessions copy only when they actually edit.
+@st.cache_resource
+def get_ledger_cache():
+    return RevisionCache(change_token, lambda: load_data(compact=COMPACT_SCHEMA), check_interval=TOKEN_CHECK_INTERVAL)
+
 def get_data_cached():
-    return load_data()
+    # Never read the sheet while a background save is writing it
+    with get_save_worker().lock:
+        return get_ledger_cache().get()
 
-# Use session state for working copy (draft mode)
-if 'working_df' not in st.session_state or st.session_state.get('reload_data', False):
-    st.session_state.working_df = get_data_cached().copy()
+# One save queue per process (the backend's sync state is process-wide): saves run in a background
+# thread, so filtering and quick entry keep working while a large write is in flight.
+# A successful write drops the shared frame, so sessions started afterwards load the saved data.
+@st.cache_resource
+def get_save_worker():
+    return SaveWorker(save_changes, on_saved=lambda: get_ledger_cache().invalidate())
+
+def unsubmitted_added():
+    """Pending quick entries not carried by a save job yet (labels of queued / saving / failed jobs are left out)."""
+    submitted = {label for labels in st.session_state.job_added.values() for label in labels}
+    return [label for label in st.session_state.pending_added if label not in submitted]
+
+def submit_save(df_after, changes, labels):
+    """
+    Queues a save carrying the quick entries `labels`. Failed saves of this session are retried with it:
+    their change sets go first and their entries move to the new job (never sent twice).
+    The entries leave pending_added only when the job succeeds (see save_status).
+    """
+    worker = get_save_worker()
+    merged, carried, failed_ids = empty_change_set(), [], []
+    for job_id in st.session_state.save_jobs:
+        job = worker.status(job_id)
+        if job is not None and job['state'] == 'failed':
+            merged = merge_change_sets(merged, job['changes'])
+            carried += st.session_state.job_added.pop(job_id, [])
+            failed_ids.append(job_id)
+    worker.forget(failed_ids)
+    job_id = worker.submit(df_after, merge_change_sets(merged, changes), key=st.session_state.session_key)
+    st.session_state.save_jobs = [j for j in st.session_state.save_jobs if j not in failed_ids] + [job_id]
+    st.session_state.job_added[job_id] = carried + list(labels)
+    return job_id
+
+if 'save_jobs' not in st.session_state:
+    st.session_state.save_jobs = []      # background save job ids of this session, oldest first
+    st.session_state.job_added = {}      # job id -> quick-entry labels it carries (dropped from pending_added once it succeeds)
+    st.session_state.editor_gen = 0      # bumped after a save, so the editor starts from the saved frame
+    st.session_state.session_key = uuid.uuid4().hex   # saves of one session are coalesced together
+
+def has_unsaved_edits():
+    """Quick entries / editor edits not saved yet, or saves of this session not finished (a reload would drop them)."""
+    if st.session_state.get('pending_added') or st.session_state.save_jobs:
+        return True
+    return any(key.startswith('expense_editor_') and isinstance(state, dict)
+               and any(state.get(part) for part in ('edited_rows', 'added_rows', 'deleted_rows'))
+               for key, state in st.session_state.items())
+
+def newer_ledger():
+    """The shared ledger if it's newer than this session's working copy, else None (also while a save is writing)."""
+    lock = get_save_worker().lock
+    if not lock.acquire(blocking=False):
+        return None
+    try:
+        ledger = get_ledger_cache().get()
+    finally:
+        lock.release()
+    return ledger if get_ledger_cache().version != st.session_state.get('ledger_version') else None
+
+def load_working_copy(ledger):
+    st.session_state.working_df = ledger
+    st.session_state.ledger_version = get_ledger_cache().version
+    # Monthly aggregate cube (charts / KPIs read from it, quick entries update it incrementally)
+    st.session_state.cube = build_cube(st.session_state.working_df)
+    # n-gram search index over 내용/메모/대분류/소분류/금액 (rebuilt per reload, updated on quick entry)
+    st.session_state.search_index = SearchIndex(st.session_state.working_df)
+    # Sorted date index: date ranges / month presets resolve by binary search
+    st.session_state.date_index = DateIndex(st.session_state.working_df['날짜'])
+    st.session_state.data_version = st.session_state.get('data_version', 0) + 1
+    st.session_state.editor_gen += 1
+    # Quick entries not saved yet (labels in working_df), sent as added rows with the next save
+    st.session_state.pending_added = []
     st.session_state.reload_data = False
 
+# Use session state for working copy (draft mode). Every rerun checks the shared ledger (change token,
+# at most once per TOKEN_CHECK_INTERVAL): a newer version (our own finished save, or an edit from another
+# device) replaces the working copy, unless the session holds something unsaved.
+if 'working_df' not in st.session_state or st.session_state.get('reload_data', False):
+    load_working_copy(get_data_cached())
+elif not has_unsaved_edits():
+    ledger = newer_ledger()
+    if ledger is not None:
+        load_working_copy(ledger)
+
+if 'filter_engine' not in st.session_state:
+    st.session_state.filter_engine = FilterEngine()
+
 df = st.session_state.working_df
+date_index = st.session_state.date_index
 
 # Validation: Check if critical columns exist
 required_columns = ['날짜', '구분', '대분류', '금액']
@@ -74,33 +185,23 @@ with st.expander("🔍 데이터 검색 및 필터 설정 (Data Search & Filter)
     d_val = []
     
     if date_preset == "이번 달":
-        start_d = today.replace(day=1)
-        end_d = (start_d + pd.DateOffset(months=1)) - pd.Timedelta(days=1)
-        d_val = [start_d, end_d]
+        d_val = list(month_bounds(today))
     elif date_preset == "지난 달":
-        prev_month = today - pd.DateOffset(months=1)
-        start_d = prev_month.replace(day=1)
-        end_d = (today.replace(day=1)) - pd.Timedelta(days=1)
-        d_val = [start_d, end_d]
+        d_val = list(month_bounds(today.replace(day=1) - pd.Timedelta(days=1)))
     elif date_preset == "월별 선택":
         if not df.empty and '날짜' in df.columns:
-            df['YYYYMM'] = df['날짜'].dt.strftime('%Y-%m')
-            available_months = sorted(df['YYYYMM'].unique(), reverse=True)
+            available_months = date_index.months()
             col_m1, _ = st.columns([1,3])
             with col_m1:
                 selected_month = st.selectbox("월 선택", available_months, label_visibility="collapsed")
             if selected_month:
-                y, m = map(int, selected_month.split('-'))
-                start_d = datetime(y, m, 1)
-                if m == 12: end_d = datetime(y+1, 1, 1) - pd.Timedelta(days=1)
-                else: end_d = datetime(y, m+1, 1) - pd.Timedelta(days=1)
-                d_val = [start_d, end_d]
+                d_val = list(month_bounds(selected_month + '-01'))
     elif date_preset == "전체":
         d_val = [] 
     else: # Default or others
         if not df.empty:
-            min_date = df['날짜'].min()
-            max_date = df['날짜'].max()
+            min_date = date_index.min()
+            max_date = date_index.max()
             d_val = [min_date, max_date]
             
     if date_preset == "직접 입력":
@@ -117,39 +218,40 @@ with st.expander("🔍 데이터 검색 및 필터 설정 (Data Search & Filter)
         selected_cats = st.multiselect("대분류 (Category)", all_cats, default=all_cats)
 
 # --- APPLY FILTERS ---
-filtered_df = df.copy()
-
-# 1. Search Filter
-if search_term:
-    mask = (
-        filtered_df['내용'].astype(str).str.contains(search_term, case=False, na=False) |
-        filtered_df['메모'].astype(str).str.contains(search_term, case=False, na=False) |
-        filtered_df['대분류'].astype(str).str.contains(search_term, case=False, na=False) |
-        filtered_df['소분류'].astype(str).str.contains(search_term, case=False, na=False)
-    )
-    filtered_df = filtered_df[mask]
-
-# 2. Date Filter
-if len(date_range) == 2:
-    filtered_df = filtered_df[
-        (filtered_df['날짜'].dt.date >= pd.to_datetime(date_range[0]).date()) & 
-        (filtered_df['날짜'].dt.date <= pd.to_datetime(date_range[1]).date())
-    ]
-
-# 3. Category/Type Filter
-if selected_types:
-    filtered_df = filtered_df[filtered_df['구분'].isin(selected_types)]
-if selected_cats:
-    filtered_df = filtered_df[filtered_df['대분류'].isin(selected_cats)]
+# 1. Search (index lookup: terms are ANDed, ^term = prefix, numbers also match 금액)
+# 2. Date  3. Type / Category
+# Each filter's row positions are cached per data version, so only the changed filter is recomputed
+# and reruns with the same filters reuse the cached frame (read-only: copy before modifying).
+engine = st.session_state.filter_engine.bind(df, st.session_state.data_version, st.session_state.search_index, date_index)
+filtered_df = engine.apply(
+    search_term=search_term,
+    date_range=date_range if len(date_range) == 2 else None,
+    types=selected_types,
+    categories=selected_cats,
+)
 
 # ----------------- DASHBOARD SUMMARY (BIG METRICS) -----------------
 st.divider()
 st.markdown("### 📊 선택기간 요약 (Dashboard)")
 
-active_df = filtered_df[filtered_df['Is_Active'] == True]
-sum_income = active_df[active_df['구분'] == '수입']['금액'].sum()
-sum_expense = active_df[active_df['구분'] == '지출']['금액'].sum()
-sum_inactive = filtered_df[filtered_df['Is_Active'] == False]['금액'].sum()
+# Month-aligned presets without a search term are answered from the session cube directly,
+# anything else (search / custom range) aggregates the filtered rows into a small cube first.
+if not search_term and date_preset in ["전체", "이번 달", "지난 달", "월별 선택"]:
+    view_cube = slice_cube(
+        st.session_state.cube,
+        start=date_range[0] if len(date_range) == 2 else None,
+        end=date_range[1] if len(date_range) == 2 else None,
+        types=[("" if pd.isna(t) else str(t)) for t in selected_types] if selected_types else None,
+        categories=[("" if pd.isna(c) else str(c)) for c in selected_cats] if selected_cats else None,
+    )
+else:
+    view_cube = build_cube(filtered_df)
+
+view_kpis = kpis(view_cube)
+sum_income = view_kpis['income']
+sum_expense = view_kpis['expense']
+sum_inactive = view_kpis['other']
+active_cube = view_cube[view_cube['Flow_Filter'] == 1]
 
 m_col1, m_col2, m_col3, m_col4 = st.columns(4)
 with m_col1: st.metric("✅ 수입", f"{sum_income:,.0f}원")
@@ -161,13 +263,11 @@ st.divider()
 
 # ----------------- CHARTS SECTION -----------------
 # Only show charts if we have data
-if not active_df.empty:
+if not active_cube.empty:
     col_c1, col_c2 = st.columns(2)
     
     # 1. Monthly Trend
-    trend_df = active_df.copy()
-    trend_df['날짜'] = pd.to_datetime(trend_df['날짜'])
-    monthly_trend = trend_df.groupby([pd.Grouper(key='날짜', freq='MS'), '구분'])['금액'].sum().reset_index()
+    monthly_trend = monthly_by_type(active_cube).rename(columns={'월': '날짜'})
     
     with col_c1:
         st.subheader("🗓️ 월별 재정 흐름")
@@ -181,9 +281,8 @@ if not active_df.empty:
         st.plotly_chart(fig_trend, use_container_width=True)
         
     # 2. Category Pie
-    expense_data = active_df[active_df['구분'] == '지출'].copy()
-    if not expense_data.empty:
-        cat_trend = expense_data.groupby('대분류')['금액'].sum().reset_index()
+    cat_trend = category_totals(active_cube, '대분류', '지출')[['대분류', '금액']]
+    if not cat_trend.empty:
         cat_trend['금액'] = cat_trend['금액'].abs()
         
         with col_c2:
@@ -267,9 +366,21 @@ with st.expander("➕ 새 데이터 추가 (Quick Entry)", expanded=True):
         }
         
         # Add to working DataFrame (no immediate save)
-        new_row_df = pd.DataFrame([new_row])
-        st.session_state.working_df = pd.concat([st.session_state.working_df, new_row_df], ignore_index=True)
-        st.session_state.working_df = st.session_state.working_df.sort_values(by=['날짜', '시간'], ascending=[False, False])
+        # Next free index label (existing labels stay stable for the search index / editor diff)
+        next_label = st.session_state.working_df.index.max() + 1 if not st.session_state.working_df.empty else 0
+        new_row_df = apply_flow_filter(pd.DataFrame([new_row], index=[next_label]))
+        new_row_df = assign_tx_ids(new_row_df, existing=st.session_state.working_df.get('Tx_ID'))
+        # Binary insertion into the sorted working frame (no full re-sort per entry)
+        if COMPACT_SCHEMA:
+            merged = insert_sorted(st.session_state.working_df, compact_frame(new_row_df.copy()), by_time=True)
+            st.session_state.working_df = compact_frame(merged)  # re-categorize the merged text columns
+        else:
+            st.session_state.working_df = insert_sorted(st.session_state.working_df, new_row_df, by_time=True)
+        st.session_state.cube = update_cube(st.session_state.cube, added=new_row_df)
+        st.session_state.search_index.add(new_row_df)
+        st.session_state.date_index = DateIndex(st.session_state.working_df['날짜'])
+        st.session_state.data_version += 1
+        st.session_state.pending_added.append(next_label)
         
         st.toast("✅ 추가됨 (저장 전)", icon="📝")
         st.success("✅ 데이터가 추가되었습니다! '변경사항 저장' 버튼을 눌러 저장하세요.")
@@ -277,14 +388,38 @@ with st.expander("➕ 새 데이터 추가 (Quick Entry)", expanded=True):
         # Trigger safe reset on next run
         st.session_state.reset_qe_next_run = True
         st.rerun()
+    
+    # Quick entries are buffered in the working frame; one flush appends them all in a single API call
+    # (entries already handed to a save job stay pending until it succeeds, but aren't offered again)
+    labels = unsubmitted_added()
+    if labels:
+        if st.button(f"📤 추가한 {len(labels)}건 저장 (한 번에 전송)"):
+            changes = empty_change_set()
+            changes['added'] = st.session_state.working_df.loc[labels]
+            submit_save(st.session_state.working_df, changes, labels)
+            st.rerun()
 
 st.caption(f"총 {len(df):,}건 중 **{len(filtered_df):,}건** 표시됨")
 
+# Paginated editor: only the visible window of rows is formatted and sent to the browser.
+# Rows keep their global index labels, so edits / deletes map back to the working frame.
+PAGE_SIZES = [100, 500, 1000]
+col_p1, col_p2, col_p3 = st.columns([1, 1, 4])
+with col_p1:
+    page_size = st.selectbox("페이지당 행 수", PAGE_SIZES, index=1)
+total_pages = max(1, -(-len(filtered_df) // page_size))
+with col_p2:
+    page = st.number_input(f"페이지 (총 {total_pages})", min_value=1, max_value=total_pages, value=1, step=1)
+with col_p3:
+    st.caption("※ 페이지를 이동하기 전에 변경사항을 저장하세요.")
+page_start = (page - 1) * page_size
+window_df = filtered_df.iloc[page_start:page_start + page_size]
+
 # Data Editor Setup
-# Comma workaround: Convert Amount to String for viewing
-editor_df = filtered_df.copy()
+# Comma workaround: Convert Amount to String for viewing (vectorized, window only)
+editor_df = expand_frame(window_df)
 if '금액' in editor_df.columns:
-    editor_df['금액'] = editor_df['금액'].apply(lambda x: f"{int(x):,}")
+    editor_df['금액'] = format_amounts(editor_df['금액'])
 
 column_config = {
     "날짜": st.column_config.DateColumn("날짜", format="YYYY-MM-DD"),
@@ -292,69 +427,95 @@ column_config = {
     "금액": st.column_config.TextColumn("금액", help="금액 입력 (쉼표 가능)", validate=r"^-?[0-9,]+$"), 
     "Is_Active": st.column_config.CheckboxColumn("활성 상태", help="체크 해제 시 통계 제외"),
     "Flow_Filter": st.column_config.NumberColumn("Flow_Filter (자동관리)", help="이 값은 '활성 상태'에 따라 자동으로 설정됩니다. (수정 불가)", disabled=True),
+    "Tx_ID": st.column_config.TextColumn("Tx_ID", help="거래 고유 ID (자동 부여, 수정 불가)", disabled=True),
 }
 
-edited_subset = st.data_editor(
+editor_key = f"expense_editor_{st.session_state.editor_gen}_{page_size}_{page}"
+st.data_editor(
     editor_df, 
     num_rows="dynamic",
     use_container_width=True,
     height=500,
-    key="expense_editor",
+    key=editor_key,
     column_config=column_config
 )
 
-if st.button("💾 변경사항 저장 (Save to Excel)", type="primary"):
-    # Pre-process: Strip commas from Amount and convert to Int
-    if '금액' in edited_subset.columns:
-        edited_subset['금액'] = edited_subset['금액'].astype(str).str.replace(',', '').str.strip()
-        edited_subset['금액'] = pd.to_numeric(edited_subset['금액'], errors='coerce').fillna(0).astype(int)
+def apply_saved_edits(new_df, changes):
+    """Makes new_df the working frame, updating the cube / search / date indexes for the edited rows only."""
+    old_df = st.session_state.working_df
+    removed = [l for l in list(changes['deleted']) + list(changes['updated'].index) if l in old_df.index]
+    added = [f for f in (changes['updated'], changes['added']) if not f.empty]
+    added = pd.concat(added) if added else None
+    st.session_state.cube = update_cube(st.session_state.cube, added=added, removed=old_df.loc[removed])
+    st.session_state.search_index.remove(changes['deleted'])
+    st.session_state.search_index.add(added)
+    st.session_state.working_df = compact_frame(new_df.copy()) if COMPACT_SCHEMA else new_df
+    st.session_state.date_index = DateIndex(st.session_state.working_df['날짜'])
+    st.session_state.data_version += 1
+    st.session_state.editor_gen += 1
 
+if st.button("💾 변경사항 저장 (Save to Excel)", type="primary"):
     try:
-        with st.spinner("💾 엑셀 파일에 저장 중입니다... (잠시만 기다려주세요)"):
-            visible_indices = set(filtered_df.index)
-            edited_indices = set(edited_subset.index)
-            
-            deleted_indices = visible_indices - edited_indices
-            all_original_indices = set(df.index)
-            new_indices = edited_indices - all_original_indices
-            common_indices = edited_indices.intersection(all_original_indices)
-            
-            final_df = df.copy()
-            
-            if deleted_indices:
-                final_df = final_df.drop(index=list(deleted_indices))
-            
-            if common_indices:
-                updates = edited_subset.loc[list(common_indices)]
-                final_df.update(updates)
-                
-            if new_indices:
-                new_rows = edited_subset.loc[list(new_indices)]
-                final_df = pd.concat([final_df, new_rows])
-            
-            # FORCE SYNC Flow_Filter
-            if 'Is_Active' in final_df.columns:
-                final_df['Flow_Filter'] = final_df['Is_Active'].apply(lambda x: 1 if x is True or x==1 else 0)
-            
-            if '날짜' in final_df.columns:
-                 final_df = final_df.sort_values(by=['날짜'], ascending=False)
-            
-            if save_data(final_df):
-                st.toast("✅ 저장 성공!", icon="🎉")
-                st.success("✅ 저장이 완료되었습니다!")
-                
-                # Update session state with saved data
-                st.session_state.working_df = final_df.copy()
-                
-                # Clear cache and trigger reload on next run
-                get_data_cached.clear()
-                st.session_state.reload_data = True
-                
-                import time
-                time.sleep(1.5)
-                st.rerun()
-            else:
-                st.error("❌ 저장 실패: 파일이 열려있는지 확인하세요.")
+        # Change set from the editor's own state (edited_rows / added_rows / deleted_rows):
+        # only the touched rows are parsed, Flow_Filter is synced for them only, nothing is re-sorted.
+        next_label = df.index.max() + 1 if not df.empty else 0
+        edits = change_set_from_editor(st.session_state.get(editor_key), editor_df, next_label,
+                                       existing_ids=df.get('Tx_ID'))
+        final_df = apply_change_set(df, edits)
+        labels = unsubmitted_added()
+        changes = include_unsaved_rows(edits, final_df, labels)
+        
+        if is_empty(changes):
+            st.info("변경사항이 없습니다.")
+        else:
+            # Queued for the background writer; the page stays usable while it runs
+            submit_save(final_df, changes, labels)
+            apply_saved_edits(final_df, edits)
+            st.toast("💾 저장을 시작했습니다 (백그라운드)", icon="⏳")
+            st.rerun()
             
     except Exception as e:
         st.error(f"Save Error: {e}")
+
+# Save progress / outcome. Polls once a second only while this session has a save in flight.
+worker = get_save_worker()
+saving = worker.pending(st.session_state.session_key) > 0
+
+@st.fragment(run_every=1 if saving else None)
+def save_status():
+    jobs = [(job_id, worker.status(job_id)) for job_id in st.session_state.save_jobs]
+    for job_id, job in jobs:
+        if job is None or job['state'] == 'done':
+            # Saved (or unknown to the worker: its entries count as unsent again)
+            labels = st.session_state.job_added.pop(job_id, [])
+            if job is not None:
+                st.session_state.pending_added = [l for l in st.session_state.pending_added if l not in labels]
+    jobs = [(job_id, job) for job_id, job in jobs if job is not None]
+    in_flight = [job for _, job in jobs if job['state'] in ('queued', 'saving')]
+    if in_flight:
+        st.info(f"💾 백그라운드 저장 중... ({len(in_flight)}건 대기) 계속 작업하셔도 됩니다.")
+        return
+    if saving:
+        # Just finished: one full rerun to stop polling
+        st.rerun()
+    failed = [(job_id, job) for job_id, job in jobs if job['state'] == 'failed']
+    if failed:
+        st.error(f"❌ 저장 실패: {failed[-1][1]['error']} (변경사항은 화면에 남아 있습니다)")
+        if st.button("🔁 다시 저장", key="retry_save"):
+            # The failed change sets (and the quick entries they carry) go out again as one save
+            submit_save(st.session_state.working_df, empty_change_set(), [])
+            st.rerun()
+    elif jobs:
+        st.success("✅ 저장이 완료되었습니다!")
+        worker.forget([job_id for job_id, _ in jobs])
+        st.session_state.save_jobs = []
+
+save_status()
+
+# Replica sync state: unpushed local changes / connection problems (entries are kept locally either way)
+if OFFLINE_FIRST:
+    sync = sync_status()
+    if sync['last_error']:
+        st.caption(f"📴 Google Sheets 연결 안 됨 — 로컬에 저장된 변경 {sync['pending']}건은 연결되면 동기화됩니다.")
+    elif sync['pending']:
+        st.caption(f"🔄 Google Sheets 동기화 대기 {sync['pending']}건")
@@ -2,7 +2,9 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 from datetime import datetime
-from data_manager_excel import load_data, save_data, get_kpi_metrics
+# Saves are appended to the edit journal (durable at once), folded into the workbook in the background
+from edit_journal import load_data, save_data, get_kpi_metrics, change_token
+from revision_cache import RevisionCache
 
 # Page Config
 st.set_page_config(
@@ -36,9 +38,13 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ----------------- LOAD DATA (Cached) -----------------
-@st.cache_data
+# Validated by the workbook's content hash + the journal: edits made in Excel show up on the next reload
+@st.cache_resource
+def get_ledger_cache():
+    return RevisionCache(change_token, load_data)
+
 def get_data_cached():
-    return load_data()
+    return get_ledger_cache().get()
 
 # Use session state for working copy (draft mode)
 if 'working_df' not in st.session_state or st.session_state.get('reload_data', False):
@@ -347,7 +353,7 @@ if st.button("💾 변경사항 저장 (Save to Excel)", type="primary"):
                 st.session_state.working_df = final_df.copy()
                 
                 # Clear cache and trigger reload on next run
-                get_data_cached.clear()
+                get_ledger_cache().invalidate()
                 st.session_state.reload_data = True
                 
                 import time
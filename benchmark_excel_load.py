@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import openpyxl
+import pandas as pd
+
+import data_manager_excel
+
+# Compares the old double pd.read_excel path with the streaming read-only reader
+# on a synthetic T_RawData workbook. Each path runs in its own process so the peak RSS is not shared.
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS reports bytes
+        return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        mem = psutil.Process().memory_info()
+        return getattr(mem, 'peak_wset', mem.rss) / 1024 / 1024
+    except ImportError:
+        return float('nan')
+
+def legacy_read(path, sheet_name):
+    """The previous load path: preview read for header detection, then a full parse."""
+    preview_df = pd.read_excel(path, sheet_name=sheet_name, header=None, nrows=10)
+    header_row_index = 1
+    for idx, row in preview_df.iterrows():
+        if {'날짜', '구분', '금액'}.issubset(set(row.astype(str).tolist())):
+            header_row_index = idx
+            break
+    return pd.read_excel(path, sheet_name=sheet_name, header=header_row_index)
+
+def streaming_read(path, sheet_name):
+    return data_manager_excel._read_raw_sheet(path, sheet_name)
+
+def make_workbook(path, n_rows):
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(data_manager_excel.SHEET_NAME)
+    # A second sheet so the workbook is not only raw data
+    dash = wb.create_sheet('Dashboard')
+    dash.append(['Dashboard placeholder'])
+
+    ws.append(['가계부 데이터 엔진 (T_RawData)'])
+    ws.append(['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모', 'Flow_Filter'])
+    base = datetime(2020, 1, 1)
+    cats = ['식비', '교통', '쇼핑', '이동', '주거', '급여']
+    for i in range(n_rows):
+        dt = base + timedelta(minutes=37 * i)
+        ws.append([dt, dt.time(), '지출' if i % 7 else '수입', cats[i % len(cats)], f'소분류{i % 40}',
+                   f'거래 {i}', -(i % 97) * 1000, '카드', '메모' if i % 5 == 0 else None, 1])
+    wb.save(path)
+
+def run_child(method, path):
+    fn = legacy_read if method == 'legacy' else streaming_read
+    t0 = time.perf_counter()
+    df = fn(path, data_manager_excel.SHEET_NAME)
+    elapsed = time.perf_counter() - t0
+    print(json.dumps({'method': method, 'rows': len(df), 'seconds': elapsed, 'peak_rss_mb': peak_rss_mb()}))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark T_RawData load paths (time / peak RSS)")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 50000, 200000])
+    parser.add_argument('--child', choices=['legacy', 'streaming'], help=argparse.SUPPRESS)
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.path)
+        sys.exit(0)
+
+    print(f"{'rows':>10} | {'method':>10} | {'seconds':>8} | {'peak RSS (MB)':>13}")
+    print("-" * 52)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.rows:
+            path = os.path.join(tmp, f'bench_{n}.xlsx')
+            make_workbook(path, n)
+            for method in ['legacy', 'streaming']:
+                out = subprocess.run([sys.executable, __file__, '--child', method, '--path', path],
+                                     capture_output=True, text=True, check=True)
+                r = json.loads(out.stdout.strip().splitlines()[-1])
+                print(f"{n:>10,} | {method:>10} | {r['seconds']:>8.2f} | {r['peak_rss_mb']:>13.1f}")
@@ -0,0 +1,78 @@
+import argparse
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from data_normalize import EXPECTED_COLS, pad_rows, normalize_frame
+
+# Compares the old per-row ingest (while-loop padding + .apply parse_time / Is_Active lambdas)
+# with the shared vectorized stage in data_normalize.py, on raw string rows like get_all_values() returns.
+
+def make_rows(n):
+    rng = np.random.default_rng(0)
+    base = datetime(2020, 1, 1)
+    minutes = np.sort(rng.integers(0, 60 * 24 * 365 * 5, n))
+    cats = ['식비', '교통', '쇼핑', '이동', '주거', '급여']
+    rows = []
+    for i, m in enumerate(minutes):
+        dt = base + timedelta(minutes=int(m))
+        row = [dt.strftime('%Y-%m-%d'), dt.strftime('%H:%M:%S'), '지출', cats[i % 6], '', f'거래 {i}',
+               f"{-(int(m) % 97) * 1000:,}", '카드', '', '1' if i % 9 else '0']
+        # Sheets drops trailing empty cells, so rows are ragged
+        rows.append(row if i % 3 else row[:8])
+    return rows
+
+def legacy_ingest(rows):
+    cleaned_data = []
+    for r in rows:
+        r = list(r)
+        while len(r) < len(EXPECTED_COLS):
+            r.append("")
+        cleaned_data.append(r[:len(EXPECTED_COLS)])
+    df = pd.DataFrame(cleaned_data, columns=EXPECTED_COLS)
+    df['날짜'] = pd.to_datetime(df['날짜'], errors='coerce')
+
+    def parse_time(val):
+        if pd.isna(val) or val == "": return None
+        if isinstance(val, str):
+            try: return pd.to_datetime(val, format='%H:%M:%S').time()
+            except:
+                try: return pd.to_datetime(val).time()
+                except: return None
+        return val
+    df['시간'] = df['시간'].apply(parse_time)
+    df['금액'] = pd.to_numeric(df['금액'].astype(str).str.replace(',', ''), errors='coerce').fillna(0)
+
+    def is_active(val):
+        try: return str(val).strip().split('.')[0] == '1'
+        except: return False
+    df['Is_Active'] = df['Flow_Filter'].apply(is_active)
+    return df
+
+def vectorized_ingest(rows):
+    return normalize_frame(pad_rows(rows, EXPECTED_COLS))
+
+def timed(fn, rows):
+    t0 = time.perf_counter()
+    df = fn(rows)
+    return time.perf_counter() - t0, df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-row vs vectorized ingest")
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} | {'legacy (s)':>10} | {'vectorized (s)':>14} | {'speedup':>7}")
+    print("-" * 52)
+    for n in args.rows:
+        rows = make_rows(n)
+        t_old, df_old = timed(legacy_ingest, rows)
+        t_new, df_new = timed(vectorized_ingest, rows)
+        # Rows without a Flow_Filter value are filled by the rule engine now (legacy: inactive)
+        has_flag = df_old['Flow_Filter'].astype(str).str.strip() != ""
+        assert (df_old['Is_Active'].values[has_flag] == df_new['Is_Active'].values[has_flag]).all()
+        assert (df_old['금액'].values == df_new['금액'].values).all()
+        assert (df_old['시간'].values == df_new['시간'].values).all()
+        print(f"{n:>10,} | {t_old:>10.2f} | {t_new:>14.2f} | {t_old / t_new:>6.1f}x")
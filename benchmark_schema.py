@@ -0,0 +1,46 @@
+import argparse
+import time
+
+import pandas as pd
+
+from benchmark_ingest import make_rows
+from data_normalize import EXPECTED_COLS, pad_rows, normalize_frame, compact_frame, memory_report
+
+# Memory + per-rerun operation cost of the standard frame vs the compact typed schema.
+
+def timed(fn, repeat=5):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+def operations(df):
+    types = list(df['구분'].unique())
+    cats = list(df['대분류'].unique())[:3]
+    return {
+        'isin (구분, 대분류)': lambda: df['구분'].isin(types) & df['대분류'].isin(cats),
+        'groupby 대분류 sum': lambda: df.groupby('대분류', observed=True)['금액'].sum(),
+        "sort_values(['날짜','시간'])": lambda: df.sort_values(by=['날짜', '시간'], ascending=[False, False]),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the compact typed schema")
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    standard = normalize_frame(pad_rows(make_rows(args.rows), EXPECTED_COLS))
+    compact = compact_frame(standard.copy())
+
+    report = memory_report(standard)[['dtype', 'MB']].join(
+        memory_report(compact)[['dtype', 'MB']], lsuffix=' (standard)', rsuffix=' (compact)')
+    print(f"Memory per column, {args.rows:,} rows")
+    print(report.to_string())
+    total_std = report.loc['TOTAL', 'MB (standard)']
+    total_cmp = report.loc['TOTAL', 'MB (compact)']
+    print(f"-> {total_std / total_cmp:.1f}x smaller\n")
+
+    print(f"{'operation':<28} | {'standard (ms)':>13} | {'compact (ms)':>12}")
+    print("-" * 60)
+    ops_std, ops_cmp = operations(standard), operations(compact)
+    for name in ops_std:
+        print(f"{name:<28} | {timed(ops_std[name]) * 1000:>13.1f} | {timed(ops_cmp[name]) * 1000:>12.1f}")
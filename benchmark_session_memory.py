@@ -0,0 +1,66 @@
+import argparse
+import pickle
+import tracemalloc
+
+import pandas as pd
+
+from benchmark_ingest import make_rows
+from data_normalize import EXPECTED_COLS, pad_rows, normalize_frame, expand_frame, format_amounts
+from monthly_cube import build_cube, slice_cube, kpis
+from search_index import SearchIndex
+from date_index import DateIndex
+from filter_engine import FilterEngine
+
+# Peak memory of one app.py rerun (date-range filter + editor frame) on a loaded ledger:
+# the old page (cache_data copy + .copy() + filtered copy + trend copy + editor copy + YYYYMM column)
+# vs the current one (shared frame, cached position takes, one editor page).
+
+def legacy_rerun(cached_bytes, start, end):
+    df = pickle.loads(cached_bytes).copy()          # st.cache_data hands out a copy, then .copy()
+    df['YYYYMM'] = df['날짜'].dt.strftime('%Y-%m')   # month selector
+    filtered_df = df.copy()
+    filtered_df = filtered_df[
+        (filtered_df['날짜'].dt.date >= start.date()) &
+        (filtered_df['날짜'].dt.date <= end.date())
+    ]
+    active_df = filtered_df[filtered_df['Is_Active'] == True]
+    trend_df = active_df.copy()
+    trend_df.groupby([pd.Grouper(key='날짜', freq='MS'), '구분'])['금액'].sum()
+    editor_df = filtered_df.copy()
+    editor_df['금액'] = editor_df['금액'].apply(lambda x: f"{int(x):,}")
+    return editor_df
+
+def current_rerun(shared, session, start, end):
+    engine = session['engine'].bind(shared, session['version'], session['search_index'], session['date_index'])
+    filtered_df = engine.apply(date_range=[start, end])
+    kpis(slice_cube(session['cube'], start=start, end=end))
+    editor_df = expand_frame(filtered_df.iloc[:500])   # one editor page
+    editor_df['금액'] = format_amounts(editor_df['금액'])
+    return editor_df
+
+def peak_mb(fn, *args):
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 ** 2
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-session memory of one app rerun")
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    df = normalize_frame(pad_rows(make_rows(args.rows), EXPECTED_COLS)).sort_values('날짜', ascending=False)
+    start, end = df['날짜'].min().normalize(), df['날짜'].max().normalize()   # multi-year view: every row visible
+
+    session = {
+        'engine': FilterEngine(), 'version': 1, 'cube': build_cube(df),
+        'search_index': SearchIndex(df), 'date_index': DateIndex(df['날짜']),
+    }
+    cached_bytes = pickle.dumps(df, protocol=5)
+
+    old = peak_mb(legacy_rerun, cached_bytes, start, end)
+    new = peak_mb(current_rerun, df, session, start, end)
+    print(f"{args.rows:,} rows, one rerun (peak traced allocation)")
+    print(f"  legacy : {old:8.1f} MB")
+    print(f"  current: {new:8.1f} MB  ({old / new:.1f}x less)")
@@ -0,0 +1,184 @@
+import numpy as np
+import pandas as pd
+
+from data_normalize import normalize_frame, is_compact, expand_frame, assign_tx_ids, time_to_seconds
+
+# Minimal change set of one save, built from st.data_editor's own edit state
+# ({'edited_rows': {pos: {col: value}}, 'added_rows': [{col: value}], 'deleted_rows': [pos]}).
+#
+#   {'updated': DataFrame (full new rows, index = working-frame labels),
+#    'added':   DataFrame (new rows, fresh labels),
+#    'deleted': [labels],
+#    'deleted_ids': {label: Tx_ID} (the deleted rows' IDs, for stores that address rows by Tx_ID)}
+#
+# apply_change_set() produces the new working frame without a full update() / re-sort,
+# and every backend's save_changes() writes only these rows when it can.
+
+def empty_change_set():
+    return {'updated': pd.DataFrame(), 'added': pd.DataFrame(), 'deleted': [], 'deleted_ids': {}}
+
+def is_empty(changes):
+    return changes['updated'].empty and changes['added'].empty and not changes['deleted']
+
+def _to_frame_rows(records, index):
+    """Editor values (ISO strings, '12,000', bools) -> normalized rows. Flow_Filter follows Is_Active."""
+    rows = pd.DataFrame(records, index=index)
+    if 'Is_Active' in rows.columns:
+        active = rows['Is_Active']
+        # Unset (new rows): Flow_Filter from the rule engine in normalize_frame
+        rows['Flow_Filter'] = np.where(active.isna(), None, np.where(active.fillna(False).astype(bool), 1, 0))
+    rows = normalize_frame(rows)
+    rows['Flow_Filter'] = pd.to_numeric(rows['Flow_Filter'], errors='coerce').fillna(1).astype(int)
+    return rows
+
+def change_set_from_editor(state, editor_df, next_label, existing_ids=None):
+    """
+    state: st.session_state[<editor key>]; editor_df: the frame given to st.data_editor
+    (positions in state refer to its rows). New rows get labels next_label, next_label + 1, ...
+    and Tx_IDs not in existing_ids (the working frame's Tx_ID column).
+    """
+    changes = empty_change_set()
+    if not state:
+        return changes
+
+    deleted_pos = sorted(set(state.get('deleted_rows', [])))
+    changes['deleted'] = list(editor_df.index[deleted_pos])
+    if 'Tx_ID' in editor_df.columns:
+        changes['deleted_ids'] = {label: tx_id for label, tx_id in zip(changes['deleted'], editor_df['Tx_ID'].iloc[deleted_pos])
+                                  if isinstance(tx_id, str) and tx_id}
+
+    edited = {int(p): v for p, v in state.get('edited_rows', {}).items() if int(p) not in deleted_pos and v}
+    if edited:
+        positions = sorted(edited)
+        base = editor_df.iloc[positions]
+        records = []
+        for pos, record in zip(positions, base.to_dict('records')):
+            record.update(edited[pos])
+            records.append(record)
+        changes['updated'] = _to_frame_rows(records, base.index)
+
+    added = [r for r in state.get('added_rows', []) if any(v not in (None, "") for v in r.values())]
+    if added:
+        columns = list(editor_df.columns)
+        records = [{c: r.get(c) for c in columns} for r in added]
+        changes['added'] = assign_tx_ids(_to_frame_rows(records, range(next_label, next_label + len(records))),
+                                         existing=existing_ids)
+
+    return changes
+
+def _date_keys(df, by_time=False):
+    """
+    Sort key of the ledger order (날짜 descending, missing dates last) as ascending floats.
+    by_time: 시간 descending within a day, rows without a time last (like sort_values(['날짜', '시간'])).
+    """
+    days = pd.to_datetime(df['날짜'], errors='coerce').to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+    keys = -days.astype('int64').astype('float64')
+    if by_time and '시간' in df.columns:
+        # Seconds of day (-1: no time, after every time of that day), 86401 slots per day
+        keys = keys * 86401 - time_to_seconds(df['시간']).to_numpy()
+    keys[np.isnat(days)] = np.inf
+    return keys
+
+def insert_sorted(df, rows, by_time=False):
+    """
+    Inserts rows into df (sorted by 날짜 descending, by_time: then 시간 descending) at their
+    binary-searched positions, after existing rows with the same key. df itself is not re-sorted.
+    """
+    if rows is None or rows.empty:
+        return df
+    if df.empty:
+        by = ['날짜', '시간'] if by_time and '시간' in rows.columns else ['날짜']
+        return rows.sort_values(by=by, ascending=False)
+    rows = rows.iloc[np.argsort(_date_keys(rows, by_time), kind='stable')]
+    pos = np.searchsorted(_date_keys(df, by_time), _date_keys(rows, by_time), side='right')
+    order = np.insert(np.arange(len(df)), pos, np.arange(len(df), len(df) + len(rows)))
+    return pd.concat([df, rows]).iloc[order]
+
+def apply_change_set(df, changes):
+    """New working frame with the change set applied (df is not modified)."""
+    out = expand_frame(df) if is_compact(df) else df
+    drop = list(changes['deleted'])
+    updated = changes['updated']
+    in_place = pd.DataFrame()
+    moved = pd.DataFrame()
+
+    if not updated.empty:
+        labels = updated.index.intersection(out.index)
+        # Rows whose date changed are moved (removed + re-inserted), the rest are overwritten in place
+        old_dates = pd.to_datetime(out.loc[labels, '날짜'])
+        date_changed = (old_dates != updated.loc[labels, '날짜']) & ~(old_dates.isna() & updated.loc[labels, '날짜'].isna())
+        moved = updated.loc[labels[date_changed.to_numpy()]]
+        in_place = updated.loc[labels[~date_changed.to_numpy()]]
+        drop += list(moved.index)
+
+    if drop:
+        out = out.drop(index=drop)
+    elif not in_place.empty:
+        out = out.copy()
+
+    for col in in_place.columns:
+        if col in out.columns:
+            if isinstance(out[col].dtype, pd.CategoricalDtype):
+                out[col] = out[col].astype(object)
+            try:
+                out.loc[in_place.index, col] = in_place[col]
+            except (TypeError, ValueError):
+                # e.g. float amounts into an int64 column: widen the column instead of failing
+                out[col] = out[col].astype(object)
+                out.loc[in_place.index, col] = in_place[col]
+
+    inserted = [f for f in (moved, changes['added']) if not f.empty]
+    if inserted:
+        out = insert_sorted(out, pd.concat(inserted) if len(inserted) > 1 else inserted[0])
+    return out
+
+def include_unsaved_rows(changes, df, labels):
+    """
+    Moves rows that exist only in the working frame (quick entries not saved yet) into changes['added'],
+    with their current values from df (the frame after the changes). Edits / deletes of those rows
+    never reach the backend as such.
+    """
+    unsaved = set(labels)
+    out = dict(changes)
+    out['deleted'] = [l for l in changes['deleted'] if l not in unsaved]
+    out['deleted_ids'] = {l: t for l, t in changes.get('deleted_ids', {}).items() if l not in unsaved}
+    if not changes['updated'].empty:
+        out['updated'] = changes['updated'][~changes['updated'].index.isin(list(unsaved))]
+    present = [l for l in labels if l in df.index]
+    if present:
+        rows = df.loc[present]
+        out['added'] = pd.concat([rows, changes['added']]) if not changes['added'].empty else rows
+    return out
+
+def merge_change_sets(first, second):
+    """
+    One change set with the effect of first, then second (e.g. two saves queued before the first was written).
+    Rows added by first and edited / deleted by second stay added (with their new values) / disappear.
+    """
+    added, updated = first['added'], first['updated']
+    deleted = list(first['deleted'])
+    deleted_ids = dict(first.get('deleted_ids', {}))
+
+    gone = set(second['deleted'])
+    if gone:
+        if not added.empty:
+            added = added[~added.index.isin(list(gone))]
+        if not updated.empty:
+            updated = updated[~updated.index.isin(list(gone))]
+        added_labels = set(first['added'].index)
+        deleted += [l for l in second['deleted'] if l not in added_labels and l not in deleted]
+        deleted_ids.update({l: t for l, t in second.get('deleted_ids', {}).items() if l in deleted})
+
+    edits = second['updated']
+    if not edits.empty:
+        to_added = edits.index.isin(added.index)
+        if to_added.any():
+            added = pd.concat([added[~added.index.isin(edits.index[to_added])], edits[to_added]])
+        rest = edits[~to_added]
+        if not rest.empty:
+            updated = pd.concat([updated[~updated.index.isin(rest.index)], rest]) if not updated.empty else rest
+
+    if not second['added'].empty:
+        added = pd.concat([added, second['added']]) if not added.empty else second['added']
+
+    return {'updated': updated, 'added': added, 'deleted': deleted, 'deleted_ids': deleted_ids}
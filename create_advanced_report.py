@@ -5,6 +5,11 @@ from openpyxl.chart import LineChart, PieChart, BarChart, Reference
 from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.worksheet.table import Table, TableStyleInfo
 from datetime import datetime
+import monthly_cube
+from monthly_cube import ENG_COLUMNS
+from flow_filter import load_rules, compute_flow_filter, excel_formula
+from flow_filter import ENG_COLUMNS as FLOW_ENG_COLUMNS
+from data_normalize import make_tx_ids
 
 INPUT_FILE = r"c:\Users\JTC7\Desktop\01.Python Project\01.Personal Expense Tracker\01.Document\2024-12-10~2025-12-10.xlsx"
 OUTPUT_FILE = r"c:\Users\JTC7\Desktop\01.Python Project\01.Personal Expense Tracker\01.Document\{date}_가계부_전문분석보고서.xlsx".format(
@@ -62,8 +67,12 @@ def create_advanced_excel_report():
     clean_df.columns = ['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모']
     
     # Add Flow_Filter placeholder (will add formula)
+    rules = load_rules()
     clean_df['Flow_Filter'] = 1  # Default to 1 (normal transaction)
     
+    # Stable transaction IDs (column K), content-derived like data_normalize.assign_tx_ids
+    clean_df['Tx_ID'] = make_tx_ids(clean_df)
+    
     # Write headers
     for c_idx, col_name in enumerate(clean_df.columns, 1):
         cell = ws_data.cell(row=1, column=c_idx, value=col_name)
@@ -85,17 +94,15 @@ def create_advanced_excel_report():
                 cell.value = float(value) if pd.notna(value) else 0
                 cell.number_format = '#,##0'
             elif c_idx == 10:  # Flow_Filter column
-                # Formula to determine if transaction is special (0) or normal (1)
-                # Logic: IF main_category is '이동' AND sub_category is '이체', OR memo contains keywords -> 0, else 1
-                formula = f'=IF(OR(AND(D{r_idx}="이동",E{r_idx}="이체"),OR(ISNUMBER(SEARCH("투자",I{r_idx})),ISNUMBER(SEARCH("이체",I{r_idx})),ISNUMBER(SEARCH("충전",I{r_idx})))),0,1)'
-                cell.value = formula
+                # Formula to determine if transaction is special (0) or normal (1), same rules as flow_filter.py
+                cell.value = excel_formula(r_idx, rules)
             else:
                 cell.value = value if pd.notna(value) else ""
             cell.font = normal_font
     
     # Convert to Table
     last_row = len(clean_df) + 1
-    table_ref = f"A1:J{last_row}"
+    table_ref = f"A1:K{last_row}"
     table = Table(displayName="T_RawData", ref=table_ref)
     style = TableStyleInfo(
         name="TableStyleMedium9",
@@ -137,18 +144,18 @@ def create_advanced_excel_report():
     ws_pivot['B4'] = "월별 재정 요약"
     ws_pivot['B4'].font = Font(size=13, bold=True, color=ACCENT_COLOR, name="맑은 고딕")
     
-    # Filter out special transactions for pivot
-    # In real scenario, Flow_Filter would be calculated. We'll simulate manually
-    special_keywords = ['투자', '이체', '충전']
-    df['is_special'] = df.apply(
-        lambda x: (x['main_category'] == '이동' and x['sub_category'] == '이체') or 
-                  any(keyword in str(x['memo']) for keyword in special_keywords),
-        axis=1
-    )
+    # Filter out special transactions for pivot (Flow_Filter 0 from the rule engine)
+    df['is_special'] = compute_flow_filter(df, rules, columns=FLOW_ENG_COLUMNS) == 0
     
     normal_df = df[~df['is_special']].copy()
     
-    monthly_pivot = normal_df.groupby([normal_df['date'].dt.to_period('M'), 'type'])['amount'].sum().unstack(fill_value=0)
+    # Monthly aggregate cube (special transactions -> Flow_Filter 0); the pivots below read from it
+    cube = monthly_cube.build_cube(df.assign(Flow_Filter=(~df['is_special']).astype(int)), columns=ENG_COLUMNS)
+    normal_cube = monthly_cube.slice_cube(cube, active=True)
+    
+    # Months with data only, like the former to_period('M') groupby
+    monthly_pivot = monthly_cube.monthly_pivot(normal_cube, fill_months=False).rename_axis(index='date', columns=None)
+    monthly_pivot.index = monthly_pivot.index.to_period('M')
     if '수입' not in monthly_pivot.columns:
         monthly_pivot['수입'] = 0
     if '지출' not in monthly_pivot.columns:
@@ -184,8 +191,8 @@ def create_advanced_excel_report():
     ws_pivot[f'B{pivot_start_row}'].font = Font(size=13, bold=True, color=ACCENT_COLOR, name="맑은 고딕")
     
     if not expense_df.empty:
-        cat_pivot = expense_df.groupby(['main_category', 'sub_category'])['amount'].sum().reset_index()
-        cat_pivot = cat_pivot.sort_values('amount', ascending=False)
+        cat_pivot = monthly_cube.category_totals(normal_cube, ['대분류', '소분류'], '지출')[['대분류', '소분류', '금액']]
+        cat_pivot = cat_pivot.sort_values('금액', ascending=False)
         cat_pivot.columns = ['대분류', '소분류', '총 지출액']
         
         # Write category pivot
@@ -306,7 +313,7 @@ def create_advanced_excel_report():
     
     # Category Pie Chart
     if not expense_df.empty:
-        cat_summary = expense_df.groupby('main_category')['amount'].sum().reset_index()
+        cat_summary = monthly_cube.category_totals(normal_cube, '대분류', '지출').rename(columns={'대분류': 'main_category', '금액': 'amount'})
         cat_summary = cat_summary.sort_values('amount', ascending=False)
         
         cat_data_row = chart_data_row
@@ -349,9 +356,9 @@ def create_advanced_excel_report():
     
     if not special_df.empty:
         # Monthly investment summary
-        monthly_invest = special_df.groupby(special_df['date'].dt.to_period('M'))['amount'].sum().reset_index()
-        monthly_invest['월'] = monthly_invest['date'].astype(str)
-        monthly_invest = monthly_invest[['월', 'amount']]
+        monthly_invest = monthly_cube.slice_cube(cube, active=False).groupby('월')['금액'].sum().reset_index()
+        monthly_invest['월'] = monthly_invest['월'].dt.strftime('%Y-%m')
+        monthly_invest = monthly_invest[['월', '금액']]
         monthly_invest.columns = ['월', '총 이동/투자액']
         
         # Write data
@@ -7,6 +7,8 @@ from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.chart import BarChart, PieChart, Reference
 from openpyxl.utils import get_column_letter
 from datetime import datetime
+import monthly_cube
+from monthly_cube import ENG_COLUMNS
 
 # ===== DATA LOADING =====
 def load_data_from_google_sheets():
@@ -106,15 +108,19 @@ def create_excel_dashboard():
     # ===== KPI Section =====
     print("📈 KPI 계산 중...")
     
-    total_income = df[df['type'] == '수입']['amount'].sum()
-    total_expense = df[df['type'] == '지출']['amount'].sum()
+    # All totals below are read from the monthly aggregate cube
+    cube = monthly_cube.build_cube(df, columns=ENG_COLUMNS)
+    
+    total_income = cube.loc[cube['구분'] == '수입', '금액'].sum()
+    total_expense = cube.loc[cube['구분'] == '지출', '금액'].sum()
     net_income = total_income - total_expense
     
     # Find top category
     expense_df = df[df['type'] == '지출']
-    if not expense_df.empty:
-        top_cat = expense_df.groupby('main_category')['amount'].sum().idxmax()
-        top_cat_amount = expense_df.groupby('main_category')['amount'].sum().max()
+    category_totals = monthly_cube.category_totals(cube, '대분류', '지출')
+    if not category_totals.empty:
+        top_cat = category_totals['대분류'].iloc[0]
+        top_cat_amount = category_totals['금액'].iloc[0]
     else:
         top_cat = "N/A"
         top_cat_amount = 0
@@ -190,8 +196,9 @@ def create_excel_dashboard():
     # ===== Monthly Trend Data & Chart =====
     print("📊 월별 데이터 집계 중...")
     
-    monthly_data = df.groupby([pd.Grouper(key='date', freq='ME'), 'type'])['amount'].sum().reset_index()
-    monthly_pivot = monthly_data.pivot(index='date', columns='type', values='amount').fillna(0)
+    # Every month from the first to the last (empty months as 0), labelled by month start;
+    # the former Grouper(freq='ME') table used month ends, only shown as YYYY-MM here
+    monthly_pivot = monthly_cube.monthly_pivot(cube).rename_axis(index='date', columns=None)
     
     if '수입' not in monthly_pivot.columns:
         monthly_pivot['수입'] = 0
@@ -265,7 +272,7 @@ def create_excel_dashboard():
     ws.merge_cells(start_row=chart_start, start_column=cat_start_col, end_row=chart_start, end_column=cat_start_col+3)
     
     if not expense_df.empty:
-        category_expense = expense_df.groupby('main_category')['amount'].sum().reset_index()
+        category_expense = category_totals.rename(columns={'대분류': 'main_category', '금액': 'amount'})
         category_expense = category_expense.sort_values('amount', ascending=False).head(10)
         
         # Write category data for pie chart
@@ -298,7 +305,7 @@ def create_excel_dashboard():
         ws.cell(row=sub_start_row, column=cat_start_col).font = Font(size=12, bold=True, color=HEADER_COLOR, name="맑은 고딕")
         ws.merge_cells(start_row=sub_start_row, start_column=cat_start_col, end_row=sub_start_row, end_column=cat_start_col+3)
         
-        sub_expense = expense_df.groupby('sub_category')['amount'].sum().reset_index()
+        sub_expense = monthly_cube.category_totals(cube, '소분류', '지출').rename(columns={'소분류': 'sub_category', '금액': 'amount'})
         sub_expense = sub_expense.sort_values('amount', ascending=False).head(5)
         
         # Write sub-category data
@@ -404,8 +411,9 @@ def create_excel_dashboard():
         ws_month[f'B{summary_row}'].font = Font(size=13, bold=True, color=ACCENT_COLOR, name="맑은 고딕")
         ws_month.merge_cells(f'B{summary_row}:D{summary_row}')
         
-        income_sum = month_df[month_df['type'] == '수입']['amount'].sum()
-        expense_sum = month_df[month_df['type'] == '지출']['amount'].sum()
+        month_totals = monthly_pivot[monthly_pivot['date'] == month_period].iloc[0]
+        income_sum = month_totals['수입']
+        expense_sum = month_totals['지출']
         
         # Income
         ws_month[f'B{summary_row+2}'] = "💰 수입"
@@ -5,6 +5,8 @@ from openpyxl.utils import get_column_letter
 from openpyxl.worksheet.table import Table, TableStyleInfo
 from openpyxl.chart import LineChart, PieChart, BarChart, Reference
 from datetime import datetime
+from flow_filter import load_rules, excel_formula
+from data_normalize import make_tx_ids
 
 INPUT_FILE = r"c:\Users\JTC7\Desktop\01.Python Project\01.Personal Expense Tracker\01.Document\2024-12-10~2025-12-10.xlsx"
 OUTPUT_FILE = r"c:\Users\JTC7\Desktop\01.Python Project\01.Personal Expense Tracker\01.Document\{date}_수식연결_가계부엔진.xlsx".format(
@@ -34,6 +36,12 @@ def create_formula_linked_report():
     # Add row tracking for T_RawData reference (row 3 is first data row)
     df['raw_row'] = range(3, 3 + len(df))
     
+    # Stable transaction IDs (column K), content-derived like data_normalize.assign_tx_ids
+    df['tx_id'] = make_tx_ids(pd.DataFrame({
+        '날짜': df['date'], '시간': df['time'], '구분': df['type'],
+        '내용': df['merchant'], '금액': df['amount'], '결제수단': df['payment_method'],
+    }))
+    
     print(f"Loaded {len(df)} transactions")
     
     # Get months
@@ -67,7 +75,7 @@ def create_formula_linked_report():
     ws_raw.row_dimensions[1].height = 25
     
     # Prepare data with Flow_Filter
-    columns = ['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모', 'Flow_Filter']
+    columns = ['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모', 'Flow_Filter', 'Tx_ID']
     
     # Write headers
     for col_idx, col_name in enumerate(columns, 1):
@@ -81,6 +89,7 @@ def create_formula_linked_report():
         )
     
     # Write data with ACTUAL date values (not strings)
+    rules = load_rules()
     for idx, row in enumerate(df.itertuples(), 3):
         # Store as actual date object
         ws_raw.cell(row=idx, column=1, value=row.date)
@@ -96,10 +105,11 @@ def create_formula_linked_report():
         ws_raw.cell(row=idx, column=8, value=row.payment_method)
         ws_raw.cell(row=idx, column=9, value=row.memo)
         
-        # Flow_Filter Formula
+        # Flow_Filter Formula (generated from the rule set in flow_filter.py)
         # Logic: IF main='이동' AND (sub='이체' OR sub='투자') OR memo contains keywords -> 0, else 1
-        formula = f'=IF(OR(AND(D{idx}="이동",OR(E{idx}="이체",E{idx}="투자")),OR(ISNUMBER(SEARCH("투자",I{idx})),ISNUMBER(SEARCH("이체",I{idx})),ISNUMBER(SEARCH("충전",I{idx})))),0,1)'
+        formula = excel_formula(idx, rules)
         ws_raw.cell(row=idx, column=10, value=formula)
+        ws_raw.cell(row=idx, column=11, value=row.tx_id)
         
         # Add internal transfer/investment indicator in memo if applicable
         if (row.main_category == '이동' and row.sub_category == '이체'):
@@ -111,7 +121,7 @@ def create_formula_linked_report():
             if '내부거래' not in current_memo:
                 ws_raw.cell(row=idx, column=9, value=f'[내부거래-투자] {current_memo}'.strip())
         
-        for col_idx in range(1, 11):
+        for col_idx in range(1, 12):
             ws_raw.cell(row=idx, column=col_idx).font = Font(name="맑은 고딕", size=9)
             ws_raw.cell(row=idx, column=col_idx).border = Border(
                 left=Side(style='thin'), right=Side(style='thin'),
@@ -121,7 +131,7 @@ def create_formula_linked_report():
     last_data_row = len(df) + 2
     
     # Convert to Table
-    table_ref = f"A2:J{last_data_row}"
+    table_ref = f"A2:K{last_data_row}"
     table = Table(displayName="T_RawData", ref=table_ref)
     style = TableStyleInfo(
         name="TableStyleMedium9",
@@ -134,7 +144,7 @@ def create_formula_linked_report():
     ws_raw.add_table(table)
     
     # Auto-fit columns
-    for col_idx, width in enumerate([12, 10, 8, 12, 12, 20, 15, 15, 25, 10], 1):
+    for col_idx, width in enumerate([12, 10, 8, 12, 12, 20, 15, 15, 25, 10, 14], 1):
         ws_raw.column_dimensions[get_column_letter(col_idx)].width = width
     
     ws_raw.freeze_panes = "A3"
@@ -6,6 +6,12 @@ from datetime import datetime, timedelta
 import numpy as np
 import gspread
 from google.oauth2.service_account import Credentials
+import monthly_cube
+from monthly_cube import ENG_COLUMNS
+from date_index import DateIndex
+from sheet_ranges import column_ranges, stitch_blocks, header_positions
+from revision_cache import RevisionCache
+from snapshot_cache import content_token
 
 # Page Configuration
 st.set_page_config(page_title="재정 상태 통합 대시보드", layout="wide", initial_sidebar_state="collapsed")
@@ -35,35 +41,46 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Columns of DB_Raw the dashboard uses (only these are requested)
+DASHBOARD_COLUMNS = ['date', 'type', 'main_category', 'sub_category', 'amount', 'payment_method', 'merchant', 'memo']
+
+# Data sources
+SCOPES = [
+    'https://www.googleapis.com/auth/spreadsheets.readonly',
+    'https://www.googleapis.com/auth/drive.readonly'
+]
+SERVICE_ACCOUNT_FILE = r"C:\Users\JTC7\Desktop\01.Python Project\01.Personal Expense Tracker\service_account.json"
+SPREADSHEET_ID = "1DqpTecTdpRKsXTPImM4iKPT2V-KeJixG85-K6MuLOWY"
+EXCEL_FILE = r"c:\Users\JTC7\Desktop\01.Python Project\01.Personal Expense Tracker\01.Document\2024-12-07~2025-12-07_v5_LinkDB.xlsx"
+# Seconds a change-token check is reused (reruns within this window don't ask Drive)
+TOKEN_CHECK_INTERVAL = 10
+
+# Authorized spreadsheet handle, shared by the token checks and the loads
+@st.cache_resource
+def get_spreadsheet():
+    creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
+    client = gspread.authorize(creds)
+    return client.open_by_key(SPREADSHEET_ID)
+
+def data_revision():
+    """Change token of the data source: the spreadsheet's modifiedTime, else the Excel fallback's content hash."""
+    try:
+        return ('sheet', get_spreadsheet().get_lastUpdateTime())
+    except Exception:
+        return ('excel', content_token(EXCEL_FILE))
+
 # Load Data from Google Sheets
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def load_data():
+def fetch_data():
     try:
-        # Google Sheets credentials
-        SCOPES = [
-            'https://www.googleapis.com/auth/spreadsheets.readonly',
-            'https://www.googleapis.com/auth/drive.readonly'
-        ]
-        
-        # Service account JSON path
-        SERVICE_ACCOUNT_FILE = r"C:\Users\JTC7\Desktop\01.Python Project\01.Personal Expense Tracker\service_account.json"
-        
-        # Authenticate
-        creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=SCOPES)
-        client = gspread.authorize(creds)
-        
-        # Open spreadsheet
-        SPREADSHEET_ID = "1DqpTecTdpRKsXTPImM4iKPT2V-KeJixG85-K6MuLOWY"
-        spreadsheet = client.open_by_key(SPREADSHEET_ID)
-        
         # Get DB_Raw sheet
-        sheet = spreadsheet.worksheet("DB_Raw")
-        
-        # Get all values
-        data = sheet.get_all_values()
+        sheet = get_spreadsheet().worksheet("DB_Raw")
         
-        # Convert to DataFrame
-        df = pd.DataFrame(data[1:], columns=data[0])
+        # Header row, then only the dashboard's columns (one batch_get, one range per run of adjacent columns)
+        positions = header_positions(sheet.row_values(1), DASHBOARD_COLUMNS)
+        by_position = {pos: name for name, pos in positions.items()}
+        ranges = column_ranges(positions.values(), 2)
+        blocks = sheet.batch_get([r for r, _ in ranges])
+        df = stitch_blocks(blocks, [[by_position[p] for p in run] for _, run in ranges])
         
         # Data cleaning
         df['date'] = pd.to_datetime(df['date'], errors='coerce')
@@ -82,16 +99,45 @@ def load_data():
         st.info("로컬 Excel 파일로 전환합니다...")
         
         # Fallback to local Excel file
-        file_path = r"c:\Users\JTC7\Desktop\01.Python Project\01.Personal Expense Tracker\01.Document\2024-12-07~2025-12-07_v5_LinkDB.xlsx"
-        df = pd.read_excel(file_path, sheet_name="DB_Raw", engine='openpyxl')
+        df = pd.read_excel(EXCEL_FILE, sheet_name="DB_Raw", engine='openpyxl',
+                           usecols=lambda c: c in DASHBOARD_COLUMNS)
         df['date'] = pd.to_datetime(df['date'], errors='coerce')
         df['amount'] = pd.to_numeric(df['amount'], errors='coerce')
         df = df.dropna(subset=['date', 'amount', 'type'])
         df = df.sort_values('date')
         return df
 
+# The loaded frame is refetched only when the change token moved (not every 5 minutes)
+@st.cache_resource
+def get_data_cache():
+    return RevisionCache(data_revision, fetch_data, check_interval=TOKEN_CHECK_INTERVAL)
+
+def load_data():
+    return get_data_cache().get()
+
+# Monthly aggregate cube of the full ledger (charts over all months read from it).
+# Built from the frame passed in (_df: not hashed), keyed by the data cache's version: rebuilt only after a refetch
+@st.cache_data(max_entries=1)
+def load_cube(version, _df):
+    return monthly_cube.build_cube(_df, columns=ENG_COLUMNS)
+
+# Sorted date index: current / previous period rows are binary-searched slices
+@st.cache_data(max_entries=1)
+def load_date_index(version, _df):
+    return DateIndex(_df['date'])
+
 try:
+    cache = get_data_cache()
     df = load_data()
+    if df is None or df.empty:
+        raise ValueError("불러온 데이터가 없습니다")
+    if df is cache.value:
+        cube = load_cube(cache.version, df)
+        date_index = load_date_index(cache.version, df)
+    else:
+        # Refetched by another session meanwhile: built directly, never stored under a version it doesn't match
+        cube = monthly_cube.build_cube(df, columns=ENG_COLUMNS)
+        date_index = DateIndex(df['date'])
 except Exception as e:
     st.error(f"데이터 로드 실패: {e}")
     st.stop()
@@ -116,17 +162,17 @@ with col_preset:
     
     if preset_options[selected_preset] is not None:
         days = preset_options[selected_preset]
-        end_date = df['date'].max()
+        end_date = date_index.max()
         start_date = end_date - pd.Timedelta(days=days)
     else:
-        start_date = df['date'].min()
-        end_date = df['date'].max()
+        start_date = date_index.min()
+        end_date = date_index.max()
 
 with col_custom:
     # Custom date range
     if selected_preset == "전체":
-        min_date = df['date'].min().date()
-        max_date = df['date'].max().date()
+        min_date = date_index.min().date()
+        max_date = date_index.max().date()
         custom_range = st.date_input(
             "사용자 정의 기간",
             [min_date, max_date],
@@ -158,15 +204,17 @@ with col_payment:
     )
 
 # Filter data
-mask = (df['date'] >= start_date) & (df['date'] <= end_date)
-filtered_df = df[mask].copy()
+filtered_df = date_index.slice_between(df, start_date, end_date).copy()
 
 if "전체" not in selected_payments:
     filtered_df = filtered_df[filtered_df['payment_method'].isin(selected_payments)]
 
+# Day-granular period + payment filter -> aggregate the selected rows once into a small cube
+filtered_cube = monthly_cube.build_cube(filtered_df, columns=ENG_COLUMNS)
+
 # Calculate current period KPIs
-total_income = filtered_df[filtered_df['type'] == '수입']['amount'].sum()
-total_expense = filtered_df[filtered_df['type'] == '지출']['amount'].sum()
+total_income = filtered_cube.loc[filtered_cube['구분'] == '수입', '금액'].sum()
+total_expense = filtered_cube.loc[filtered_cube['구분'] == '지출', '금액'].sum()
 net_income = total_income - total_expense
 
 # Calculate previous period for MoM comparison
@@ -174,11 +222,10 @@ period_days = (end_date - start_date).days
 prev_start = start_date - pd.Timedelta(days=period_days)
 prev_end = start_date
 
-prev_mask = (df['date'] >= prev_start) & (df['date'] < prev_end)
-prev_df = df[prev_mask]
+prev_cube = monthly_cube.build_cube(date_index.slice_between(df, prev_start, prev_end, end_inclusive=False), columns=ENG_COLUMNS)
 
-prev_income = prev_df[prev_df['type'] == '수입']['amount'].sum()
-prev_expense = prev_df[prev_df['type'] == '지출']['amount'].sum()
+prev_income = prev_cube.loc[prev_cube['구분'] == '수입', '금액'].sum()
+prev_expense = prev_cube.loc[prev_cube['구분'] == '지출', '금액'].sum()
 prev_net = prev_income - prev_expense
 
 # Calculate deltas
@@ -187,9 +234,10 @@ expense_delta = total_expense - prev_expense
 net_delta = net_income - prev_net
 
 # Top expense category
-if not filtered_df[filtered_df['type'] == '지출'].empty:
-    top_category = filtered_df[filtered_df['type'] == '지출'].groupby('main_category')['amount'].sum().idxmax()
-    top_category_amount = filtered_df[filtered_df['type'] == '지출'].groupby('main_category')['amount'].sum().max()
+category_expense_all = monthly_cube.category_totals(filtered_cube, '대분류', '지출')
+if not category_expense_all.empty:
+    top_category = category_expense_all['대분류'].iloc[0]
+    top_category_amount = category_expense_all['금액'].iloc[0]
 else:
     top_category = "N/A"
     top_category_amount = 0
@@ -243,8 +291,9 @@ with col_left:
     st.markdown("### 📈 재정 흐름 분석 (시간)")
     
     # Monthly trend chart - USE FULL DATA (df) to show all 12 months
-    monthly_data = df.groupby([pd.Grouper(key='date', freq='ME'), 'type'])['amount'].sum().reset_index()
-    monthly_pivot = monthly_data.pivot(index='date', columns='type', values='amount').fillna(0)
+    # Every month from the first to the last (empty months as 0), labelled by month start;
+    # the former Grouper(freq='ME') table used month ends, only shown as YYYY-MM here
+    monthly_pivot = monthly_cube.monthly_pivot(cube).rename_axis(index='date', columns=None)
     
     if '수입' not in monthly_pivot.columns:
         monthly_pivot['수입'] = 0
@@ -324,7 +373,7 @@ with col_right:
     expense_df = filtered_df[filtered_df['type'] == '지출']
     
     if not expense_df.empty:
-        category_expense = expense_df.groupby('main_category')['amount'].sum().reset_index()
+        category_expense = category_expense_all.rename(columns={'대분류': 'main_category', '금액': 'amount'})
         category_expense = category_expense.sort_values('amount', ascending=False)
         
         
@@ -362,7 +411,7 @@ with col_right:
         # Top 5 sub-categories
         st.markdown("#### 상위 5개 세부 카테고리")
         
-        sub_expense = expense_df.groupby('sub_category')['amount'].sum().reset_index()
+        sub_expense = monthly_cube.category_totals(filtered_cube, '소분류', '지출').rename(columns={'소분류': 'sub_category', '금액': 'amount'})
         sub_expense = sub_expense.sort_values('amount', ascending=False).head(5)
         
         
@@ -1,8 +1,14 @@
 import pandas as pd
 import gspread
+from gspread.utils import rowcol_to_a1, absolute_range_name
 from oauth2client.service_account import ServiceAccountCredentials
+from data_normalize import EXPECTED_COLS, pad_rows, normalize_frame, compact_frame, expand_frame, assign_tx_ids
 from datetime import datetime
 import os
+import time
+import threading
+from sheets_scheduler import SheetsScheduler
+from sheet_ranges import column_letter, column_ranges, stitch_blocks
 
 # Configuration
 GSHEET_NAME = '20251214_수식연결_가계부엔진_최종' # The discovered sheet name
@@ -25,6 +31,36 @@ COL_MAP_ENG_TO_KOR = {
 }
 COL_MAP_KOR_TO_ENG = {v: k for k, v in COL_MAP_ENG_TO_KOR.items()}
 
+# Data rows start at A3 (Row 1: Title, Row 2: Headers)
+DATA_START_ROW = 3
+
+# Columns of the sheet (A:K); Is_Active is derived, never stored
+SHEET_COLUMNS = [c for c in EXPECTED_COLS if c != 'Is_Active']
+
+# Last grid we know the sheet holds (set by load_data / save_data), used for incremental saves.
+# index: the frame labels of those rows (label -> sheet row DATA_START_ROW + position), used by save_changes
+# header: the header row (row 2) as found in the sheet
+_LAST_SYNCED = {'columns': None, 'rows': None, 'index': None, 'header': None}
+
+# Stats of the last save_data call: mode, cells_sent, baseline_cells (full rewrite)
+LAST_SAVE_STATS = {}
+
+# Process-wide pool of the authorized client and resolved Worksheet handles
+TOKEN_LIFETIME = 3600 # Google access tokens are valid for 1 hour
+TOKEN_REFRESH_MARGIN = 300 # Re-authorize 5 minutes before expiry
+_POOL = {'client': None, 'authorized_at': 0, 'worksheets': {}}
+_POOL_LOCK = threading.RLock()
+
+# handshakes: real authorizations, handshakes_saved: reuses of the pooled client,
+# lookups_saved: reuses of a resolved Worksheet (skips client.open + worksheet lookup), reconnects: auth-error recoveries
+POOL_STATS = {'handshakes': 0, 'handshakes_saved': 0, 'lookups_saved': 0, 'reconnects': 0}
+
+# Every API request goes through the scheduler: rate limit per spreadsheet, backoff on 429 / 5xx,
+# value writes inside SCHEDULER.batch(GSHEET_NAME) merged into one values_batch_update.
+# SCHEDULER.stats / SCHEDULER.queue_depth() report what it did.
+SCHEDULER = SheetsScheduler()
+READ_METHODS = {'get_all_values', 'get_values', 'batch_get', 'get', 'row_values', 'col_values', 'acell', 'cell'}
+
 def connect_gsheet():
     """Connects to Google Sheets using credentials from Streamlit Cloud secrets or local file."""
     try:
@@ -53,32 +89,141 @@ def connect_gsheet():
         print(f"Authentication Error: {e}")
         return None
 
-def load_data():
+def _token_expiring(client, authorized_at):
+    """True if the pooled client's access token is about to expire."""
+    creds = getattr(client, 'auth', None) or getattr(getattr(client, 'http_client', None), 'auth', None)
+    expiry = getattr(creds, 'expiry', None) or getattr(creds, 'token_expiry', None)
+    if expiry is not None:
+        # google-auth / oauth2client both store a naive UTC datetime
+        return (expiry - datetime.utcnow()).total_seconds() < TOKEN_REFRESH_MARGIN
+    return time.time() - authorized_at > TOKEN_LIFETIME - TOKEN_REFRESH_MARGIN
+
+def get_client(force_reconnect=False):
+    """Returns the pooled, authorized gspread client (re-authorizes before the token expires)."""
+    with _POOL_LOCK:
+        client = _POOL['client']
+        if client is not None and not force_reconnect and not _token_expiring(client, _POOL['authorized_at']):
+            POOL_STATS['handshakes_saved'] += 1
+            return client
+        
+        client = connect_gsheet()
+        if client is None:
+            return None
+        POOL_STATS['handshakes'] += 1
+        _POOL['client'] = client
+        _POOL['authorized_at'] = time.time()
+        # Worksheet handles hold the old session, resolve them again
+        _POOL['worksheets'] = {}
+        return client
+
+def get_worksheet(name=WORKSHEET_NAME):
     """
-    Loads data from Google Sheet.
+    Returns the pooled Worksheet handle (None if not connected).
+    Open Worksheet (Try 'T_RawData', else 'Sheet1', else First)
     """
-    client = connect_gsheet()
-    if not client:
-        return pd.DataFrame()
-
-    try:
+    client = get_client()
+    if client is None:
+        return None
+        
+    with _POOL_LOCK:
+        ws = _POOL['worksheets'].get(name)
+        if ws is not None:
+            POOL_STATS['lookups_saved'] += 1
+            return ws
+        
         # Open Spreadsheet
         sh = client.open(GSHEET_NAME)
-        
-        # Open Worksheet (Try 'T_RawData', else 'Sheet1', else First)
         try:
-            ws = sh.worksheet(WORKSHEET_NAME)
+            ws = sh.worksheet(name)
         except:
             try:
                 ws = sh.worksheet('Sheet1')
             except:
                 ws = sh.get_worksheet(0)
-                  
-        # Robust Read: Use get_all_values to avoid header errors
-        rows = ws.get_all_values()
+        _POOL['worksheets'][name] = ws
+        return ws
+
+def reset_pool():
+    with _POOL_LOCK:
+        _POOL['client'] = None
+        _POOL['authorized_at'] = 0
+        _POOL['worksheets'] = {}
+
+def _is_auth_error(e):
+    if isinstance(e, gspread.exceptions.APIError):
+        return getattr(e.response, 'status_code', None) == 401
+    return type(e).__name__ in ('RefreshError', 'AccessTokenRefreshError', 'HttpAccessTokenRefreshError')
+
+def _with_worksheet(fn):
+    """fn(ws) on the pooled Worksheet handle, reconnecting once on auth errors."""
+    ws = get_worksheet()
+    if ws is None:
+        raise ConnectionError("Google Sheets not connected")
+    try:
+        return fn(ws)
+    except Exception as e:
+        if not _is_auth_error(e):
+            raise
+        POOL_STATS['reconnects'] += 1
+        reset_pool()
+        ws = get_worksheet()
+        if ws is None:
+            raise
+        return fn(ws)
+
+def _send_values(data):
+    """One values_batch_update for value ranges [{'range': 'A3:K5', 'values': [...]}] (RAW, like ws.update)."""
+    def send(ws):
+        body = {
+            'valueInputOption': 'RAW',
+            'data': [{'range': absolute_range_name(ws.title, d['range']), 'values': d['values']} for d in data],
+        }
+        return ws.spreadsheet.values_batch_update(body)
+    return _with_worksheet(send)
+
+def _ws_call(method, *args, **kwargs):
+    """
+    Calls a Worksheet method through the request scheduler (rate limit, retry with backoff),
+    reconnecting once on auth errors. Value writes ('update' / 'batch_update') are queued
+    while a SCHEDULER.batch is open and merged with the adjacent ones.
+    """
+    if method == 'update' and not kwargs:
+        # ws.update(range, values) (old argument order) or ws.update(values, range)
+        range_name, values = args if isinstance(args[0], str) else args[::-1]
+        return SCHEDULER.write_values(GSHEET_NAME, [{'range': range_name, 'values': values}], _send_values)
+    if method == 'batch_update' and not kwargs:
+        return SCHEDULER.write_values(GSHEET_NAME, list(args[0]), _send_values)
+    
+    # Anything else: queued value writes go first, so requests keep their order
+    SCHEDULER.flush(GSHEET_NAME)
+    return SCHEDULER.run(GSHEET_NAME, lambda: _with_worksheet(lambda ws: getattr(ws, method)(*args, **kwargs)),
+                         write=method not in READ_METHODS)
+
+def change_token():
+    """
+    Cheap change token for revision-validated caches (revision_cache.py): the spreadsheet's Drive
+    modifiedTime (one metadata request, no cell data). Changes with every edit, ours included.
+    """
+    SCHEDULER.flush(GSHEET_NAME)
+    return SCHEDULER.run(GSHEET_NAME, lambda: _with_worksheet(lambda ws: ws.spreadsheet.get_lastUpdateTime()),
+                         write=False)
+
+def load_data(compact=False, columns=None, since_row=None):
+    """
+    Loads data from Google Sheet.
+    compact=True returns the compact typed schema (see data_normalize.compact_frame).
+    columns: request only these columns (e.g. ['날짜', '구분', '대분류', '금액', 'Flow_Filter']);
+    since_row: request only the data rows after the first since_row ones (e.g. rows appended since
+    the last sync). Both are served by one batch_get (see load_rows).
+    """
+    if columns is not None or since_row is not None:
+        return load_rows(columns, since_row, compact)
+    try:
+        # Only the T_RawData columns (A:K) are requested; the title row is a single cell
+        rows = _ws_call('batch_get', [f"A1:{column_letter(len(SHEET_COLUMNS) - 1)}"])[0]
         
         if not rows or len(rows) < 2:
-            return pd.DataFrame(columns=['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모', 'Flow_Filter', 'Is_Active'])
+            return pd.DataFrame(columns=EXPECTED_COLS)
               
         # ENFORCE SCHEMA (Hardcoded)
         # We assume the data starts from some row, but let's try to detect START of data or header.
@@ -87,7 +232,8 @@ def load_data():
         
         header_row_idx = 0
         for i, r in enumerate(rows[:5]):
-             if '날짜' in str(r[0]) or 'Date' in str(r[0]):
+             first = str(r[0]) if r else ""  # batch_get rows are ragged (trailing empty cells dropped)
+             if '날짜' in first or 'Date' in first:
                  header_row_idx = i
                  break
                  
@@ -96,20 +242,10 @@ def load_data():
         
         # Manually construct DataFrame with Fixed Columns
         # Standard GSheet/Excel Structure for this project:
-        # 0: 날짜, 1: 시간, 2: 구분, 3: 대분류, 4: 소분류, 5: 내용, 6: 금액, 7: 결제수단, 8: 메모, 9: Flow_Filter, 10: Is_Active (Maybe)
-        
-        expected_cols = ['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모', 'Flow_Filter', 'Is_Active']
+        # 0: 날짜, 1: 시간, 2: 구분, 3: 대분류, 4: 소분류, 5: 내용, 6: 금액, 7: 결제수단, 8: 메모, 9: Flow_Filter, 10: Tx_ID
         
-        # Pad rows if they are short
-        cleaned_data = []
-        for r in data_rows:
-            # Ensure row has enough items
-            while len(r) < len(expected_cols):
-                r.append("")
-            # Truncate if too long (optional, but safer to keep)
-            cleaned_data.append(r[:len(expected_cols)])
-            
-        df = pd.DataFrame(cleaned_data, columns=expected_cols)
+        # Pad short rows / truncate long ones (vectorized)
+        df = pad_rows(data_rows, EXPECTED_COLS)
         
         # Remove empty rows (where Date is empty)
         df = df[df['날짜'].astype(str).str.strip() != ""]
@@ -119,134 +255,332 @@ def load_data():
         if 'date' in df.columns:
             df = df.rename(columns=COL_MAP_ENG_TO_KOR)
             
-        # Type Conversion
-        if '날짜' in df.columns:
-            df['날짜'] = pd.to_datetime(df['날짜'], errors='coerce')
-            
-        def parse_time(val):
-            if pd.isna(val) or val == "": return None
-            if isinstance(val, str):
-                try: return pd.to_datetime(val, format='%H:%M:%S').time()
-                except: 
-                    try: return pd.to_datetime(val).time()
-                    except: return None
-            return val
-            
-        if '시간' in df.columns:
-            df['시간'] = df['시간'].apply(parse_time)
+        # Type Conversion (shared with the Excel loader)
+        df = normalize_frame(df)
             
-        if '금액' in df.columns:
-            # Remove commas if string
-            if df['금액'].dtype == object:
-                 df['금액'] = df['금액'].astype(str).str.replace(',', '')
-            df['금액'] = pd.to_numeric(df['금액'], errors='coerce').fillna(0)
-            
-        if 'Flow_Filter' in df.columns:
-            df['Is_Active'] = df['Flow_Filter'].apply(lambda x: str(x).strip()== '1')
-        elif 'Is_Active' in df.columns:
-            # Already boolean or string?
-            # GSheet stores TRUE/FALSE as boolean usually
-            df['Flow_Filter'] = df['Is_Active'].apply(lambda x: 1 if x else 0)
+        # Remember what the sheet holds for incremental saves.
+        # Only valid if data starts at A3 and no blank rows were dropped (positions match sheet rows).
+        if header_row_idx == DATA_START_ROW - 2 and len(df) == len(data_rows):
+            _remember_synced(*_to_sheet_rows(df), index=df.index)
+            _LAST_SYNCED['header'] = [str(v) for v in rows[header_row_idx]]
         else:
-            df['Is_Active'] = True
-            df['Flow_Filter'] = 1
+            _LAST_SYNCED['rows'] = None
+            _LAST_SYNCED['index'] = None
+            
+        # Rows without a Tx_ID get one now (after the snapshot, so the next save writes them to column K)
+        df = assign_tx_ids(df)
+        
+        # Display order is made here, at read time: the sheet keeps rows in insertion order
+        # (quick entries are appended at the end), labels stay the sheet positions.
+        df = df.sort_values(by=['날짜', '시간'], ascending=[False, False], kind='stable', na_position='last')
             
-        return df
+        return compact_frame(df) if compact and not df.empty else df
 
     except Exception as e:
         print(f"GSheet Load Error: {e}")
         return pd.DataFrame()
 
-def save_data(df):
+def load_rows(columns=None, since_row=None, compact=False):
     """
-    Saves DataFrame to Google Sheet (Overwrites).
-    Maps Korean columns back to English if needed.
+    Column- / row-projected read of the data rows (A3 onwards) with a single batch_get:
+    one range per run of adjacent wanted columns, starting after the first since_row data rows.
+    Labels are the sheet positions, like load_data. Rows without a date are dropped.
+    A full-width read that continues the last sync (since_row == synced rows) extends the sync snapshot;
+    other partial reads leave it alone and don't assign Tx_IDs.
     """
-    client = connect_gsheet()
-    if not client: return False
-    
     try:
-        sh = client.open(GSHEET_NAME)
-        try:
-            ws = sh.worksheet(WORKSHEET_NAME)
-        except:
-            ws = sh.get_worksheet(0)
-            
-        # Prepare Data for Upload
-        save_df = df.copy()
-        
-        # MAPPING (Kor -> Eng)
-        # We want to save consistent with the source.
-        # If source was English (detected by load_data), we should save as English.
-        # But here we don't know what load_data saw.
-        # We can assume we want to maintain the English schema if that's what we found.
-        # Let's enforce English Schema for GSheet as it seems to be the "Database" standard there.
-        
-        if '날짜' in save_df.columns:
-            save_df['날짜'] = save_df['날짜'].apply(lambda x: x.strftime('%Y-%m-%d') if pd.notnull(x) and hasattr(x, 'strftime') else str(x) if pd.notnull(x) else "")
-            
-        if '시간' in save_df.columns:
-            save_df['시간'] = save_df['시간'].apply(lambda x: x.strftime('%H:%M:%S') if pd.notnull(x) and hasattr(x, 'strftime') else str(x) if pd.notnull(x) else "")
-            
-        # Convert all to simple types
-        save_df = save_df.fillna("")
-        
-        # Update
-        # Strategy: RESTORE Headers & Save Data
-        
-        # 1. Clear Old Data Only (A3:K...)
-        try:
-             ws.batch_clear(['A3:K50000']) # Clear safe large range
-        except:
-             pass 
-             
-        # 2. Restore Title & Header (Self-Healing)
-        # Row 1: Title
-        ws.update('A1', [['가계부 데이터 엔진 (T_RawData)']])
+        wanted = SHEET_COLUMNS if columns is None else [c for c in SHEET_COLUMNS if c in columns]
+        since_row = since_row or 0
+        ranges = column_ranges([SHEET_COLUMNS.index(c) for c in wanted], DATA_START_ROW + since_row)
+        blocks = _ws_call('batch_get', [r for r, _ in ranges])
+        df = stitch_blocks(blocks, [[SHEET_COLUMNS[p] for p in run] for _, run in ranges])
+        df.index = pd.RangeIndex(since_row, since_row + len(df))
+        n_read = len(df)
         
-        # Row 2: Headers (Standard Korean)
-        # We need headers that match the 'save_df' columns, but in Korean.
-        # save_df currently has English columns (date, time, etc.) if mapped?
-        # NO, 'save_df' right now is just 'df.copy()', then renamed to ENG.
-        # User wants Korean Headers visible in Sheet?
-        # Image 2 shows "날짜", "시간"... (Korean).
-        # But my code at line 163 renames KOR -> ENG.
-        # If I save with ENG headers, the sheet will look like ENG.
-        # User wants KOREAN headers in Excel.
-        # So I should NOT rename to ENG if the target is to look like the Screenshot.
-        # BUT, load_data assumes columns...
-        # Wait, if I change save to KOR, load_data must handle KOR. 
-        # My load_data handles KOR? Yes, it detects '날짜'.
-        
-        # Change of Plan: Save in KOREAN to match User's Original Excel.
-        # This means I should SKIP the rename to ENG at line 163.
+        if '날짜' in df.columns:
+            df = df[df['날짜'].astype(str).str.strip() != ""]
+        df = normalize_frame(df)
         
-        # Let's revert the Rename to ENG.
-        # Using Korean columns for GSheet view.
+        continues_sync = (columns is None and _LAST_SYNCED.get('rows') is not None
+                          and since_row == len(_LAST_SYNCED['rows']) and len(df) == n_read)
+        if continues_sync and n_read:
+            new_columns, new_rows = _to_sheet_rows(df)
+            if new_columns == _LAST_SYNCED['columns'] and _LAST_SYNCED.get('index') is not None:
+                _LAST_SYNCED['rows'].extend([_cell_key(v) for v in r] for r in new_rows)
+                _LAST_SYNCED['index'] = _LAST_SYNCED['index'].append(df.index)
+        if columns is None:
+            df = assign_tx_ids(df)
         
-        # If I comment out the rename:
-        # save_df columns are ['날짜', '시간', '구분'...]
+        if '날짜' in df.columns:
+            by = [c for c in ['날짜', '시간'] if c in df.columns]
+            df = df.sort_values(by=by, ascending=[False] * len(by), kind='stable', na_position='last')
+        return compact_frame(df) if compact and not df.empty else df
+    
+    except Exception as e:
+        print(f"GSheet Load Error: {e}")
+        return pd.DataFrame()
+
+def _to_sheet_rows(df, all_columns=False):
+    """
+    Formats a DataFrame into the value grid we write to the sheet (A3 onwards).
+    all_columns: every sheet column in order, missing ones empty (Flow_Filter 1), for rows appended
+    below existing ones; otherwise only the frame's columns.
+    Returns (columns, rows).
+    """
+    # Prepare Data for Upload (compact frames are expanded back to time objects / strings)
+    save_df = expand_frame(df)
+    
+    # MAPPING (Kor -> Eng)
+    # We want to save consistent with the source.
+    # If source was English (detected by load_data), we should save as English.
+    # But here we don't know what load_data saw.
+    # We can assume we want to maintain the English schema if that's what we found.
+    # Let's enforce English Schema for GSheet as it seems to be the "Database" standard there.
+    
+    if '날짜' in save_df.columns:
+        save_df['날짜'] = save_df['날짜'].apply(lambda x: x.strftime('%Y-%m-%d') if pd.notnull(x) and hasattr(x, 'strftime') else str(x) if pd.notnull(x) else "")
         
-        headers = ['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모', 'Flow_Filter']
-        # Is_Active is redundant with Flow_Filter, so we don't save it to keep sheet clean.
+    if '시간' in save_df.columns:
+        save_df['시간'] = save_df['시간'].apply(lambda x: x.strftime('%H:%M:%S') if pd.notnull(x) and hasattr(x, 'strftime') else str(x) if pd.notnull(x) else "")
         
-        # Ensure save_df has these columns in order
+    # Convert all to simple types
+    save_df = save_df.fillna("")
+    
+    # Headers (Standard Korean)
+    # Change of Plan: Save in KOREAN to match User's Original Excel.
+    # load_data detects '날짜', so Korean headers round-trip fine.
+    headers = ['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모', 'Flow_Filter', 'Tx_ID']
+    # Is_Active is redundant with Flow_Filter, so we don't save it to keep sheet clean.
+    
+    # Ensure save_df has these columns in order
+    if all_columns:
+        if 'Flow_Filter' not in save_df.columns:
+            save_df['Flow_Filter'] = 1
+        existing_cols = headers
+        save_df = save_df.reindex(columns=headers, fill_value="")
+    else:
         existing_cols = [c for c in headers if c in save_df.columns]
         save_df = save_df[existing_cols]
+    
+    return existing_cols, save_df.values.tolist()
+
+def _sheet_order(df):
+    """
+    Rows in sheet order. Loaded rows are labelled with their sheet position and new rows get higher
+    labels, so label order = sheet order with new rows appended; sorting by date happens at read time.
+    """
+    if pd.api.types.is_integer_dtype(df.index) and df.index.is_unique and not df.index.is_monotonic_increasing:
+        return df.sort_index(kind='stable')
+    return df
+
+def _cell_key(val):
+    """Comparison key for one cell (1000 and 1000.0 are the same value in the sheet)."""
+    if isinstance(val, float) and val.is_integer():
+        return str(int(val))
+    return str(val)
+
+def _remember_synced(columns, rows, index=None):
+    _LAST_SYNCED['columns'] = list(columns)
+    _LAST_SYNCED['rows'] = [[_cell_key(v) for v in r] for r in rows]
+    _LAST_SYNCED['index'] = index.copy() if index is not None else None
+
+def _header_ranges(columns):
+    """The header row as a value range if the sheet's row 2 differs (e.g. a sheet from before Tx_ID), else []."""
+    header = _LAST_SYNCED.get('header')
+    if header is None or header[:len(columns)] == list(columns):
+        return []
+    return [{'range': f"A{DATA_START_ROW - 1}", 'values': [list(columns)]}]
+
+def _diff_ranges(old_rows, new_rows, n_cols):
+    """
+    Compares the last-synced grid with the new one and returns the value ranges to send
+    as [{'range': 'C5:E7', 'values': [[...], ...]}, ...].
+    - changed cells: contiguous changed columns per row, merged across adjacent rows with the same span
+    - appended rows: one block after the old end
+    - deleted rows: one block of blanks over the old tail
+    """
+    start = DATA_START_ROW
+    common = min(len(old_rows), len(new_rows))
+
+    # 1. Changed cells -> (row, c0, c1) segments
+    segments = []
+    for i in range(common):
+        old_r, new_r = old_rows[i], new_rows[i]
+        c = 0
+        while c < n_cols:
+            if _cell_key(new_r[c]) != old_r[c]:
+                c0 = c
+                while c < n_cols and _cell_key(new_r[c]) != old_r[c]:
+                    c += 1
+                segments.append((i, c0, c - 1))
+            else:
+                c += 1
+
+    # Merge vertically adjacent segments with the same column span into blocks
+    blocks = []
+    for i, c0, c1 in segments:
+        if blocks and blocks[-1][1] == i - 1 and blocks[-1][2] == c0 and blocks[-1][3] == c1:
+            blocks[-1][1] = i
+        else:
+            blocks.append([i, i, c0, c1])
+
+    data = []
+    for r0, r1, c0, c1 in blocks:
+        data.append({
+            'range': f"{rowcol_to_a1(start + r0, c0 + 1)}:{rowcol_to_a1(start + r1, c1 + 1)}",
+            'values': [r[c0:c1 + 1] for r in new_rows[r0:r1 + 1]],
+        })
+
+    # 2. Appended rows
+    if len(new_rows) > common:
+        data.append({
+            'range': f"{rowcol_to_a1(start + common, 1)}:{rowcol_to_a1(start + len(new_rows) - 1, n_cols)}",
+            'values': new_rows[common:],
+        })
+
+    # 3. Deleted rows (blank out the old tail)
+    if len(old_rows) > common:
+        data.append({
+            'range': f"{rowcol_to_a1(start + common, 1)}:{rowcol_to_a1(start + len(old_rows) - 1, n_cols)}",
+            'values': [[""] * n_cols for _ in range(len(old_rows) - common)],
+        })
+
+    return data
+
+def save_data(df, incremental=True):
+    """
+    Saves DataFrame to Google Sheet.
+    incremental=True: sends only changed/appended/deleted cell ranges (one batch_update)
+    compared with the last-synced snapshot. Falls back to a full overwrite when there is
+    no usable snapshot (e.g. nothing loaded yet in this process).
+    """
+    try:
+        df = _sheet_order(df)
+        existing_cols, rows = _to_sheet_rows(df)
+        n_cols = len(existing_cols)
+        baseline_cells = 1 + n_cols + len(rows) * n_cols # Title + Header + Data of a full rewrite
+        
+        if incremental and _LAST_SYNCED.get('rows') is not None and _LAST_SYNCED.get('columns') == existing_cols:
+            data = _header_ranges(existing_cols) + _diff_ranges(_LAST_SYNCED['rows'], rows, n_cols)
+            if data:
+                _ws_call('batch_update', data)
+            cells_sent = sum(len(d['values']) * len(d['values'][0]) for d in data)
+            mode = 'incremental'
+        else:
+            # Full rewrite
+            # Strategy: RESTORE Headers & Save Data
+            
+            # 1. Clear Old Data Only (A3:K...)
+            try:
+                 _ws_call('batch_clear', ['A3:K50000']) # Clear safe large range
+            except:
+                 pass 
+                 
+            # Title, header and data go out as one values_batch_update
+            with SCHEDULER.batch(GSHEET_NAME):
+                # 2. Restore Title & Header (Self-Healing)
+                # Row 1: Title
+                _ws_call('update', 'A1', [['가계부 데이터 엔진 (T_RawData)']])
+                
+                # Write Headers to A2
+                _ws_call('update', 'A2', [existing_cols])
+                     
+                # Write Data (values only) starting at A3
+                _ws_call('update', 'A3', rows)
+            cells_sent = baseline_cells
+            mode = 'full'
         
-        # Write Headers to A2
-        ws.update('A2', [save_df.columns.values.tolist()])
-             
-        # Write Data (values only) starting at A3
-        ws.update('A3', save_df.values.tolist())
+        _remember_synced(existing_cols, rows, index=df.index)
+        _LAST_SYNCED['header'] = list(existing_cols)
+        LAST_SAVE_STATS.update({'mode': mode, 'cells_sent': cells_sent, 'baseline_cells': baseline_cells})
+        print(f"GSheet Save ({mode}): sent {cells_sent:,} cells (full rewrite: {baseline_cells:,})")
         
         return True
         
+    except Exception as e:
+        print(f"GSheet Save Error: {e}")
+        return False
+
+def _same_row(old_row, new_row, columns):
+    """The synced sheet row still holds this transaction: same Tx_ID (same date if the sheet has no ID yet)."""
+    if 'Tx_ID' in columns:
+        c = columns.index('Tx_ID')
+        if old_row[c] != "":
+            return old_row[c] == _cell_key(new_row[c])
+    return old_row[0] == _cell_key(new_row[0])
+
+def append_rows(df):
+    """
+    Appends rows after the last data row in one append_rows call (nothing below them shifts),
+    e.g. a batch of buffered quick entries. The sync snapshot is extended to match.
+    """
+    if df.empty:
         return True
+    try:
+        df = _sheet_order(df)
+        # Appended cells land by position: every column is written, whatever the frame holds
+        columns, rows = _to_sheet_rows(df, all_columns=True)
+        _ws_call('append_rows', rows, table_range=f"A{DATA_START_ROW - 1}")
+        
+        synced_index = _LAST_SYNCED.get('index')
+        if _LAST_SYNCED.get('rows') is not None and columns == _LAST_SYNCED['columns']:
+            _LAST_SYNCED['rows'].extend([_cell_key(v) for v in r] for r in rows)
+            # Labels already in use (rows from outside the working frame) can't be mapped to sheet rows
+            if synced_index is not None and not synced_index.isin(df.index).any():
+                _LAST_SYNCED['index'] = synced_index.append(df.index)
+            else:
+                _LAST_SYNCED['index'] = None
+        else:
+            _LAST_SYNCED['rows'] = None
+            _LAST_SYNCED['index'] = None
         
+        n_cols = len(columns)
+        LAST_SAVE_STATS.update({'mode': 'append', 'cells_sent': len(rows) * n_cols,
+                                'baseline_cells': 1 + n_cols + len(_LAST_SYNCED['rows'] or rows) * n_cols})
+        print(f"GSheet Save (append): {len(rows)} rows in one call")
+        return True
     except Exception as e:
-        print(f"GSheet Save Error: {e}")
+        print(f"GSheet Append Error: {e}")
         return False
+
+def save_changes(df, changes):
+    """
+    Saves one change set (see change_set.py); df is the full frame after the changes.
+    Edited rows whose sheet row is known are sent as row ranges in one batch_update,
+    without formatting or diffing the rest of the ledger. Only new rows (e.g. buffered quick entries):
+    one append_rows call. Anything else goes through save_data(df) (incremental diff).
+    """
+    updated = changes['updated']
+    synced_index = _LAST_SYNCED.get('index')
+    if (updated.empty and not changes['deleted'] and not changes['added'].empty
+            and _LAST_SYNCED.get('rows') is not None):
+        return append_rows(changes['added'])
+    if (changes['added'].empty and not changes['deleted'] and not updated.empty
+            and _LAST_SYNCED.get('rows') is not None and synced_index is not None):
+        pos = synced_index.get_indexer(updated.index)
+        columns, rows = _to_sheet_rows(updated)
+        old_rows = _LAST_SYNCED['rows']
+        if (pos >= 0).all() and columns == _LAST_SYNCED['columns'] and \
+                all(_same_row(old_rows[p], r, columns) for p, r in zip(pos, rows)):
+            try:
+                n_cols = len(columns)
+                data = [{
+                    'range': f"{rowcol_to_a1(DATA_START_ROW + p, 1)}:{rowcol_to_a1(DATA_START_ROW + p, n_cols)}",
+                    'values': [r],
+                } for p, r in zip(pos, rows)]
+                _ws_call('batch_update', _header_ranges(columns) + data)
+                _LAST_SYNCED['header'] = list(columns)
+                for p, r in zip(pos, rows):
+                    old_rows[p] = [_cell_key(v) for v in r]
+                cells_sent = len(rows) * n_cols
+                baseline_cells = 1 + n_cols + len(old_rows) * n_cols
+                LAST_SAVE_STATS.update({'mode': 'rows', 'cells_sent': cells_sent, 'baseline_cells': baseline_cells})
+                print(f"GSheet Save (rows): sent {cells_sent:,} cells (full rewrite: {baseline_cells:,})")
+                return True
+            except Exception as e:
+                print(f"GSheet Save Error: {e}")
+                return False
+    return save_data(df)
         
 def get_kpi_metrics(df):
     # Same logic as before
@@ -284,41 +618,7 @@ def get_kpi_metrics(df):
 
 def add_row_optimized(new_row_dict):
     """
-    Inserts a single row at the top of the data (Row 3) to maintain 'latest first' somewhat,
-    without rewriting the whole sheet.
+    Adds a single row after the last data row (one append_rows call; nothing is rewritten or shifted).
+    The app sorts by date at read time, so the row's place in the sheet doesn't matter for display.
     """
-    client = connect_gsheet()
-    if not client: return False
-    
-    try:
-        sh = client.open(GSHEET_NAME)
-        try: ws = sh.worksheet(WORKSHEET_NAME)
-        except: ws = sh.get_worksheet(0)
-        
-        # Prepare Row Data matching Headers
-        # Headers: ['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모', 'Flow_Filter']
-        
-        # Helper to format
-        def fmt(val): return str(val) if val is not None else ""
-        
-        row_values = [
-            new_row_dict.get('날짜', '').strftime('%Y-%m-%d') if hasattr(new_row_dict.get('날짜'), 'strftime') else fmt(new_row_dict.get('날짜')),
-            new_row_dict.get('시간', '').strftime('%H:%M:%S') if hasattr(new_row_dict.get('시간'), 'strftime') else fmt(new_row_dict.get('시간')),
-            fmt(new_row_dict.get('구분')),
-            fmt(new_row_dict.get('대분류')),
-            fmt(new_row_dict.get('소분류')),
-            fmt(new_row_dict.get('내용')),
-            new_row_dict.get('금액', 0), # Int/Float
-            fmt(new_row_dict.get('결제수단')),
-            fmt(new_row_dict.get('메모')),
-            new_row_dict.get('Flow_Filter', 1)
-        ]
-        
-        # Insert at Row 3 (Pushing others down)
-        # This is strictly faster than overwriting 3000 rows.
-        ws.insert_row(row_values, index=3)
-        return True
-        
-    except Exception as e:
-        print(f"GSheet Add Row Error: {e}")
-        return False
+    return append_rows(assign_tx_ids(pd.DataFrame([{'Flow_Filter': 1, **new_row_dict}])))
@@ -2,91 +2,263 @@ import pandas as pd
 import openpyxl
 from datetime import datetime
 import os
+import tempfile
 from copy import copy
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.worksheet.views import SheetView, Selection
+from snapshot_cache import cached_load, file_fingerprint, content_token
+from data_normalize import normalize_frame, compact_frame, expand_frame, assign_tx_ids, SCHEMA_VERSION
+from xlsx_patch import patch_sheet_rows, patch_row_values, PatchNotSupported
 
 # Configuration
 DATA_FILE = r'c:\Users\JTC7\Desktop\01.Python Project\01.Personal Expense Tracker\01.Document\20251214_수식연결_가계부엔진_최종.xlsx'
 SHEET_NAME = '📋 T_RawData'
 
-def load_data():
+# Data rows start at row 3 (Row 1: Title, Row 2: Headers)
+DATA_START_ROW = 3
+
+# Row layout the workbook is known to have (set by load_data / save_data), used by save_changes:
+# frame labels in sheet order + their dates + the header columns, valid while the file keeps this (mtime, size)
+_LAST_SYNCED = {'fingerprint': None, 'index': None, 'dates': None, 'columns': None}
+
+def load_data(use_cache=True, compact=False):
     """
     Loads raw data from the Excel file with SMART HEADER DETECTION.
     Scans looking for '날짜', '구분', '금액' to find the correct header row.
     Returns a pandas DataFrame with an 'Active' flag.
+    With use_cache, a local snapshot is returned unless the workbook changed (see snapshot_cache.py).
+    compact=True returns the compact typed schema (see data_normalize.compact_frame).
     """
     if not os.path.exists(DATA_FILE):
         print(f"File not found: {DATA_FILE}")
         return pd.DataFrame() 
         
+    df = cached_load(DATA_FILE, SHEET_NAME, _load_data_uncached, version=SCHEMA_VERSION) if use_cache else _load_data_uncached()
+    if not df.empty:
+        header = list(df.columns)
+        # Rows without a Tx_ID (or a workbook from before the column) get one; written on the next save
+        df = assign_tx_ids(df)
+        _remember_synced(df, header)
+    return compact_frame(df) if compact and not df.empty else df
+
+def change_token():
+    """Cheap change token for revision-validated caches (revision_cache.py): the workbook's content hash."""
+    if not os.path.exists(DATA_FILE):
+        return None
+    return content_token(DATA_FILE)
+
+def _file_state():
+    fp = file_fingerprint(DATA_FILE, with_hash=False)
+    return fp['mtime'], fp['size']
+
+def _remember_synced(df, columns):
+    _LAST_SYNCED.update({
+        'fingerprint': _file_state(),
+        'index': df.index.copy(),
+        'dates': pd.to_datetime(df['날짜'], errors='coerce').to_numpy() if '날짜' in df.columns else None,
+        'columns': list(columns),
+    })
+
+def _header_stale(final_columns):
+    """True if the sheet's header row may lack some of final_columns (e.g. Tx_ID in an older workbook)."""
+    known = _LAST_SYNCED['columns']
+    return known is None or any(c not in known for c in final_columns)
+
+READ_BATCH_SIZE = 10000 # Rows per DataFrame chunk in the streaming reader
+
+def _header_names(row):
+    """Column names like pd.read_excel: empty -> 'Unnamed: i', duplicates -> 'name.1'."""
+    names, seen = [], {}
+    for i, v in enumerate(row):
+        name = f"Unnamed: {i}" if v is None or str(v).strip() == "" else str(v)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+def _read_raw_sheet(path, sheet_name):
+    """
+    Single streaming pass over the sheet (openpyxl read-only mode, cached values).
+    Detects the header row in the first 10 rows and builds the frame in chunks,
+    so the full workbook object model is never loaded.
+    """
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
     try:
-        # 1. Read first few rows to find the header
-        preview_df = pd.read_excel(DATA_FILE, sheet_name=SHEET_NAME, header=None, nrows=10)
+        ws = wb[sheet_name]
+        rows_iter = ws.iter_rows(values_only=True)
         
+        # 1. Read first few rows to find the header
         header_row_index = None
         required_cols = {'날짜', '구분', '금액'}
-        
-        for idx, row in preview_df.iterrows():
-            row_values = set(row.astype(str).tolist())
-            if required_cols.issubset(row_values):
-                header_row_index = idx
+        preview = []
+        for row in rows_iter:
+            preview.append(row)
+            if required_cols.issubset(set(str(v) for v in row)):
+                header_row_index = len(preview) - 1
+                break
+            if len(preview) >= 10:
                 break
         
         if header_row_index is None:
             print("Warning: Could not detect header row automatically. Trying default Header=1 (Row 2).")
             header_row_index = 1
-            
-        # 2. Re-load with correct header
-        df = pd.read_excel(DATA_FILE, sheet_name=SHEET_NAME, header=header_row_index)
+            if len(preview) < 2:
+                return pd.DataFrame()
         
-        if '날짜' in df.columns:
-            df['날짜'] = pd.to_datetime(df['날짜'], errors='coerce')
-            
-        def parse_time(val):
-            if pd.isna(val): return None
-            if isinstance(val, str):
-                try: return pd.to_datetime(val, format='%H:%M:%S').time()
-                except:
-                    try: return pd.to_datetime(val).time()
-                    except: return None
-            if hasattr(val, 'time'): return val.time()
-            if type(val).__name__ == 'time': return val
-            return None
-            
-        if '시간' in df.columns:
-            df['시간'] = df['시간'].apply(parse_time)
-            
-        if '금액' in df.columns:
-            df['금액'] = pd.to_numeric(df['금액'], errors='coerce').fillna(0)
-            
-        if 'Flow_Filter' in df.columns:
-            def is_active(val):
-                try: return str(val).strip().split('.')[0] == '1'
-                except: return False
-            df['Is_Active'] = df['Flow_Filter'].apply(is_active)
-        else:
-            df['Is_Active'] = True
+        columns = _header_names(preview[header_row_index])
+        n_cols = len(columns)
+        
+        # 2. Stream the data rows in batches (rows already read in the preview come first)
+        chunks, batch = [], []
+        pending_blank = []
+        def flush():
+            if batch:
+                chunks.append(pd.DataFrame(batch, columns=columns))
+                batch.clear()
+        
+        def data_rows():
+            yield from preview[header_row_index + 1:]
+            yield from rows_iter
+        
+        for row in data_rows():
+            row = tuple(row[:n_cols]) + (None,) * (n_cols - len(row))
+            # Blank rows are kept only if data follows (read_excel drops trailing blank rows)
+            if all(v is None for v in row):
+                pending_blank.append(row)
+                continue
+            if pending_blank:
+                batch.extend(pending_blank)
+                pending_blank = []
+            batch.append(row)
+            if len(batch) >= READ_BATCH_SIZE:
+                flush()
+        flush()
+    finally:
+        wb.close()
+    
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+def _load_data_uncached():
+    try:
+        df = _read_raw_sheet(DATA_FILE, SHEET_NAME)
+        
+        # Type Conversion (shared with the Google Sheets loader)
+        df = normalize_frame(df)
             
         return df
     except Exception as e:
         print(f"Error loading data: {e}")
         return pd.DataFrame()
 
+# Named styles for T_RawData rows, registered once per workbook and referenced by every cell
+# (instead of creating Font/Border/Alignment objects per cell).
+RAW_STYLE_PREFIX = 'RawData'
+RAW_TARGET_ORDER = ['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모', 'Flow_Filter', 'Tx_ID']
+
+def _raw_named_styles():
+    border_all = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+    fills = {
+        '': PatternFill(fill_type=None),
+        ' Blue': PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid"),
+    }
+    kinds = {
+        'Date': ('yyyy-mm-dd', Alignment(horizontal='center', vertical='center')),
+        'Amount': ('#,##0', Alignment(horizontal='right', vertical='center')),
+        'Center': ('General', Alignment(horizontal='center', vertical='center')),
+        'Left': ('General', Alignment(horizontal='left', vertical='center')),
+    }
+    styles = []
+    for kind, (number_format, alignment) in kinds.items():
+        for suffix, fill in fills.items():
+            styles.append(NamedStyle(
+                name=f"{RAW_STYLE_PREFIX} {kind}{suffix}",
+                font=Font(name='맑은 고딕', size=11),
+                border=border_all,
+                fill=fill,
+                number_format=number_format,
+                alignment=alignment,
+            ))
+    return styles
+
+def _ensure_named_styles(wb):
+    existing = set(wb.named_styles)
+    for style in _raw_named_styles():
+        if style.name not in existing:
+            wb.add_named_style(style)
+
+def _column_styles(ws, columns, blue):
+    """
+    Style references for one (striped or plain) row: the named style is resolved once per
+    column and cells get a copy of the resulting style array (no per-cell lookup).
+    """
+    styles = []
+    for name in _column_style_names(columns, blue):
+        template = WriteOnlyCell(ws)
+        template.style = name
+        styles.append(template._style)
+    return styles
+
+def _column_style_names(columns, blue):
+    names = []
+    for col_name in columns:
+        if col_name == '날짜': kind = 'Date'
+        elif col_name == '금액': kind = 'Amount'
+        elif col_name in ['시간', '구분', '대분류', '소분류', '결제수단', 'Flow_Filter', 'Tx_ID']: kind = 'Center'
+        else: kind = 'Left'
+        names.append(f"{RAW_STYLE_PREFIX} {kind}{' Blue' if blue else ''}")
+    return names
+
+def _prepare_save_df(df):
+    """Column order / Flow_Filter sync / plain Python values for writing."""
+    save_df = expand_frame(df)
+    
+    # Sync Flow_Filter
+    if 'Is_Active' in save_df.columns:
+        save_df['Flow_Filter'] = save_df['Is_Active'].apply(lambda x: 1 if x else 0)
+        save_df = save_df.drop(columns=['Is_Active'])
+        
+    # Column Order
+    final_columns = [c for c in RAW_TARGET_ORDER if c in save_df.columns]
+    save_df = save_df[final_columns].astype(object)
+    # NaN/NaT -> empty cell
+    save_df = save_df.where(save_df.notna(), None)
+    return final_columns, save_df
+
 def save_data(df):
     """
-    Saves the data back to Excel with openpyxl, preserving styling.
+    Saves the data back to Excel, preserving styling.
+    Only the T_RawData part of the XLSX is rewritten when possible (see xlsx_patch.py);
+    otherwise the workbook is saved with openpyxl. Rows reference a few shared NamedStyles (striped row, date, amount, centered).
+    A new workbook is streamed with a write-only writer.
     """
     try:
-        if os.path.exists(DATA_FILE):
-             wb = openpyxl.load_workbook(DATA_FILE)
-        else:
-             wb = openpyxl.Workbook()
-             
+        final_columns, save_df = _prepare_save_df(df)
+        
+        if not os.path.exists(DATA_FILE):
+            return _save_new_workbook(final_columns, save_df)
+            
+        # Fast path: regenerate only the T_RawData part inside the XLSX, other sheets are copied as-is
+        try:
+            patch_sheet_rows(DATA_FILE, SHEET_NAME, list(save_df.itertuples(index=False, name=None)),
+                             start_row=DATA_START_ROW, n_cols=len(final_columns),
+                             header=final_columns if _header_stale(final_columns) else None)
+            _remember_synced(df, final_columns)
+            return True
+        except PatchNotSupported as e:
+            print(f"Sheet patch not possible ({e}). Saving the whole workbook with openpyxl.")
+            
+        wb = openpyxl.load_workbook(DATA_FILE)
         if SHEET_NAME in wb.sheetnames:
             ws = wb[SHEET_NAME]
         else:
             ws = wb.create_sheet(SHEET_NAME)
+        _ensure_named_styles(wb)
             
         # Clear data from Row 3 downwards (Header is Row 2 usually)
         # We assume header is at Row 2 based on previous logic finding.
@@ -94,53 +266,21 @@ def save_data(df):
         max_row = ws.max_row
         if max_row >= start_row:
              ws.delete_rows(start_row, max_row - start_row + 1)
-             
-        save_df = df.copy()
+        for col_idx, col_name in enumerate(final_columns, 1):
+            ws.cell(row=start_row - 1, column=col_idx).value = col_name
         
-        # Sync Flow_Filter
-        if 'Is_Active' in save_df.columns:
-            save_df['Flow_Filter'] = save_df['Is_Active'].apply(lambda x: 1 if x else 0)
-            save_df = save_df.drop(columns=['Is_Active'])
-            
-        # Column Order
-        target_order = ['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모', 'Flow_Filter']
-        final_columns = [c for c in target_order if c in save_df.columns]
-        save_df = save_df[final_columns]
-        
-        # Styles
-        border_all = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
-        fill_blue = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-        fill_white = PatternFill(fill_type=None)
-        align_center = Alignment(horizontal='center', vertical='center')
-        align_right = Alignment(horizontal='right', vertical='center')
-        align_left = Alignment(horizontal='left', vertical='center')
+        styles_blue = _column_styles(ws, final_columns, blue=True)
+        styles_white = _column_styles(ws, final_columns, blue=False)
             
         # Write
         current_row = start_row # 3
         for row_data in save_df.itertuples(index=False, name=None):
-            ws.append(row_data) # This might append at max_row + 1. 
-            # If we deleted rows, max_row should be 2. So append starts at 3. Correct.
-            
-            is_blue_row = (current_row % 2 == 0) # Even rows blue
-            current_fill = fill_blue if is_blue_row else fill_white
+            ws.append(row_data) # If we deleted rows, max_row should be 2. So append starts at 3.
             
-            for col_idx in range(1, len(row_data) + 1):
-                cell = ws.cell(row=current_row, column=col_idx)
-                cell.font = Font(name='맑은 고딕', size=11)
-                cell.border = border_all
-                cell.fill = current_fill
-                
-                col_name = final_columns[col_idx-1]
-                if col_name == '날짜':
-                    cell.number_format = 'yyyy-mm-dd'
-                    cell.alignment = align_center
-                elif col_name == '금액':
-                    cell.number_format = '#,##0' 
-                    cell.alignment = align_right
-                elif col_name in ['시간', '구분', '대분류', '소분류', '결제수단', 'Flow_Filter']:
-                    cell.alignment = align_center
-                else: 
-                    cell.alignment = align_left
+            # Even rows blue
+            styles = styles_blue if current_row % 2 == 0 else styles_white
+            for col_idx, style in enumerate(styles, 1):
+                ws.cell(row=current_row, column=col_idx)._style = copy(style)
             
             current_row += 1
         
@@ -149,13 +289,82 @@ def save_data(df):
         ws.sheet_view.topLeftCell = 'A1'
         ws.sheet_view.selection = [Selection(activeCell='A1', sqref='A1')]
         
-        wb.save(DATA_FILE)
+        _save_atomic(wb, DATA_FILE)
+        _remember_synced(df, final_columns)
         return True
         
     except Exception as e:
         print(f"Error saving data: {e}")
         return False
 
+def save_changes(df, changes):
+    """
+    Saves one change set (see change_set.py); df is the full frame after the changes.
+    Edited rows that keep their date and position are overwritten in place inside the XLSX
+    (xlsx_patch.patch_row_values); adds / deletes / moved rows go through save_data(df).
+    """
+    updated = changes['updated']
+    if (changes['added'].empty and not changes['deleted'] and not updated.empty
+            and _LAST_SYNCED['index'] is not None and os.path.exists(DATA_FILE)
+            and _LAST_SYNCED['fingerprint'] == _file_state()):
+        pos = _LAST_SYNCED['index'].get_indexer(updated.index)
+        if (pos >= 0).all():
+            old_dates = _LAST_SYNCED['dates'][pos]
+            new_dates = pd.to_datetime(updated['날짜'], errors='coerce').to_numpy()
+            if ((old_dates == new_dates) | (pd.isna(old_dates) & pd.isna(new_dates))).all():
+                final_columns, save_df = _prepare_save_df(updated)
+                rows = {DATA_START_ROW + int(p): row for p, row in zip(pos, save_df.itertuples(index=False, name=None))}
+                if _header_stale(final_columns):
+                    rows[DATA_START_ROW - 1] = tuple(final_columns)
+                try:
+                    patch_row_values(DATA_FILE, SHEET_NAME, rows, n_cols=len(final_columns))
+                    _LAST_SYNCED['fingerprint'] = _file_state()
+                    _LAST_SYNCED['columns'] = list(final_columns)
+                    print(f"Excel Save (rows): {len(rows)} edited rows patched in place")
+                    return True
+                except PatchNotSupported as e:
+                    print(f"Row patch not possible ({e}). Saving the whole sheet.")
+    return save_data(df)
+
+def _save_atomic(wb, path):
+    """Saves to a temp file next to path and swaps it in: a crash mid-save never leaves a truncated workbook."""
+    fd, tmp_path = tempfile.mkstemp(suffix='.xlsx', dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        wb.save(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _save_new_workbook(final_columns, save_df):
+    """Streams the raw sheet into a new workbook (write-only mode, style references only)."""
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(SHEET_NAME)
+    _ensure_named_styles(wb)
+    ws.freeze_panes = 'A2'
+    
+    ws.append(['가계부 데이터 엔진 (T_RawData)'])
+    ws.append(final_columns)
+    
+    styles_blue = _column_styles(ws, final_columns, blue=True)
+    styles_white = _column_styles(ws, final_columns, blue=False)
+    
+    current_row = 3
+    for row_data in save_df.itertuples(index=False, name=None):
+        styles = styles_blue if current_row % 2 == 0 else styles_white
+        cells = []
+        for value, style in zip(row_data, styles):
+            cell = WriteOnlyCell(ws, value=value)
+            cell._style = copy(style)
+            cells.append(cell)
+        ws.append(cells)
+        current_row += 1
+    
+    _save_atomic(wb, DATA_FILE)
+    return True
+
 def get_kpi_metrics(df):
     if df.empty: return {'income':0, 'expense':0, 'net':0, 'other':0}
     active_df = df[df['Is_Active'] == True]
@@ -0,0 +1,289 @@
+import pandas as pd
+import sqlite3
+from contextlib import contextmanager
+from data_normalize import normalize_frame, compact_frame, expand_frame, assign_tx_ids
+
+# Configuration
+DB_FILE = 'expense_tracker.db'
+TABLE_NAME = 'transactions'
+
+# Same column layout as the '📋 T_RawData' sheet
+COLUMNS = ['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모', 'Flow_Filter', 'Tx_ID']
+
+SCHEMA_SQL = f"""
+CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    날짜 TEXT NOT NULL,
+    시간 TEXT,
+    구분 TEXT,
+    대분류 TEXT,
+    소분류 TEXT,
+    내용 TEXT,
+    금액 REAL DEFAULT 0,
+    결제수단 TEXT,
+    메모 TEXT,
+    Flow_Filter INTEGER DEFAULT 1,
+    Tx_ID TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tx_date ON {TABLE_NAME} (날짜);
+CREATE INDEX IF NOT EXISTS idx_tx_type ON {TABLE_NAME} (구분);
+CREATE INDEX IF NOT EXISTS idx_tx_main_category ON {TABLE_NAME} (대분류);
+CREATE INDEX IF NOT EXISTS idx_tx_flow_filter ON {TABLE_NAME} (Flow_Filter);
+"""
+
+INSERT_SQL = f"INSERT INTO {TABLE_NAME} ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+INSERT_WITH_ID_SQL = f"INSERT INTO {TABLE_NAME} (id, {', '.join(COLUMNS)}) VALUES (?, {', '.join('?' * len(COLUMNS))})"
+UPDATE_SQL = f"UPDATE {TABLE_NAME} SET {', '.join(f'{c} = ?' for c in COLUMNS)} WHERE id = ?"
+UPDATE_BY_TX_SQL = f"UPDATE {TABLE_NAME} SET {', '.join(f'{c} = ?' for c in COLUMNS)} WHERE Tx_ID = ?"
+
+# Columns added after the first release: (name, type), added to existing stores by _migrate
+MIGRATIONS = [('Tx_ID', 'TEXT')]
+
+def _migrate(conn):
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({TABLE_NAME})")}
+    for name, col_type in MIGRATIONS:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {TABLE_NAME} ADD COLUMN {name} {col_type}")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_tx_id ON {TABLE_NAME} (Tx_ID)")
+
+@contextmanager
+def connect_db(db_file=None):
+    """Opens the SQLite store (creating tables and indexes on first use), commits and closes."""
+    conn = sqlite3.connect(db_file or DB_FILE)
+    try:
+        conn.executescript(SCHEMA_SQL)
+        _migrate(conn)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+def to_db_row(row):
+    """Converts one transaction (dict-like) to a tuple in COLUMNS order."""
+    def fmt(val): return "" if val is None or (not isinstance(val, str) and pd.isna(val)) else str(val)
+    # NaT has strftime too (and raises): missing dates / times are checked first
+    def fmt_as(val, pattern): return fmt(val) if fmt(val) == "" or not hasattr(val, 'strftime') else val.strftime(pattern)
+
+    date_val = row.get('날짜')
+    time_val = row.get('시간')
+    amount = row.get('금액', 0)
+    flow = row.get('Flow_Filter')
+    tx_id = row.get('Tx_ID')
+    if flow is None or (not isinstance(flow, str) and pd.isna(flow)):
+        flow = 1 if row.get('Is_Active', True) else 0
+
+    return (
+        fmt_as(date_val, '%Y-%m-%d'),
+        fmt_as(time_val, '%H:%M:%S'),
+        fmt(row.get('구분')),
+        fmt(row.get('대분류')),
+        fmt(row.get('소분류')),
+        fmt(row.get('내용')),
+        float(amount) if amount is not None and not pd.isna(amount) else 0,
+        fmt(row.get('결제수단')),
+        fmt(row.get('메모')),
+        int(float(flow)) if str(flow).strip() not in ('', 'nan') else 1,
+        fmt(tx_id) or None,
+    )
+
+def rows_to_frame(rows, index=None):
+    """Frame (loader layout) from to_db_row() tuples."""
+    return _normalize(pd.DataFrame([list(r) for r in rows], columns=COLUMNS, index=index))
+
+def _normalize(df):
+    """Applies the same type conversion as the Excel/GSheet loaders."""
+    if df.empty:
+        return pd.DataFrame(columns=COLUMNS + ['Is_Active'])
+
+    df['Flow_Filter'] = pd.to_numeric(df['Flow_Filter'], errors='coerce').fillna(1).astype(int)
+    # Rows without a Tx_ID (stored before the column existed) get their content-derived ID
+    return assign_tx_ids(normalize_frame(df))
+
+def load_data(compact=False, db_file=None):
+    """
+    Loads all transactions from the SQLite store.
+    Returns the same frame layout as data_manager.load_data (compact=True: compact typed schema).
+    The frame is indexed by the row id, so save_changes can target single rows.
+    """
+    try:
+        with connect_db(db_file) as conn:
+            df = pd.read_sql_query(
+                f"SELECT id, {', '.join(COLUMNS)} FROM {TABLE_NAME} ORDER BY 날짜 DESC, 시간 DESC", conn,
+                index_col='id')
+            unassigned = df.index[df['Tx_ID'].isna()]
+            df = _normalize(df)
+            if len(unassigned):
+                # Backfill rows stored before Tx_ID existed, so their IDs stay fixed from now on
+                conn.executemany(f"UPDATE {TABLE_NAME} SET Tx_ID = ? WHERE id = ? AND Tx_ID IS NULL",
+                                 [(df.at[i, 'Tx_ID'], int(i)) for i in unassigned])
+        return compact_frame(df) if compact and not df.empty else df
+    except Exception as e:
+        print(f"SQLite Load Error: {e}")
+        return pd.DataFrame()
+
+def query_range(start=None, end=None, types=None, categories=None, active_only=False, db_file=None):
+    """
+    Range / category query that runs on the indexes instead of the whole ledger.
+    start, end: date-like (inclusive). types, categories: lists of 구분 / 대분류 values.
+    """
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("날짜 >= ?")
+        params.append(pd.to_datetime(start).strftime('%Y-%m-%d'))
+    if end is not None:
+        clauses.append("날짜 <= ?")
+        params.append(pd.to_datetime(end).strftime('%Y-%m-%d'))
+    if types:
+        clauses.append(f"구분 IN ({', '.join('?' * len(types))})")
+        params.extend(types)
+    if categories:
+        clauses.append(f"대분류 IN ({', '.join('?' * len(categories))})")
+        params.extend(categories)
+    if active_only:
+        clauses.append("Flow_Filter = 1")
+
+    sql = f"SELECT {', '.join(COLUMNS)} FROM {TABLE_NAME}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY 날짜 DESC, 시간 DESC"
+
+    try:
+        with connect_db(db_file) as conn:
+            df = pd.read_sql_query(sql, conn, params=params)
+        return _normalize(df)
+    except Exception as e:
+        print(f"SQLite Query Error: {e}")
+        return pd.DataFrame()
+
+def save_data(df, db_file=None):
+    """
+    Saves DataFrame to the SQLite store (Overwrites, in one transaction).
+    """
+    try:
+        save_df = expand_frame(df)
+
+        # Sync Flow_Filter
+        if 'Is_Active' in save_df.columns:
+            save_df['Flow_Filter'] = save_df['Is_Active'].apply(lambda x: 1 if x else 0)
+
+        rows = [to_db_row(r) for r in save_df.to_dict('records')]
+
+        with connect_db(db_file) as conn:
+            conn.execute(f"DELETE FROM {TABLE_NAME}")
+            conn.executemany(INSERT_SQL, rows)
+        return True
+
+    except Exception as e:
+        print(f"SQLite Save Error: {e}")
+        return False
+
+def row_id(label):
+    """Row id of a frame label (None for labels that aren't ids)."""
+    try:
+        return int(label)
+    except (TypeError, ValueError):
+        return None
+
+def apply_changes(conn, changes):
+    """
+    The statements of one change set on an open connection (the caller's transaction).
+    Rows are addressed by Tx_ID: UPDATE / DELETE ... WHERE Tx_ID (deleted labels without a known
+    Tx_ID fall back to the row id). New rows are inserted with id = their frame label when that id
+    is free, so the labels the app holds keep addressing them; an add whose Tx_ID is already stored
+    (a save sent twice) updates that row instead of duplicating it.
+    Edits of rows that are no longer stored are skipped. Returns the number of skipped edits.
+    """
+    deleted_ids = changes.get('deleted_ids', {})
+    by_tx = [(deleted_ids[l],) for l in changes['deleted'] if deleted_ids.get(l)]
+    by_id = [(i,) for i in (row_id(l) for l in changes['deleted'] if not deleted_ids.get(l)) if i is not None]
+    if by_tx:
+        conn.executemany(f"DELETE FROM {TABLE_NAME} WHERE Tx_ID = ?", by_tx)
+    if by_id:
+        conn.executemany(f"DELETE FROM {TABLE_NAME} WHERE id = ?", by_id)
+
+    skipped = 0
+    if not changes['updated'].empty:
+        updated = expand_frame(changes['updated'])
+        for label, r in zip(updated.index, updated.to_dict('records')):
+            values = to_db_row(r)
+            tx_id = values[-1]
+            if tx_id:
+                done = conn.execute(UPDATE_BY_TX_SQL, values + (tx_id,)).rowcount
+            else:
+                i = row_id(label)
+                done = conn.execute(UPDATE_SQL, values + (i,)).rowcount if i is not None else 0
+            skipped += done == 0
+
+    if not changes['added'].empty:
+        added = expand_frame(changes['added'])
+        for label, r in zip(added.index, added.to_dict('records')):
+            values = to_db_row(r)
+            if values[-1] and conn.execute(UPDATE_BY_TX_SQL, values + (values[-1],)).rowcount:
+                continue
+            i = row_id(label)
+            if i is not None and conn.execute(f"SELECT 1 FROM {TABLE_NAME} WHERE id = ?", (i,)).fetchone() is None:
+                conn.execute(INSERT_WITH_ID_SQL, (i,) + values)
+            else:
+                conn.execute(INSERT_SQL, values)
+
+    if skipped:
+        print(f"SQLite Save: {skipped} edited rows are no longer stored (skipped)")
+    return skipped
+
+def save_changes(df, changes, db_file=None):
+    """
+    Saves one change set (see change_set.py) with targeted statements in one transaction (apply_changes).
+    df (the full frame after the changes) is not needed here; kept for the common backend signature.
+    """
+    try:
+        with connect_db(db_file) as conn:
+            apply_changes(conn, changes)
+        return True
+
+    except Exception as e:
+        print(f"SQLite Save Error: {e}")
+        return False
+
+def get_kpi_metrics(df):
+    if df.empty: return {'income':0, 'expense':0, 'net':0, 'other':0}
+    active_df = df[df['Is_Active'] == True]
+    income = active_df[active_df['구분'] == '수입']['금액'].sum()
+    expense = active_df[active_df['구분'] == '지출']['금액'].sum()
+    other_df = df[(df['Is_Active'] == False) & (df['Flow_Filter'] == 1)]
+    other = other_df['금액'].sum() if not other_df.empty else 0
+    return {'income': income, 'expense': expense, 'net': income + expense, 'other': other}
+
+def add_row_optimized(new_row_dict, db_file=None):
+    """
+    Inserts a single row (one INSERT, nothing else is rewritten) with a Tx_ID not stored yet.
+    """
+    try:
+        row = assign_tx_ids(pd.DataFrame([new_row_dict]))
+        with connect_db(db_file) as conn:
+            taken = set()
+            # An identical stored row has the same content ID: take the next one (indexed lookups only)
+            while conn.execute(f"SELECT 1 FROM {TABLE_NAME} WHERE Tx_ID = ?", (row.at[0, 'Tx_ID'],)).fetchone():
+                taken.add(row.at[0, 'Tx_ID'])
+                row['Tx_ID'] = None
+                assign_tx_ids(row, existing=taken)
+            conn.execute(INSERT_SQL, to_db_row(row.iloc[0]))
+        return True
+    except Exception as e:
+        print(f"SQLite Add Row Error: {e}")
+        return False
+
+def import_from_excel():
+    """One-off migration: copies the Excel T_RawData sheet into the SQLite store."""
+    from data_manager_excel import load_data as load_excel
+
+    df = load_excel()
+    if df.empty:
+        print("No data loaded from Excel. Nothing imported.")
+        return False
+    if save_data(df):
+        print(f"✅ Imported {len(df)} rows into {DB_FILE}")
+        return True
+    return False
+
+if __name__ == "__main__":
+    import_from_excel()
@@ -0,0 +1,247 @@
+import hashlib
+
+import pandas as pd
+import numpy as np
+
+from flow_filter import compute_flow_filter
+
+# Shared, vectorized normalization of the T_RawData frame.
+# Used by data_manager (Google Sheets), data_manager_excel and data_manager_sqlite.
+
+# Version of the cleaned frame this module produces. Bump it whenever normalization changes the
+# loaded frame (columns, dtypes, derived values): caches of cleaned frames (snapshot_cache) keyed on it
+# are then rebuilt instead of serving frames of the old layout.
+SCHEMA_VERSION = 4
+
+# T_RawData layout (A:K) + the derived Is_Active flag
+EXPECTED_COLS = ['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모', 'Flow_Filter', 'Tx_ID', 'Is_Active']
+
+def pad_rows(rows, columns=EXPECTED_COLS):
+    """
+    Builds a DataFrame from ragged rows (list of lists), padding short rows with ""
+    and truncating long ones to len(columns).
+    """
+    if not rows:
+        return pd.DataFrame(columns=columns)
+    df = pd.DataFrame(rows)
+    df = df.reindex(columns=range(len(columns)))
+    df.columns = columns
+    return df.fillna("")
+
+def parse_dates(s):
+    """Dates with format inference: ISO fast path first, mixed formats only for the leftovers."""
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    out = pd.to_datetime(s, format='%Y-%m-%d', errors='coerce')
+    retry = out.isna() & s.notna() & (s.astype(str).str.strip() != "")
+    if retry.any():
+        out[retry] = pd.to_datetime(s[retry].astype(str), format='mixed', errors='coerce')
+    return out
+
+def parse_times(s):
+    """
+    Converts a column of time strings / time / datetime objects to datetime.time (None if missing).
+    'HH:MM:SS' fast path first, mixed formats only for the leftovers.
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        parsed = s
+    else:
+        text = s.astype(str).str.strip()
+        empty = s.isna() | text.isin(["", "None", "NaT", "nan"])
+        text = text.where(~empty)
+        parsed = pd.to_datetime(text, format='%H:%M:%S', errors='coerce')
+        retry = parsed.isna() & ~empty
+        if retry.any():
+            parsed[retry] = pd.to_datetime(text[retry], format='mixed', errors='coerce')
+    out = parsed.dt.time.astype(object)
+    return out.where(parsed.notna(), None)
+
+def parse_amounts(s):
+    """Numeric amounts; strings like '-12,000' have their commas stripped. Missing -> 0."""
+    if not pd.api.types.is_numeric_dtype(s):
+        s = s.astype(str).str.replace(',', '', regex=False).str.strip()
+    return pd.to_numeric(s, errors='coerce').fillna(0)
+
+def format_amounts(s):
+    """Amounts as '-12,000' strings (same as f"{int(x):,}", vectorized)."""
+    text = parse_amounts(s).astype('int64').astype(str)
+    return text.str.replace(r'\B(?=(\d{3})+(?!\d))', ',', regex=True)
+
+def flow_filter_active(s):
+    """Is_Active from Flow_Filter: same as str(x).strip().split('.')[0] == '1'."""
+    if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+        return ((s >= 1) & (s < 2)).fillna(False).astype(bool)
+    text = s.astype(str).str.strip()
+    return (text.str.split('.', n=1).str[0] == '1').fillna(False).astype(bool)
+
+def normalize_frame(df):
+    """
+    Type conversion shared by every loader:
+    날짜 -> datetime64, 시간 -> datetime.time, 금액 -> float (commas stripped, NaN -> 0),
+    Is_Active derived from Flow_Filter (or Flow_Filter from Is_Active).
+    Flow_Filter cells without a value (formula never calculated, new rows) are filled by the rule engine.
+    """
+    if '날짜' in df.columns:
+        df['날짜'] = parse_dates(df['날짜'])
+
+    if '시간' in df.columns:
+        df['시간'] = parse_times(df['시간'])
+
+    if '금액' in df.columns:
+        df['금액'] = parse_amounts(df['금액'])
+
+    if 'Flow_Filter' in df.columns:
+        missing = df['Flow_Filter'].isna() | df['Flow_Filter'].astype(str).str.strip().isin(["", "None", "nan"])
+        if missing.any() and '대분류' in df.columns:
+            df['Flow_Filter'] = df['Flow_Filter'].astype(object)
+            df.loc[missing, 'Flow_Filter'] = compute_flow_filter(df.loc[missing])
+        df['Is_Active'] = flow_filter_active(df['Flow_Filter'])
+    elif 'Is_Active' in df.columns:
+        df['Flow_Filter'] = np.where(df['Is_Active'].astype(bool), 1, 0)
+    elif '대분류' in df.columns:
+        df['Flow_Filter'] = compute_flow_filter(df)
+        df['Is_Active'] = df['Flow_Filter'] == 1
+    else:
+        df['Is_Active'] = True
+        df['Flow_Filter'] = 1
+
+    return df
+
+# ----------------- Transaction IDs -----------------
+# Tx_ID identifies a transaction independently of its row position / frame label.
+# A new row gets a content-derived ID (hash of its fields + occurrence number among identical rows),
+# so a ledger that was never saved with IDs gets the same IDs again on every load.
+# Once written, the ID is kept as-is: editing a transaction doesn't change it.
+
+TX_ID = 'Tx_ID'
+TX_ID_FIELDS = ['날짜', '시간', '구분', '내용', '금액', '결제수단']
+
+def _tx_keys(df):
+    """One key string per row from TX_ID_FIELDS (date / time / amount in canonical form)."""
+    parts = []
+    for col in TX_ID_FIELDS:
+        if col not in df.columns:
+            parts.append(pd.Series("", index=df.index))
+        elif col == '날짜':
+            parts.append(parse_dates(df[col]).dt.strftime('%Y-%m-%d').fillna(""))
+        elif col == '시간':
+            s = seconds_to_time(df[col]) if pd.api.types.is_integer_dtype(df[col]) else df[col].astype(object)
+            parts.append(s.where(s.notna(), "").astype(str))
+        elif col == '금액':
+            parts.append(parse_amounts(df[col]).round().astype('int64').astype(str))
+        else:
+            s = df[col].astype(object)
+            parts.append(s.where(s.notna(), "").astype(str).str.strip())
+    keys = parts[0]
+    for part in parts[1:]:
+        keys = keys + '\x1f' + part
+    return keys
+
+def _hash_id(key, n):
+    return hashlib.blake2b(f"{key}\x1f{n}".encode('utf-8'), digest_size=6).hexdigest()
+
+def make_tx_ids(df, taken=()):
+    """
+    Content-derived IDs for the rows of df (list, in row order).
+    Identical rows are told apart by their occurrence number; IDs in taken are never returned.
+    """
+    if df.empty:
+        return []
+    keys = _tx_keys(df)
+    occurrence = keys.groupby(keys, sort=False).cumcount()
+    used = set(taken)
+    ids = []
+    for key, n in zip(keys, occurrence):
+        tx_id = _hash_id(key, n)
+        while tx_id in used:
+            n += 1
+            tx_id = _hash_id(key, n)
+        used.add(tx_id)
+        ids.append(tx_id)
+    return ids
+
+def assign_tx_ids(df, existing=None):
+    """
+    Fills missing Tx_ID values (in place, returns df). Repeated IDs (copied rows) count as missing
+    after their first occurrence. existing: IDs used outside df (e.g. the ledger new rows go into).
+    """
+    if TX_ID not in df.columns:
+        df[TX_ID] = None
+    ids = df[TX_ID].astype(object)
+    text = ids.where(ids.notna(), "").astype(str).str.strip()
+    missing = text.isin(["", "None", "nan"])
+    missing |= text.duplicated() & ~missing
+    if not missing.any():
+        return df
+
+    taken = set(text[~missing])
+    if existing is not None:
+        taken.update(str(v) for v in existing if pd.notna(v) and str(v).strip())
+    df[TX_ID] = text.where(~missing, None).astype(object)
+    df.loc[missing, TX_ID] = make_tx_ids(df.loc[missing], taken)
+    return df
+
+# ----------------- Compact schema (opt-in) -----------------
+# Categorical codes for the low-cardinality text columns, 시간 as int64 seconds of day,
+# 금액 as int64 won, Is_Active bool, Flow_Filter int8. Several times smaller than the object frame,
+# and isin / groupby / sort_values(['날짜', '시간']) run on integer codes.
+# Savers call expand_frame() first, so a compact frame can be saved by any backend.
+
+COMPACT_CATEGORIES = ['구분', '대분류', '소분류', '결제수단']
+TIME_MISSING = -1   # 시간 seconds value for "no time"
+
+def time_to_seconds(s):
+    """시간 (time objects / 'HH:MM:SS' strings / seconds) -> int64 seconds of day, TIME_MISSING if empty."""
+    if pd.api.types.is_integer_dtype(s):
+        return s.astype('int64')
+    times = parse_times(s)
+    delta = pd.to_timedelta(times.astype(str).where(times.notna()), errors='coerce')
+    return (delta.dt.total_seconds().fillna(TIME_MISSING) // 1).astype('int64')
+
+def seconds_to_time(s):
+    """int64 seconds of day -> datetime.time objects (None for TIME_MISSING)."""
+    valid = s >= 0
+    times = pd.to_datetime(s.where(valid), unit='s').dt.time.astype(object)
+    return times.where(valid, None)
+
+def is_compact(df):
+    return '시간' in df.columns and pd.api.types.is_integer_dtype(df['시간'])
+
+def compact_frame(df):
+    """Converts a normalized frame to the compact schema (in place, returns df)."""
+    for col in COMPACT_CATEGORIES:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            s = df[col].astype(object)
+            df[col] = s.where(s.notna(), '').astype(str).astype('category')
+
+    if '시간' in df.columns:
+        df['시간'] = time_to_seconds(df['시간'])
+
+    if '금액' in df.columns:
+        df['금액'] = parse_amounts(df['금액']).round().astype('int64')
+
+    if 'Is_Active' in df.columns:
+        df['Is_Active'] = df['Is_Active'].fillna(False).astype(bool)
+
+    if 'Flow_Filter' in df.columns:
+        df['Flow_Filter'] = flow_filter_active(df['Flow_Filter']).astype('int8')
+
+    return df
+
+def expand_frame(df):
+    """Copy of df in the standard (object / time) schema; a plain copy if df isn't compact."""
+    out = df.copy()
+    for col in COMPACT_CATEGORIES:
+        if col in out.columns and isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype(object)
+    if is_compact(out):
+        out['시간'] = seconds_to_time(out['시간'])
+    return out
+
+def memory_report(df):
+    """Per-column dtype and deep memory usage (bytes), with a TOTAL row."""
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({'dtype': df.dtypes.astype(str), 'bytes': usage})
+    report.loc['TOTAL'] = ['', int(usage.sum())]
+    report['MB'] = (report['bytes'] / 1024 ** 2).round(2)
+    return report
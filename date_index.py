@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+# Sorted int64 (ns) date index over a frame's date column.
+# Any date range becomes one contiguous slice of the sorted keys, found with two binary searches,
+# so presets (이번 달 / 지난 달 / 월별 선택 / last N days) cost O(log n) instead of a full-column compare.
+
+NAT = np.iinfo(np.int64).min
+
+def _ns(value):
+    return pd.Timestamp(value).as_unit('ns').value
+
+def month_bounds(value):
+    """(first day, last day) of the month containing value."""
+    start = pd.Timestamp(value).to_period('M').to_timestamp()
+    return start, start + pd.offsets.MonthEnd(0)
+
+class DateIndex:
+    def __init__(self, dates):
+        values = pd.to_datetime(dates, errors='coerce').to_numpy(dtype='datetime64[ns]').view('int64')
+        self.n_rows = len(values)
+        # Frame sorted newest first (the app's order; NaT last, as sort_values puts it): no sort needed,
+        # key range [lo, hi) is the iloc range [n - hi, n - lo)
+        self.descending = len(values) > 0 and bool(np.all(values[:-1] >= values[1:]))
+        if self.descending:
+            n = len(values) - int(np.count_nonzero(values == NAT))
+            self.order = np.arange(n)[::-1]    # row positions in date order
+            self.keys = values[self.order]
+            self.contiguous = True
+            return
+        order = np.argsort(values, kind='stable')
+        keys = values[order]
+        n_nat = int(np.searchsorted(keys, NAT, side='right'))   # NaT sorts first
+        self.order = order[n_nat:]    # row positions in date order
+        self.keys = keys[n_nat:]
+        # Frame already sorted by date: slices map straight to iloc ranges
+        self.contiguous = n_nat == 0 and bool(np.all(self.order == np.arange(len(self.order))))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def bounds(self, start=None, end=None, end_inclusive=True):
+        """[lo, hi) into the sorted keys for start <= date <= end (or < end)."""
+        lo = 0 if start is None else int(np.searchsorted(self.keys, _ns(start), side='left'))
+        hi = len(self.keys) if end is None else int(np.searchsorted(self.keys, _ns(end), side='right' if end_inclusive else 'left'))
+        return lo, max(lo, hi)
+
+    def day_bounds(self, start_day=None, end_day=None):
+        """Calendar-day range, both days inclusive (times within the last day count)."""
+        end = None if end_day is None else pd.Timestamp(end_day).normalize() + pd.Timedelta(days=1)
+        start = None if start_day is None else pd.Timestamp(start_day).normalize()
+        return self.bounds(start, end, end_inclusive=False)
+
+    def positions(self, start_day=None, end_day=None, sort=True):
+        """Row positions (iloc) in the day range; sorted ascending unless sort=False."""
+        lo, hi = self.day_bounds(start_day, end_day)
+        pos = self.order[lo:hi]
+        if self.descending:
+            return pos[::-1] if sort else pos
+        return np.sort(pos) if sort and not self.contiguous else pos
+
+    def _take(self, df, lo, hi):
+        if self.descending:
+            n = len(self.keys)
+            return df.iloc[n - hi:n - lo]
+        if self.contiguous:
+            return df.iloc[lo:hi]
+        return df.iloc[np.sort(self.order[lo:hi])]
+
+    def slice(self, df, start_day=None, end_day=None):
+        """Rows of df (the frame the index was built on) in the day range."""
+        return self._take(df, *self.day_bounds(start_day, end_day))
+
+    def slice_between(self, df, start=None, end=None, end_inclusive=True):
+        """Rows of df with start <= date <= end (or < end), exact timestamps."""
+        return self._take(df, *self.bounds(start, end, end_inclusive))
+
+    def count(self, start_day=None, end_day=None):
+        lo, hi = self.day_bounds(start_day, end_day)
+        return hi - lo
+
+    def min(self):
+        return pd.Timestamp(self.keys[0]) if len(self.keys) else pd.NaT
+
+    def max(self):
+        return pd.Timestamp(self.keys[-1]) if len(self.keys) else pd.NaT
+
+    def months(self, descending=True):
+        """Distinct 'YYYY-MM' months present."""
+        months = np.unique(self.keys.view('datetime64[ns]').astype('datetime64[M]')).astype(str)
+        return (months[::-1] if descending else months).tolist()
@@ -0,0 +1,304 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+import data_manager_excel
+from data_manager_sqlite import to_db_row, rows_to_frame, COLUMNS
+from data_normalize import compact_frame, expand_frame, assign_tx_ids
+from change_set import apply_change_set, empty_change_set, is_empty
+
+# Append-only edit journal in front of a backend (the Excel workbook by default):
+# every save appends transaction-level ops to a JSONL file and fsyncs it, nothing else is written.
+# A compactor folds the journal into T_RawData with the backend's save_changes (the XLSX part patch,
+# written to a temp file and swapped in with os.replace) and then drops the folded entries.
+# A crash mid-compaction leaves the workbook untouched or fully saved, and the journal intact:
+# replaying ops by Tx_ID is idempotent, so the next compaction / load gets the same result.
+#
+# One entry per line: {"seq": 12, "ts": 1734160000.0, "op": "add" | "update" | "delete", "Tx_ID": "...",
+#                      "row": [values in data_manager_sqlite.COLUMNS order] (add / update)}
+#
+# stats: appended (entries), compactions, compacted (entries folded into the workbook), compact_errors
+
+JOURNAL_FILE = 'edit_journal.jsonl'
+COMPACT_INTERVAL = 60       # seconds between background compactions
+COMPACT_THRESHOLD = 500     # entries that trigger a compaction right away
+
+TX = COLUMNS.index('Tx_ID')
+
+def fold_ops(ops):
+    """
+    Journal ops [(op, Tx_ID, row, base)] in order -> one intent per Tx_ID: {Tx_ID: (op, row, base)}.
+    add + update -> add (latest values), add + delete -> nothing, update + delete -> delete,
+    delete + add -> add. base: the base of the first op (None: the row was never synced).
+    """
+    intents = {}
+    for op, tx_id, row, base in ops:
+        prev = intents.get(tx_id)
+        if prev is None:
+            intents[tx_id] = (op, row, base)
+        elif op == 'delete':
+            if prev[0] == 'add' and prev[2] is None:
+                del intents[tx_id]
+            else:
+                intents[tx_id] = ('delete', None, prev[2])
+        else:
+            intents[tx_id] = ('add' if prev[0] in ('add', 'delete') else 'update', row, prev[2])
+    return intents
+
+def changes_for(df, intents):
+    """
+    Change set that applies the folded intents to a loaded frame, matching rows by Tx_ID.
+    Idempotent: adds of rows already there become updates, deletes of missing rows are skipped,
+    rows that already hold the values are left out.
+    """
+    rows = {row[TX]: (label, row) for label, row in zip(df.index, map(to_db_row, expand_frame(df).to_dict('records')))}
+    changes = empty_change_set()
+    updated, labels, added = [], [], []
+    for tx_id, (op, row, _) in intents.items():
+        current = rows.get(tx_id)
+        if op == 'delete':
+            if current is not None:
+                changes['deleted'].append(current[0])
+        elif current is None:
+            added.append(row)
+        elif current[1] != tuple(row):
+            updated.append(row)
+            labels.append(current[0])
+    if updated:
+        changes['updated'] = rows_to_frame(updated, index=labels)
+    if added:
+        start = int(df.index.max()) + 1 if not df.empty else 0
+        changes['added'] = rows_to_frame(added, index=range(start, start + len(added)))
+    return changes
+
+class EditJournal:
+    """The JSONL file: durable appends (fsync), tolerant reads, atomic truncation."""
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.last_seq = None            # read from the file on the first append
+        self.count = None               # entries in the file
+
+    def _repair(self):
+        """Drops a torn last line (an append interrupted before its fsync returned, so never acknowledged)."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            if data and not data.endswith(b'\n'):
+                f.truncate(data.rfind(b'\n') + 1)
+                print(f"Journal: dropped a torn entry at the end of {self.path}")
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        print(f"Journal: skipped an unreadable entry in {self.path}")
+        return entries
+
+    def entries(self):
+        with self.lock:
+            return self._read()
+
+    def append(self, ops):
+        """Writes [(op, Tx_ID, row)] and returns once they are on disk."""
+        if not ops:
+            return 0
+        with self.lock:
+            if self.last_seq is None:
+                self._repair()
+                existing = self._read()
+                self.last_seq = existing[-1]['seq'] if existing else 0
+                self.count = len(existing)
+            now = time.time()
+            lines = []
+            for op, tx_id, row in ops:
+                self.last_seq += 1
+                lines.append(json.dumps({'seq': self.last_seq, 'ts': now, 'op': op, 'Tx_ID': tx_id,
+                                         'row': list(row) if row is not None else None}, ensure_ascii=False))
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.count += len(ops)
+        return len(ops)
+
+    def truncate_through(self, seq):
+        """Removes the entries up to seq (folded into the workbook); later ones are kept. Atomic."""
+        with self.lock:
+            keep = [e for e in self._read() if e['seq'] > seq]
+            fd, tmp_path = tempfile.mkstemp(suffix='.jsonl', dir=os.path.dirname(os.path.abspath(self.path)))
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.writelines(json.dumps(e, ensure_ascii=False) + '\n' for e in keep)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                if self.count is not None:
+                    self.count = len(keep)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+def _journal_ops(entries):
+    return [(e['op'], e['Tx_ID'], tuple(e['row']) if e.get('row') is not None else None, None) for e in entries]
+
+class JournaledStore:
+    def __init__(self, backend=data_manager_excel, path=JOURNAL_FILE, interval=COMPACT_INTERVAL,
+                 threshold=COMPACT_THRESHOLD):
+        self.backend = backend          # module with load_data / save_changes (data_manager_excel)
+        self.journal = EditJournal(path)
+        self.interval = interval
+        self.threshold = threshold
+        self._frame = None              # frame last loaded / saved: resolves deleted labels, diff base of save_data
+        self._compact_lock = threading.Lock()   # a load never sees the workbook before and the journal after a compaction
+        self._thread_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.stats = {'appended': 0, 'compactions': 0, 'compacted': 0, 'compact_errors': 0}
+
+    def load_data(self, compact=False):
+        """The backend's data with the journal replayed on top."""
+        try:
+            with self._compact_lock:
+                df = self.backend.load_data()
+                entries = self.journal.entries()
+            if entries and '날짜' in df.columns:
+                df = apply_change_set(df, changes_for(df, fold_ops(_journal_ops(entries))))
+            self._frame = df
+            self.start()
+            return compact_frame(df) if compact and not df.empty else df
+        except Exception as e:
+            print(f"Journal Load Error: {e}")
+            return pd.DataFrame()
+
+    def change_token(self):
+        """The backend's token + the journal size (moves with every append and every compaction)."""
+        size = os.path.getsize(self.journal.path) if os.path.exists(self.journal.path) else 0
+        return (self.backend.change_token(), size)
+
+    def _append(self, ops):
+        n = self.journal.append(ops)
+        self.stats['appended'] += n
+        if n and self.journal.count >= self.threshold:
+            self._wake.set()
+        return True
+
+    def save_changes(self, df, changes):
+        """Journals one change set (see change_set.py). df: the full frame after the changes."""
+        try:
+            ids = self._frame['Tx_ID'] if self._frame is not None and 'Tx_ID' in self._frame.columns else None
+            # Deleted rows by the Tx_IDs the change set carries, else by the label in the last frame
+            deleted_ids = changes.get('deleted_ids', {})
+            ops = []
+            for label in changes['deleted']:
+                tx_id = deleted_ids.get(label) or (ids[label] if ids is not None and label in ids.index else None)
+                if tx_id:
+                    ops.append(('delete', tx_id, None))
+            for op, frame in (('update', changes['updated']), ('add', changes['added'])):
+                if not frame.empty:
+                    frame = assign_tx_ids(expand_frame(frame), existing=ids)
+                    ops += [(op, row[TX], row) for row in map(to_db_row, frame.to_dict('records'))]
+            self._append(ops)
+            self._frame = df if df is not None else apply_change_set(self._frame, changes)
+            return True
+        except Exception as e:
+            print(f"Journal Save Error: {e}")
+            return False
+
+    def save_data(self, df):
+        """Full-frame save: diffed against the last loaded / saved frame by Tx_ID, only the differences are journaled."""
+        try:
+            if self._frame is None:
+                self.load_data()
+            save_df = expand_frame(df)
+            if 'Is_Active' in save_df.columns:
+                save_df['Flow_Filter'] = save_df['Is_Active'].apply(lambda x: 1 if x else 0)
+            save_df = assign_tx_ids(save_df)
+            old_rows = {row[TX]: row for row in map(to_db_row, expand_frame(self._frame).to_dict('records'))}
+            new_rows = {row[TX]: row for row in map(to_db_row, save_df.to_dict('records'))}
+            ops = [('delete', tx_id, None) for tx_id in old_rows if tx_id not in new_rows]
+            ops += [('add' if tx_id not in old_rows else 'update', tx_id, row)
+                    for tx_id, row in new_rows.items() if old_rows.get(tx_id) != row]
+            self._append(ops)
+            self._frame = save_df
+            return True
+        except Exception as e:
+            print(f"Journal Save Error: {e}")
+            return False
+
+    def add_row_optimized(self, new_row_dict):
+        changes = empty_change_set()
+        changes['added'] = rows_to_frame([to_db_row(new_row_dict)])
+        return self.save_changes(None, changes)
+
+    def compact(self):
+        """Folds the journal into the backend (one save_changes) and drops the folded entries. Returns their number."""
+        with self._compact_lock:
+            entries = self.journal.entries()
+            if not entries:
+                return 0
+            df = self.backend.load_data()
+            if '날짜' not in df.columns:
+                raise RuntimeError("ledger not readable, journal kept")
+            changes = changes_for(df, fold_ops(_journal_ops(entries)))
+            if not is_empty(changes) and not self.backend.save_changes(apply_change_set(df, changes), changes):
+                raise RuntimeError("compaction save failed, journal kept")
+            self.journal.truncate_through(entries[-1]['seq'])
+            self.stats['compactions'] += 1
+            self.stats['compacted'] += len(entries)
+            return len(entries)
+
+    def start(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='journal-compactor', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.compact()
+            except Exception as e:
+                self.stats['compact_errors'] += 1
+                print(f"Journal compaction error (retrying later): {e}")
+
+# Process-wide journal over the Excel workbook, used through the backend functions below
+STORE = JournaledStore()
+
+def load_data(compact=False):
+    return STORE.load_data(compact)
+
+def save_data(df):
+    return STORE.save_data(df)
+
+def save_changes(df, changes):
+    return STORE.save_changes(df, changes)
+
+def add_row_optimized(new_row_dict):
+    return STORE.add_row_optimized(new_row_dict)
+
+def change_token():
+    return STORE.change_token()
+
+def compact():
+    return STORE.compact()
+
+get_kpi_metrics = data_manager_excel.get_kpi_metrics
+
+if __name__ == "__main__":
+    # On-demand compaction: python edit_journal.py
+    print(f"Compacted {compact()} journal entries into {data_manager_excel.DATA_FILE}")
@@ -0,0 +1,110 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Memoized filter pipeline for the app's search / date / 구분 / 대분류 filters.
+# Each filter resolves to a sorted array of row positions, cached under (data version, filter, value),
+# and the final view intersects them. Changing one filter recomputes only that piece;
+# a rerun with unchanged filters returns the cached frame.
+
+class FilterEngine:
+    def __init__(self, maxsize=64, max_views=4):
+        self.maxsize = maxsize
+        self.max_views = max_views
+        self.df = None
+        self.version = None
+        self.search_index = None
+        self.date_index = None
+        self._masks = OrderedDict()   # (version, kind, value) -> positions
+        self._views = OrderedDict()   # (version, filters...) -> filtered frame
+        self.stats = {'hits': 0, 'misses': 0, 'view_hits': 0}
+
+    def bind(self, df, version, search_index=None, date_index=None):
+        """Points the engine at the current working frame; a new version drops the old entries."""
+        if version != self.version or df is not self.df:
+            self.df = df
+            self.version = version
+            self.search_index = search_index
+            self.date_index = date_index
+            self._masks.clear()
+            self._views.clear()
+        return self
+
+    def _cached(self, cache, limit, key, compute):
+        if key in cache:
+            cache.move_to_end(key)
+            self.stats['hits' if cache is self._masks else 'view_hits'] += 1
+            return cache[key]
+        if cache is self._masks:
+            self.stats['misses'] += 1
+        value = compute()
+        cache[key] = value
+        if len(cache) > limit:
+            cache.popitem(last=False)
+        return value
+
+    # --- Sub-masks (sorted row positions) ---
+    def _search_positions(self, term):
+        if self.search_index is not None:
+            hits = self.search_index.search(term)
+            if hits is None:
+                return None
+            return np.flatnonzero(self.df.index.isin(list(hits)))
+        mask = np.zeros(len(self.df), dtype=bool)
+        for col in ['내용', '메모', '대분류', '소분류']:
+            if col in self.df.columns:
+                mask |= self.df[col].astype(str).str.contains(term, case=False, na=False, regex=False).to_numpy()
+        return np.flatnonzero(mask)
+
+    def _date_positions(self, start, end):
+        if self.date_index is not None:
+            return self.date_index.positions(start, end)
+        dates = self.df['날짜']
+        mask = (dates >= start) & (dates < end + pd.Timedelta(days=1))
+        return np.flatnonzero(mask.to_numpy())
+
+    def _isin_positions(self, col, values):
+        return np.flatnonzero(self.df[col].isin(values).to_numpy())
+
+    def positions(self, search_term=None, date_range=None, types=None, categories=None):
+        """Sorted positions (iloc) of the rows passing every given filter; None = no filter at all."""
+        parts = []
+        v = self.version
+        if search_term:
+            term = search_term.strip()
+            p = self._cached(self._masks, self.maxsize, (v, 'search', term), lambda: self._search_positions(term))
+            if p is not None:
+                parts.append(p)
+        if date_range is not None and len(date_range) == 2:
+            start = pd.Timestamp(date_range[0]).normalize()
+            end = pd.Timestamp(date_range[1]).normalize()
+            parts.append(self._cached(self._masks, self.maxsize, (v, 'date', start, end), lambda: self._date_positions(start, end)))
+        if types:
+            key = tuple(sorted(map(str, types)))
+            parts.append(self._cached(self._masks, self.maxsize, (v, '구분', key), lambda: self._isin_positions('구분', types)))
+        if categories:
+            key = tuple(sorted(map(str, categories)))
+            parts.append(self._cached(self._masks, self.maxsize, (v, '대분류', key), lambda: self._isin_positions('대분류', categories)))
+
+        if not parts:
+            return None
+        out = min(parts, key=len)
+        for p in parts:
+            if p is not out:
+                out = np.intersect1d(out, p, assume_unique=True)
+        return out
+
+    def apply(self, search_term=None, date_range=None, types=None, categories=None):
+        """The filtered frame (cached per data version + filter values; treat it as read-only)."""
+        key = (
+            self.version,
+            (search_term or '').strip(),
+            tuple(pd.Timestamp(d).normalize() for d in date_range) if date_range is not None and len(date_range) == 2 else None,
+            tuple(sorted(map(str, types))) if types else None,
+            tuple(sorted(map(str, categories))) if categories else None,
+        )
+        def compute():
+            pos = self.positions(search_term, date_range, types, categories)
+            return self.df if pos is None else self.df.iloc[pos]
+        return self._cached(self._views, self.max_views, key, compute)
@@ -0,0 +1,141 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Flow_Filter rule engine (single source of truth).
+# Same logic as the T_RawData Excel formula in create_formula_engine.py:
+#   0 if (대분류 = '이동' AND 소분류 IN ('이체', '투자')) OR 메모 contains '투자' / '이체' / '충전', else 1
+# Evaluated vectorized over the whole frame; rule sets can be overridden with flow_filter_rules.json.
+
+RULES_FILE = 'flow_filter_rules.json'
+
+DEFAULT_RULES = {
+    # Any matching category rule -> Flow_Filter 0 (internal movement, excluded from income/expense)
+    'category_rules': [
+        {'대분류': '이동', '소분류': ['이체', '투자']},
+    ],
+    # Memo keywords (case-insensitive substring, like Excel SEARCH) -> Flow_Filter 0
+    'memo_keywords': ['투자', '이체', '충전'],
+}
+
+# Column names of frames that use the English DB_Raw schema
+ENG_COLUMNS = {'대분류': 'main_category', '소분류': 'sub_category', '메모': 'memo'}
+
+_COMPILED = {}
+
+def load_rules(path=RULES_FILE):
+    """User rule set from JSON (same shape as DEFAULT_RULES), or the defaults."""
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                rules = json.load(f)
+            return {
+                'category_rules': rules.get('category_rules', DEFAULT_RULES['category_rules']),
+                'memo_keywords': rules.get('memo_keywords', DEFAULT_RULES['memo_keywords']),
+            }
+        except Exception as e:
+            print(f"Flow_Filter rules error ({path}), using defaults: {e}")
+    return DEFAULT_RULES
+
+# path -> (mtime, size, rules): the rule file is parsed again only when it changed
+_LOADED = {}
+
+def current_rules(path=RULES_FILE):
+    """load_rules() cached per file state (loaders call the engine on every load)."""
+    try:
+        st = os.stat(path)
+        state = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        state = None
+    cached = _LOADED.get(path)
+    if cached is not None and cached[0] == state:
+        return cached[1]
+    rules = load_rules(path)
+    _LOADED[path] = (state, rules)
+    return rules
+
+def _compile(rules):
+    """One alternation regex for all memo keywords (longest first), cached per rule set."""
+    key = json.dumps(rules, ensure_ascii=False, sort_keys=True)
+    if key not in _COMPILED:
+        keywords = sorted({k for k in rules.get('memo_keywords', []) if k}, key=len, reverse=True)
+        pattern = re.compile('|'.join(re.escape(k) for k in keywords), re.IGNORECASE) if keywords else None
+        _COMPILED[key] = pattern
+    return _COMPILED[key]
+
+def _as_list(value):
+    return value if isinstance(value, (list, tuple, set)) else [value]
+
+def compute_flow_filter(df, rules=None, columns=None):
+    """
+    Returns the Flow_Filter (int 0/1) Series for every row of df.
+    columns: optional mapping of rule column names to the frame's columns (e.g. ENG_COLUMNS).
+    """
+    rules = rules or current_rules()
+    columns = columns or {}
+    def text(name):
+        col = columns.get(name, name)
+        if col not in df.columns:
+            return pd.Series("", index=df.index)
+        return df[col].fillna("").astype(str).str.strip()
+
+    excluded = pd.Series(False, index=df.index)
+
+    for rule in rules.get('category_rules', []):
+        match = pd.Series(True, index=df.index)
+        for name, allowed in rule.items():
+            match &= text(name).isin([str(v) for v in _as_list(allowed)])
+        excluded |= match
+
+    pattern = _compile(rules)
+    if pattern is not None:
+        excluded |= text('메모').str.contains(pattern, na=False)
+
+    return pd.Series(np.where(excluded, 0, 1), index=df.index)
+
+def apply_flow_filter(df, index=None, rules=None):
+    """
+    (Re)computes Flow_Filter and Is_Active in place.
+    index: only these row labels (e.g. the rows that were edited / added); None -> all rows.
+    """
+    target = df if index is None else df.loc[index]
+    if target.empty:
+        return df
+    flow = compute_flow_filter(target, rules)
+    df.loc[target.index, 'Flow_Filter'] = flow
+    df.loc[target.index, 'Is_Active'] = flow == 1
+    return df
+
+def excel_formula(row, rules=None, col_letters=None):
+    """
+    The same rule set as an Excel formula for T_RawData row `row`
+    (default columns: D=대분류, E=소분류, I=메모).
+    """
+    rules = rules or current_rules()
+    col_letters = col_letters or {'대분류': 'D', '소분류': 'E', '메모': 'I'}
+
+    def quote(v): return '"' + str(v).replace('"', '""') + '"'
+
+    conditions = []
+    for rule in rules.get('category_rules', []):
+        parts = []
+        for name, allowed in rule.items():
+            ref = f"{col_letters[name]}{row}"
+            values = _as_list(allowed)
+            if len(values) == 1:
+                parts.append(f"{ref}={quote(values[0])}")
+            else:
+                parts.append("OR(" + ",".join(f"{ref}={quote(v)}" for v in values) + ")")
+        conditions.append(parts[0] if len(parts) == 1 else "AND(" + ",".join(parts) + ")")
+
+    keywords = [k for k in rules.get('memo_keywords', []) if k]
+    if keywords:
+        memo = f"{col_letters['메모']}{row}"
+        conditions.append("OR(" + ",".join(f"ISNUMBER(SEARCH({quote(k)},{memo}))" for k in keywords) + ")")
+
+    if not conditions:
+        return "=1"
+    return f"=IF(OR({','.join(conditions)}),0,1)"
@@ -0,0 +1,335 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+import data_manager
+from data_manager_sqlite import (connect_db, to_db_row, rows_to_frame, apply_changes, row_id, get_kpi_metrics,
+                                 load_data as load_store, TABLE_NAME, COLUMNS, INSERT_SQL, UPDATE_BY_TX_SQL)
+from data_normalize import expand_frame, assign_tx_ids
+from change_set import apply_change_set, empty_change_set, is_empty
+from edit_journal import fold_ops
+
+# Offline-first storage for the app: reads and writes go to a local SQLite replica of the ledger
+# (same store as data_manager_sqlite), every local write is journaled in pending_ops, and a background
+# thread syncs with Google Sheets (data_manager):
+#   push: the journal folded per Tx_ID, sent as one change set against the current sheet
+#   pull: when the sheet's change token moved, remote rows are applied to the replica by Tx_ID
+#         (rows with unpushed local edits are left alone), so replica row ids / frame labels stay stable
+#
+# Conflicts (the sheet changed a row since the edit was made) are resolved the same way every time:
+#   local update vs remote update: field-level three-way merge against the row the edit was made on,
+#                                  fields changed on both sides take the local value
+#   local update vs remote delete: the delete wins
+#   local delete vs remote update: the delete wins
+#
+# stats: pushes, pulls, ops_pushed, conflicts, sync_errors
+
+REPLICA_DB = 'expense_replica.db'
+SYNC_INTERVAL = 30      # seconds between syncs
+MAX_BACKOFF = 600       # longest wait between retries while offline
+
+TX = COLUMNS.index('Tx_ID')
+
+REPLICA_SQL = """
+CREATE TABLE IF NOT EXISTS pending_ops (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    op TEXT NOT NULL,
+    Tx_ID TEXT NOT NULL,
+    row TEXT,
+    base TEXT,
+    created REAL
+);
+CREATE TABLE IF NOT EXISTS synced_rows (Tx_ID TEXT PRIMARY KEY, row TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def _dumps(row):
+    return None if row is None else json.dumps(list(row), ensure_ascii=False)
+
+def _loads(text):
+    return None if text is None else tuple(json.loads(text))
+
+def merge_rows(base, remote, local):
+    """Three-way merge of row tuples: fields the local edit changed take the local value, the rest the remote one."""
+    if base is None:
+        return local
+    return tuple(l if l != b else r for b, r, l in zip(base, remote, local))
+
+def _remote_rows(df):
+    """{Tx_ID: (label, row tuple)} of a loaded frame (rows without a date / time included: to_db_row stores them empty)."""
+    return {row[TX]: (label, row)
+            for label, row in zip(df.index, map(to_db_row, expand_frame(df).to_dict('records')))}
+
+class LocalReplica:
+    def __init__(self, db_file=REPLICA_DB, remote=data_manager, interval=SYNC_INTERVAL, max_backoff=MAX_BACKOFF):
+        self.db_file = db_file
+        self.remote = remote            # module with load_data / save_changes / change_token (data_manager)
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.lock = threading.RLock()   # local writes; sync takes it only to apply results, never over the network
+        self._sync_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.failures = 0
+        self.last_error = None
+        self.last_sync = None
+        self.stats = {'pushes': 0, 'pulls': 0, 'ops_pushed': 0, 'conflicts': 0, 'sync_errors': 0}
+
+    @contextmanager
+    def connect(self):
+        with connect_db(self.db_file) as conn:
+            conn.executescript(REPLICA_SQL)
+            yield conn
+
+    def _state(self, key):
+        with self.connect() as conn:
+            row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, conn, key, value):
+        conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+    def _bump(self, conn):
+        row = conn.execute("SELECT value FROM sync_state WHERE key = 'revision'").fetchone()
+        self._set_state(conn, 'revision', str(int(row[0]) + 1 if row else 1))
+
+    # ----------------- Local side (the backend API) -----------------
+
+    def load_data(self, compact=False):
+        """The ledger from the local replica (synced once, blocking, if the replica was never synced)."""
+        if self._state('remote_token') is None and not self.pending():
+            try:
+                self.sync_once()
+            except Exception as e:
+                self._sync_failed(e)
+        self.start()
+        return load_store(compact, db_file=self.db_file)
+
+    def change_token(self):
+        """Revision of the replica: bumped by every local write and every pull that changed rows."""
+        return self._state('revision')
+
+    def _journal(self, conn, ops):
+        """Appends [(op, Tx_ID, row)] to pending_ops, each with the synced row it was made on."""
+        entries = []
+        for op, tx_id, row in ops:
+            base = conn.execute("SELECT row FROM synced_rows WHERE Tx_ID = ?", (tx_id,)).fetchone()
+            entries.append((op, tx_id, _dumps(row), base[0] if base else None, time.time()))
+        conn.executemany("INSERT INTO pending_ops (op, Tx_ID, row, base, created) VALUES (?, ?, ?, ?, ?)", entries)
+
+    def save_changes(self, df, changes):
+        """
+        Applies one change set to the replica and journals it, in one transaction. No network.
+        Deleted rows are identified by the Tx_IDs in deleted_ids (a pull may have given a label the
+        session holds to another row); the row id is only a fallback for labels without one.
+        """
+        try:
+            ops = []
+            deleted_ids = changes.get('deleted_ids', {})
+            with self.lock, self.connect() as conn:
+                for label in changes['deleted']:
+                    tx_id = deleted_ids.get(label)
+                    if not tx_id:
+                        i = row_id(label)
+                        found = conn.execute(f"SELECT Tx_ID FROM {TABLE_NAME} WHERE id = ?", (i,)).fetchone() \
+                            if i is not None else None
+                        tx_id = found[0] if found else None
+                    if tx_id:
+                        ops.append(('delete', tx_id, None))
+                for op, frame in (('update', changes['updated']), ('add', changes['added'])):
+                    if not frame.empty:
+                        ops += [(op, row[TX], row) for row in map(to_db_row, expand_frame(frame).to_dict('records'))]
+                apply_changes(conn, changes)
+                self._journal(conn, ops)
+                self._bump(conn)
+            self.nudge()
+            return True
+        except Exception as e:
+            print(f"Replica Save Error: {e}")
+            return False
+
+    def save_data(self, df):
+        """Full-frame save: diffed against the replica by Tx_ID, written and journaled as targeted ops."""
+        try:
+            save_df = expand_frame(df)
+            if 'Is_Active' in save_df.columns:
+                save_df['Flow_Filter'] = save_df['Is_Active'].apply(lambda x: 1 if x else 0)
+            new_rows = {row[TX]: row for row in map(to_db_row, assign_tx_ids(save_df).to_dict('records'))}
+            with self.lock, self.connect() as conn:
+                old_rows = {r[TX]: tuple(r) for r in conn.execute(f"SELECT {', '.join(COLUMNS)} FROM {TABLE_NAME}")}
+                ops = [('delete', tx_id, None) for tx_id in old_rows if tx_id not in new_rows]
+                ops += [('add' if tx_id not in old_rows else 'update', tx_id, row)
+                        for tx_id, row in new_rows.items() if old_rows.get(tx_id) != row]
+                self._write_rows(conn, [row for op, _, row in ops if row is not None],
+                                 [tx_id for op, tx_id, _ in ops if op == 'delete'])
+                self._journal(conn, ops)
+                self._bump(conn)
+            self.nudge()
+            return True
+        except Exception as e:
+            print(f"Replica Save Error: {e}")
+            return False
+
+    def add_row_optimized(self, new_row_dict):
+        changes = empty_change_set()
+        # No frame label: the replica picks the row id
+        changes['added'] = assign_tx_ids(pd.DataFrame([new_row_dict], index=[None]))
+        return self.save_changes(None, changes)
+
+    def _write_rows(self, conn, rows, deleted):
+        """Upserts row tuples / deletes Tx_IDs in the replica table (row ids of kept rows don't change)."""
+        if deleted:
+            conn.executemany(f"DELETE FROM {TABLE_NAME} WHERE Tx_ID = ?", [(tx_id,) for tx_id in deleted])
+        for row in rows:
+            if conn.execute(UPDATE_BY_TX_SQL, tuple(row) + (row[TX],)).rowcount == 0:
+                conn.execute(INSERT_SQL, tuple(row))
+
+    # ----------------- Sync -----------------
+
+    def pending(self):
+        """Journaled local ops not pushed yet."""
+        with self.connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM pending_ops").fetchone()[0]
+
+    def status(self):
+        return {'pending': self.pending(), 'last_sync': self.last_sync, 'last_error': self.last_error,
+                'failures': self.failures}
+
+    def _remote_frame(self):
+        df = self.remote.load_data()
+        # Loaders return a frame without columns on error (an empty sheet still has them)
+        if df is None or '날짜' not in df.columns:
+            raise ConnectionError("remote ledger not available")
+        return df
+
+    def push(self):
+        """Sends the journal as one change set against the current sheet. Returns the number of ops pushed."""
+        with self.connect() as conn:
+            ops = conn.execute("SELECT seq, op, Tx_ID, row, base FROM pending_ops ORDER BY seq").fetchall()
+        if not ops:
+            return 0
+
+        remote_df = self._remote_frame()
+        remote = _remote_rows(remote_df)
+        deleted, updated, labels, added = [], [], [], []
+        conflicts = 0
+        for tx_id, (op, row, base) in fold_ops([(op, tx_id, _loads(row), _loads(base))
+                                                for _, op, tx_id, row, base in ops]).items():
+            current = remote.get(tx_id)
+            changed_remotely = current is not None and base is not None and current[1] != base
+            if op == 'delete':
+                if current is not None:
+                    deleted.append(current[0])
+                    conflicts += changed_remotely
+            elif current is None:
+                if op == 'update' and base is not None:
+                    # Deleted on the sheet since the edit: the delete wins
+                    conflicts += 1
+                    continue
+                added.append(row)
+            else:
+                conflicts += changed_remotely
+                merged = merge_rows(base, current[1], row)
+                if merged != current[1]:
+                    updated.append(merged)
+                    labels.append(current[0])
+
+        changes = empty_change_set()
+        changes['deleted'] = deleted
+        if updated:
+            changes['updated'] = rows_to_frame(updated, index=labels)
+        if added:
+            start = int(remote_df.index.max()) + 1 if not remote_df.empty else 0
+            changes['added'] = rows_to_frame(added, index=range(start, start + len(added)))
+        if not is_empty(changes) and not self.remote.save_changes(apply_change_set(remote_df, changes), changes):
+            raise ConnectionError("remote save failed")
+
+        with self.lock, self.connect() as conn:
+            conn.execute("DELETE FROM pending_ops WHERE seq <= ?", (ops[-1][0],))
+        self.stats['pushes'] += 1
+        self.stats['ops_pushed'] += len(ops)
+        self.stats['conflicts'] += conflicts
+        return len(ops)
+
+    def pull(self, force=False):
+        """Applies the sheet's rows to the replica if its change token moved. Returns True if it read the sheet."""
+        token = self.remote.change_token()
+        if not force and token is not None and str(token) == self._state('remote_token'):
+            return False
+
+        remote = {tx_id: row for tx_id, (_, row) in _remote_rows(self._remote_frame()).items()}
+        with self.lock, self.connect() as conn:
+            pending = {r[0] for r in conn.execute("SELECT DISTINCT Tx_ID FROM pending_ops")}
+            local = {r[TX]: tuple(r) for r in conn.execute(f"SELECT {', '.join(COLUMNS)} FROM {TABLE_NAME}")}
+            rows = [row for tx_id, row in remote.items() if tx_id not in pending and local.get(tx_id) != row]
+            deleted = [tx_id for tx_id in local if tx_id not in remote and tx_id not in pending]
+            self._write_rows(conn, rows, deleted)
+            # Base rows of unpushed edits are kept (the merge needs the row the edit was made on)
+            conn.execute("DELETE FROM synced_rows WHERE Tx_ID NOT IN (SELECT Tx_ID FROM pending_ops)")
+            conn.executemany("INSERT OR IGNORE INTO synced_rows (Tx_ID, row) VALUES (?, ?)",
+                             [(tx_id, _dumps(row)) for tx_id, row in remote.items()])
+            self._set_state(conn, 'remote_token', str(token) if token is not None else '')
+            if rows or deleted:
+                self._bump(conn)
+        self.stats['pulls'] += 1
+        return True
+
+    def sync_once(self):
+        """Push, then pull (always after a push: the sheet changed)."""
+        with self._sync_lock:
+            pushed = self.push()
+            self.pull(force=pushed > 0 or not self._state('remote_token'))
+            self.last_sync = time.time()
+            self.failures = 0
+            self.last_error = None
+
+    def start(self):
+        with self.lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='replica-sync', daemon=True)
+                self._thread.start()
+
+    def nudge(self):
+        """Sync now (e.g. after a local write) instead of at the next interval."""
+        self._wake.set()
+
+    def _sync_failed(self, e):
+        """Records a failed sync (shown by status() / sync_status until a sync succeeds)."""
+        self.failures += 1
+        self.last_error = str(e)
+        self.stats['sync_errors'] += 1
+        print(f"Replica sync error (retrying): {e}")
+
+    def _run(self):
+        while True:
+            try:
+                self.sync_once()
+            except Exception as e:
+                self._sync_failed(e)
+            delay = self.interval if not self.failures else min(self.max_backoff, self.interval * 2 ** (self.failures - 1))
+            self._wake.wait(delay)
+            self._wake.clear()
+
+# Process-wide replica (one sync thread per process), used through the backend functions below
+REPLICA = LocalReplica()
+
+def load_data(compact=False):
+    return REPLICA.load_data(compact)
+
+def save_data(df):
+    return REPLICA.save_data(df)
+
+def save_changes(df, changes):
+    return REPLICA.save_changes(df, changes)
+
+def add_row_optimized(new_row_dict):
+    return REPLICA.add_row_optimized(new_row_dict)
+
+def change_token():
+    return REPLICA.change_token()
+
+def sync_status():
+    return REPLICA.status()
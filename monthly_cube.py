@@ -0,0 +1,132 @@
+import pandas as pd
+
+# Materialized aggregate cube: month x 구분 x 대분류 x 소분류 x 결제수단 x Flow_Filter -> 금액 sum, 건수.
+# Charts, KPIs and reports aggregate these few hundred cells instead of the full ledger.
+# The cube is maintained incrementally with update_cube() when rows are added / edited / deleted.
+
+CUBE_DIMS = ['월', '구분', '대분류', '소분류', '결제수단', 'Flow_Filter']
+CUBE_COLUMNS = CUBE_DIMS + ['금액', '건수']
+
+# Column names of frames that use the English DB_Raw schema (dashboard_advanced, report scripts)
+ENG_COLUMNS = {
+    '날짜': 'date',
+    '구분': 'type',
+    '대분류': 'main_category',
+    '소분류': 'sub_category',
+    '결제수단': 'payment_method',
+    '금액': 'amount',
+}
+
+def _cube_keys(df, columns=None):
+    """Builds the dimension columns (+ 금액) of the cube from a raw frame."""
+    columns = columns or {}
+    def col(name):
+        return columns.get(name, name)
+
+    keys = pd.DataFrame(index=df.index)
+    keys['월'] = pd.to_datetime(df[col('날짜')], errors='coerce').dt.to_period('M').dt.to_timestamp()
+    for name in ['구분', '대분류', '소분류', '결제수단']:
+        if col(name) in df.columns:
+            keys[name] = df[col(name)].fillna('').astype(str)
+        else:
+            keys[name] = ''
+
+    # Active flag: the app toggles Is_Active and syncs Flow_Filter on save, so Is_Active wins
+    if 'Is_Active' in df.columns:
+        keys['Flow_Filter'] = df['Is_Active'].fillna(False).astype(bool).astype(int)
+    elif 'Flow_Filter' in df.columns:
+        keys['Flow_Filter'] = (pd.to_numeric(df['Flow_Filter'], errors='coerce').fillna(1) == 1).astype(int)
+    else:
+        keys['Flow_Filter'] = 1
+
+    keys['금액'] = pd.to_numeric(df[col('금액')], errors='coerce').fillna(0)
+    return keys
+
+def build_cube(df, columns=None):
+    """
+    Aggregates a raw transaction frame into the cube.
+    columns: optional mapping of cube names to the frame's columns (e.g. ENG_COLUMNS).
+    """
+    if df is None or df.empty:
+        return pd.DataFrame(columns=CUBE_COLUMNS)
+    keys = _cube_keys(df, columns)
+    keys = keys[keys['월'].notna()]
+    cube = keys.groupby(CUBE_DIMS, dropna=False, sort=True).agg(금액=('금액', 'sum'), 건수=('금액', 'size')).reset_index()
+    return cube
+
+def update_cube(cube, added=None, removed=None, columns=None):
+    """
+    Incremental maintenance: adds the rows in `added` and subtracts the rows in `removed`
+    (an edit = removed old version + added new version). Only the touched cells are re-aggregated.
+    """
+    parts = [cube]
+    if added is not None and not added.empty:
+        parts.append(build_cube(added, columns))
+    if removed is not None and not removed.empty:
+        neg = build_cube(removed, columns)
+        neg['금액'] = -neg['금액']
+        neg['건수'] = -neg['건수']
+        parts.append(neg)
+    if len(parts) == 1:
+        return cube
+
+    merged = pd.concat([p for p in parts if not p.empty], ignore_index=True)
+    if merged.empty:
+        return pd.DataFrame(columns=CUBE_COLUMNS)
+    merged = merged.groupby(CUBE_DIMS, dropna=False, sort=True)[['금액', '건수']].sum().reset_index()
+    return merged[merged['건수'] > 0].reset_index(drop=True)
+
+def slice_cube(cube, start=None, end=None, types=None, categories=None, payments=None, active=None):
+    """
+    Selects cube cells. start/end are month bounds (any date inside the month, inclusive).
+    active: True -> Flow_Filter 1 only, False -> Flow_Filter 0 only, None -> both.
+    """
+    mask = pd.Series(True, index=cube.index)
+    if start is not None:
+        mask &= cube['월'] >= pd.Timestamp(start).to_period('M').to_timestamp()
+    if end is not None:
+        mask &= cube['월'] <= pd.Timestamp(end).to_period('M').to_timestamp()
+    if types is not None:
+        mask &= cube['구분'].isin(types)
+    if categories is not None:
+        mask &= cube['대분류'].isin(categories)
+    if payments is not None:
+        mask &= cube['결제수단'].isin(payments)
+    if active is not None:
+        mask &= cube['Flow_Filter'] == (1 if active else 0)
+    return cube[mask]
+
+def monthly_pivot(cube, value='금액', fill_months=True):
+    """
+    월 (month start) x 구분 table, 0 where there is no data.
+    fill_months: every month from the first to the last one, months without rows as 0 rows
+    (pivot_table alone only has the months present), so charts and month sheets keep their gaps.
+    """
+    if cube.empty:
+        return pd.DataFrame(columns=['수입', '지출'])
+    pivot = cube.pivot_table(index='월', columns='구분', values=value, aggfunc='sum', fill_value=0)
+    if fill_months:
+        months = pd.date_range(pivot.index.min(), pivot.index.max(), freq='MS', name='월')
+        pivot = pivot.reindex(months, fill_value=0)
+    return pivot
+
+def monthly_by_type(cube):
+    """Long format [월, 구분, 금액] (same shape as groupby([Grouper(freq='MS'), '구분']))."""
+    return cube.groupby(['월', '구분'], sort=True)['금액'].sum().reset_index()
+
+def category_totals(cube, level='대분류', type_='지출'):
+    """[level..., 금액, 건수] for one 구분, largest absolute amount first. level may be a list."""
+    levels = [level] if isinstance(level, str) else list(level)
+    part = cube[cube['구분'] == type_] if type_ is not None else cube
+    out = part.groupby(levels, sort=False)[['금액', '건수']].sum().reset_index()
+    return out.reindex(out['금액'].abs().sort_values(ascending=False).index).reset_index(drop=True)
+
+def kpis(cube):
+    """Same keys as get_kpi_metrics: income / expense / net over active cells, other = inactive total."""
+    if cube.empty:
+        return {'income': 0, 'expense': 0, 'net': 0, 'other': 0}
+    active = cube[cube['Flow_Filter'] == 1]
+    income = active.loc[active['구분'] == '수입', '금액'].sum()
+    expense = active.loc[active['구분'] == '지출', '금액'].sum()
+    other = cube.loc[cube['Flow_Filter'] == 0, '금액'].sum()
+    return {'income': income, 'expense': expense, 'net': income + expense, 'other': other}
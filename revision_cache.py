@@ -0,0 +1,84 @@
+import threading
+import time
+
+# Cache validated by the backend's change token instead of a fixed TTL.
+# get() asks token_fn() for a cheap token (workbook content hash, spreadsheet modifiedTime, ...)
+# and calls loader() only when it differs from the token of the cached value.
+#
+# - check_interval: reuse the last check for this many seconds (Streamlit reruns the script on every
+#   widget change; one Drive metadata request per rerun would eat the read quota)
+# - token None / token_fn error: the change can't be checked, the value is fetched again
+# - a failed load (None / a frame without columns) is not cached and never replaces a good cached value;
+#   an empty ledger (a frame with its columns but no rows) is a value like any other
+#
+# stats: checks (token requests), hits, fetches, token_errors
+
+def _failed_load(value):
+    return value is None or (getattr(value, 'empty', False) and len(getattr(value, 'columns', ())) == 0)
+
+class RevisionCache:
+    def __init__(self, token_fn, loader, check_interval=0.0, clock=time.monotonic):
+        self.token_fn = token_fn
+        self.loader = loader
+        self.check_interval = check_interval
+        self.clock = clock
+        self.value = None
+        self.token = None
+        self.version = 0            # bumped on every fetch (key for values derived from the cached one)
+        self._checked_at = None
+        self._lock = threading.Lock()
+        self.stats = {'checks': 0, 'hits': 0, 'fetches': 0, 'token_errors': 0}
+
+    def _current_token(self):
+        self.stats['checks'] += 1
+        try:
+            return self.token_fn()
+        except Exception as e:
+            self.stats['token_errors'] += 1
+            print(f"Change token error (refetching): {e}")
+            return None
+
+    def get(self):
+        with self._lock:
+            now = self.clock()
+            if self.value is not None and self._checked_at is not None \
+                    and now - self._checked_at < self.check_interval:
+                self.stats['hits'] += 1
+                return self.value
+
+            token = self._current_token()
+            self._checked_at = now
+            if self.value is not None and token is not None and token == self.token:
+                self.stats['hits'] += 1
+                return self.value
+
+            self.stats['fetches'] += 1
+            value = self.loader()
+            if _failed_load(value):
+                # Loaders return a frame without columns on error: keep the good value, cache nothing new
+                self._checked_at = None
+                return self.value if self.value is not None else value
+            self.value = value
+            self.token = token
+            self.version += 1
+            return value
+
+    def invalidate(self):
+        """Drops the cached value (e.g. after our own save): the next get() fetches."""
+        with self._lock:
+            self.value = None
+            self.token = None
+            self._checked_at = None
+
+class MemoryRevisions:
+    """In-memory stand-in for a backend's change token (tests / benchmarks): bump() = someone edited."""
+    def __init__(self):
+        self.revision = 0
+        self.requests = 0
+
+    def bump(self):
+        self.revision += 1
+
+    def token(self):
+        self.requests += 1
+        return self.revision
@@ -0,0 +1,116 @@
+import itertools
+import threading
+import time
+import traceback
+
+from change_set import merge_change_sets
+
+# Background save queue for the app: the script submits (full frame, change set) and returns at once,
+# one daemon thread writes the batches in order with the backend's save_changes().
+# A save submitted while an earlier one from the same session is still waiting is merged into it
+# (change sets merged, the newer frame kept), so a burst of saves costs one backend write.
+#
+# Job states: 'queued' -> 'saving' -> 'done' | 'failed'
+
+class SaveWorker:
+    def __init__(self, save_fn, on_saved=None):
+        self.save_fn = save_fn          # save_fn(df, changes) -> bool
+        self.on_saved = on_saved        # called after every successful write (e.g. cache invalidation)
+        self.lock = threading.Lock()    # held while writing; loaders take it to never read a half-written state
+        self._cond = threading.Condition()
+        self._batches = []              # [{'key', 'df', 'changes', 'jobs'}], oldest first
+        self._jobs = {}                 # job id -> status dict
+        self._ids = itertools.count(1)
+        self._thread = None
+        self.stats = {'submitted': 0, 'writes': 0, 'coalesced': 0, 'failed': 0}
+
+    def submit(self, df, changes, key=None):
+        """Queues one save; returns its job id. key: merge only with waiting saves of the same key (session)."""
+        with self._cond:
+            job_id = next(self._ids)
+            self._jobs[job_id] = {'state': 'queued', 'key': key, 'submitted': time.time(), 'finished': None,
+                                  'error': None, 'changes': changes}
+            self.stats['submitted'] += 1
+            last = self._batches[-1] if self._batches else None
+            if last is not None and last['key'] == key:
+                last['changes'] = merge_change_sets(last['changes'], changes)
+                last['df'] = df
+                last['jobs'].append(job_id)
+                self.stats['coalesced'] += 1
+            else:
+                self._batches.append({'key': key, 'df': df, 'changes': changes, 'jobs': [job_id]})
+            self._ensure_thread()
+            self._cond.notify()
+        return job_id
+
+    def status(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def pending(self, key=None):
+        """Number of jobs not finished yet (of one key, or all)."""
+        with self._cond:
+            return sum(1 for j in self._jobs.values()
+                       if j['state'] in ('queued', 'saving') and (key is None or j['key'] == key))
+
+    def forget(self, job_ids):
+        """Drops finished jobs from the status table."""
+        with self._cond:
+            for job_id in job_ids:
+                if self._jobs.get(job_id, {}).get('state') in ('done', 'failed'):
+                    del self._jobs[job_id]
+
+    def wait(self, timeout=None):
+        """Blocks until the queue is empty and nothing is being written (tests / shutdown)."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while self._batches or any(j['state'] == 'saving' for j in self._jobs.values()):
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='save-worker', daemon=True)
+            self._thread.start()
+
+    def _set_state(self, job_ids, **fields):
+        for job_id in job_ids:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._batches:
+                    self._cond.wait()
+                batch = self._batches.pop(0)
+                self._set_state(batch['jobs'], state='saving')
+
+            error = None
+            try:
+                with self.lock:
+                    ok = self.save_fn(batch['df'], batch['changes'])
+                if not ok:
+                    error = "save returned False"
+            except Exception as e:
+                traceback.print_exc()
+                error = str(e)
+
+            if error is None and self.on_saved is not None:
+                try:
+                    self.on_saved()
+                except Exception as e:
+                    print(f"Save worker callback error: {e}")
+
+            with self._cond:
+                self.stats['writes'] += 1
+                if error is None:
+                    self._set_state(batch['jobs'], state='done', finished=time.time())
+                else:
+                    self.stats['failed'] += 1
+                    self._set_state(batch['jobs'], state='failed', finished=time.time(), error=error)
+                self._cond.notify_all()
@@ -0,0 +1,112 @@
+import re
+from collections import defaultdict
+
+import pandas as pd
+
+# Character n-gram inverted index for the app's 통합 검색 box.
+# Every row is indexed as one document: 내용 / 메모 / 대분류 / 소분류 + the amount digits,
+# NFKC-normalized and lower-cased (Hangul syllables are single characters, so bigrams work for Korean as-is).
+# A query term resolves to the intersection of its bigram posting sets, then the few candidates are verified.
+#
+# Query syntax:
+#   스타벅스        substring of any field (case-insensitive)
+#   스타 커피       every term must match (AND)
+#   ^스타           field starts with the term (prefix)
+#   12000 / -12,000 amount contains these digits (sign and commas are ignored)
+
+SEARCH_FIELDS = ['내용', '메모', '대분류', '소분류']
+AMOUNT_FIELD = '금액'
+SEP = '\x1f'   # field separator, never part of a query, so matches can't span two fields
+AMOUNT_RE = re.compile(r'^-?[\d,]+$')
+
+def _normalize(s):
+    return s.str.normalize('NFKC').str.lower()
+
+def _grams(doc):
+    """Unigrams (1-character queries) + bigrams, without the field separator."""
+    grams = {c for c in doc if c != SEP}
+    grams.update(doc[i:i + 2] for i in range(len(doc) - 1) if SEP not in doc[i:i + 2])
+    return grams
+
+class SearchIndex:
+    def __init__(self, df=None, fields=SEARCH_FIELDS, amount_field=AMOUNT_FIELD):
+        self.fields = fields
+        self.amount_field = amount_field
+        self.postings = defaultdict(set)   # gram -> row labels
+        self.docs = {}                     # row label -> normalized document
+        if df is not None:
+            self.add(df)
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _documents(self, df):
+        doc = pd.Series(SEP, index=df.index)
+        for field in self.fields:
+            if field in df.columns:
+                doc = doc + df[field].fillna('').astype(str) + SEP
+        if self.amount_field in df.columns:
+            amount = pd.to_numeric(df[self.amount_field], errors='coerce').fillna(0).abs().round().astype('int64')
+            doc = doc + amount.astype(str) + SEP
+        return _normalize(doc)
+
+    def add(self, df):
+        """Indexes the rows of df (by index label). Rows that are already indexed are replaced."""
+        if df is None or df.empty:
+            return self
+        self.remove([label for label in df.index if label in self.docs])
+        for label, doc in zip(df.index, self._documents(df)):
+            self.docs[label] = doc
+            for gram in _grams(doc):
+                self.postings[gram].add(label)
+        return self
+
+    def remove(self, labels):
+        """Drops rows from the index (deleted rows, or the old version of edited rows)."""
+        for label in labels:
+            doc = self.docs.pop(label, None)
+            if doc is None:
+                continue
+            for gram in _grams(doc):
+                posting = self.postings.get(gram)
+                if posting is not None:
+                    posting.discard(label)
+                    if not posting:
+                        del self.postings[gram]
+        return self
+
+    def update(self, df):
+        """Re-indexes edited rows."""
+        return self.add(df)
+
+    def _match_term(self, term):
+        prefix = term.startswith('^') and len(term) > 1
+        if prefix:
+            term = term[1:]
+        if AMOUNT_RE.match(term) and any(c.isdigit() for c in term):
+            term = term.replace('-', '').replace(',', '')
+
+        grams = [term] if len(term) == 1 else [term[i:i + 2] for i in range(len(term) - 1)]
+        postings = sorted((self.postings.get(g, set()) for g in set(grams)), key=len)
+        if not postings or not postings[0]:
+            return set()
+        candidates = postings[0].intersection(*postings[1:])
+
+        # Bigram hits don't guarantee the whole term is contiguous (or at a field start): verify
+        needle = SEP + term if prefix else term
+        if len(needle) <= 2 and not prefix:
+            return candidates
+        return {l for l in candidates if needle in self.docs[l]}
+
+    def search(self, query):
+        """Row labels matching every term of the query (None for an empty query = no filtering)."""
+        terms = pd.Series([query]).pipe(_normalize).iloc[0].split()
+        if not terms:
+            return None
+        result = None
+        for term in sorted(terms, key=len, reverse=True):
+            hits = self._match_term(term)
+            result = hits if result is None else result & hits
+            if not result:
+                break
+        return result
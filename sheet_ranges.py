@@ -0,0 +1,42 @@
+import pandas as pd
+from gspread.utils import rowcol_to_a1
+
+from data_normalize import pad_rows
+
+# Column / row projection for Sheets reads: the wanted columns become one A1 range per run of
+# adjacent columns ("A3:A", "C3:D", "G3:G", ...), fetched with a single batch_get, and the
+# returned blocks are stitched back into one frame. Only the requested cells leave Google.
+
+def column_letter(position):
+    """0-based column position -> 'A', 'B', ..., 'AA'."""
+    return rowcol_to_a1(1, position + 1)[:-1]
+
+def column_ranges(positions, first_row, last_row=None):
+    """
+    A1 ranges covering the given 0-based column positions from first_row on (open-ended unless last_row),
+    one per run of adjacent columns. Returns [(range, [positions])].
+    """
+    runs = []
+    for pos in sorted(set(positions)):
+        if runs and runs[-1][-1] == pos - 1:
+            runs[-1].append(pos)
+        else:
+            runs.append([pos])
+    end = '' if last_row is None else str(last_row)
+    return [(f"{column_letter(run[0])}{first_row}:{column_letter(run[-1])}{end}", run) for run in runs]
+
+def stitch_blocks(blocks, names):
+    """
+    Joins batch_get results (one ragged list of rows per range) into one frame.
+    names: column names per block. Blocks can be shorter than others (Sheets trims trailing empty rows).
+    """
+    n_rows = max((len(b) for b in blocks), default=0)
+    if n_rows == 0:
+        return pd.DataFrame(columns=[c for cols in names for c in cols])
+    parts = [pad_rows(list(block) + [[]] * (n_rows - len(block)), cols) for block, cols in zip(blocks, names)]
+    return pd.concat(parts, axis=1) if len(parts) > 1 else parts[0]
+
+def header_positions(header, wanted):
+    """Positions of the wanted column names in a header row (names not in the header are skipped)."""
+    index = {str(name).strip(): i for i, name in enumerate(header)}
+    return {name: index[name] for name in wanted if name in index}
@@ -0,0 +1,163 @@
+import random
+import threading
+import time
+from collections import defaultdict
+
+# Request scheduler for the Google Sheets API (used by data_manager._ws_call).
+# - token bucket per (spreadsheet, read/write): stays under the per-minute quota instead of hitting 429s
+# - truncated exponential backoff with jitter on 429 / 5xx, then the original error is raised
+# - value writes are queued per spreadsheet while a batch is open (SheetsScheduler.batch, per thread) and
+#   sent as one values_batch_update; any other request flushes the queue first, so the order is kept
+#
+# stats: calls (API requests sent), calls_saved (value writes merged into another request),
+# retries, throttled (requests that waited for a token), wait_seconds, max_queue_depth
+
+# Sheets API quota: 60 read and 60 write requests per minute per user
+REQUESTS_PER_MINUTE = 60
+BURST = 10
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+def status_code(e):
+    """HTTP status of a gspread APIError (None for other errors)."""
+    return getattr(getattr(e, 'response', None), 'status_code', None)
+
+class TokenBucket:
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate            # tokens per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Takes a token; returns how long to wait before using it (callers are served in order)."""
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class SheetsScheduler:
+    def __init__(self, per_minute=REQUESTS_PER_MINUTE, burst=BURST, max_retries=5,
+                 base_delay=1.0, max_delay=32.0, sleep=time.sleep, clock=time.monotonic):
+        self.per_minute = per_minute
+        self.burst = burst
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.clock = clock
+        self._buckets = {}
+        self._lock = threading.Lock()
+        # Batches are per (spreadsheet, thread): a save in the background worker never picks up
+        # the writes of a script thread and vice versa
+        self._queues = defaultdict(list)   # slot -> queued value ranges [{'range', 'values'}]
+        self._senders = {}                 # slot -> send(data) for the queued ranges
+        self._open = defaultdict(int)      # slot -> nesting depth of open batches
+        self._waiting = 0                  # requests waiting for a token / a retry
+        self.stats = {'calls': 0, 'calls_saved': 0, 'retries': 0, 'throttled': 0,
+                      'wait_seconds': 0.0, 'max_queue_depth': 0}
+
+    def _bucket(self, key, kind):
+        with self._lock:
+            bucket = self._buckets.get((key, kind))
+            if bucket is None:
+                bucket = TokenBucket(self.per_minute / 60.0, self.burst, self.clock)
+                self._buckets[(key, kind)] = bucket
+            return bucket
+
+    def queue_depth(self, key=None):
+        """Value writes waiting in open batches + requests waiting for a token or a retry."""
+        with self._lock:
+            queued = sum(len(q) for slot, q in self._queues.items() if key is None or slot[0] == key)
+            return queued + self._waiting
+
+    def _track_depth(self):
+        depth = sum(len(q) for q in self._queues.values()) + self._waiting
+        self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], depth)
+
+    def run(self, key, fn, write=True):
+        """Sends one request (fn()) under the rate limit, retrying 429 / 5xx with backoff."""
+        bucket = self._bucket(key, 'write' if write else 'read')
+        with self._lock:
+            self._waiting += 1
+            self._track_depth()
+        try:
+            for attempt in range(self.max_retries + 1):
+                wait = bucket.reserve()
+                if wait > 0:
+                    self.stats['throttled'] += 1
+                    self.stats['wait_seconds'] += wait
+                    self.sleep(wait)
+                try:
+                    result = fn()
+                    self.stats['calls'] += 1
+                    return result
+                except Exception as e:
+                    self.stats['calls'] += 1
+                    if status_code(e) not in RETRY_STATUS or attempt == self.max_retries:
+                        raise
+                    self.stats['retries'] += 1
+                    delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+                    self.sleep(delay + random.uniform(0, self.base_delay))
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def write_values(self, key, data, send):
+        """
+        Value ranges to write ([{'range', 'values'}]). Queued if a batch is open for key,
+        otherwise sent right away with send(data).
+        """
+        slot = (key, threading.get_ident())
+        with self._lock:
+            if self._open.get(slot):
+                if self._queues[slot]:
+                    self.stats['calls_saved'] += 1
+                self._queues[slot].extend(data)
+                self._senders[slot] = send
+                self._track_depth()
+                return None
+        return self.run(key, lambda: send(data))
+
+    def flush(self, key):
+        """Sends the value writes this thread queued for key as one request."""
+        slot = (key, threading.get_ident())
+        with self._lock:
+            data = self._queues.pop(slot, [])
+            send = self._senders.pop(slot, None)
+        if data:
+            return self.run(key, lambda: send(data))
+        return None
+
+    def batch(self, key):
+        """Context manager: value writes inside are merged and sent on exit (dropped on error)."""
+        return _Batch(self, key)
+
+class _Batch:
+    def __init__(self, scheduler, key):
+        self.scheduler = scheduler
+        self.key = key
+        self.slot = None
+
+    def __enter__(self):
+        self.slot = (self.key, threading.get_ident())
+        with self.scheduler._lock:
+            self.scheduler._open[self.slot] += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        s = self.scheduler
+        with s._lock:
+            s._open[self.slot] -= 1
+            outermost = s._open[self.slot] == 0
+            if outermost:
+                del s._open[self.slot]
+                if exc_type is not None:
+                    s._queues.pop(self.slot, None)
+                    s._senders.pop(self.slot, None)
+        if exc_type is None and outermost:
+            s.flush(self.key)
+        return False
@@ -0,0 +1,134 @@
+import pandas as pd
+import hashlib
+import json
+import os
+import shutil
+import argparse
+
+# Configuration
+CACHE_DIR = '.snapshot_cache'
+
+# Per-process hit/miss counter
+CACHE_STATS = {'hits': 0, 'misses': 0}
+
+def file_fingerprint(path, with_hash=True):
+    """Returns the (path, mtime, size, sha256) fingerprint of a workbook."""
+    st = os.stat(path)
+    fp = {'path': os.path.abspath(path), 'mtime': st.st_mtime_ns, 'size': st.st_size}
+    if with_hash:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(chunk)
+        fp['sha256'] = h.hexdigest()
+    return fp
+
+# (path) -> (mtime, size, sha256) of the last hashed state, so an unchanged file is never hashed twice
+_CONTENT_TOKENS = {}
+
+def content_token(path):
+    """
+    Change token of a workbook: its content hash, recomputed only when mtime / size changed
+    (a touched or copied file with the same bytes keeps its token).
+    """
+    fp = file_fingerprint(path, with_hash=False)
+    known = _CONTENT_TOKENS.get(fp['path'])
+    if known and known[0] == fp['mtime'] and known[1] == fp['size']:
+        return known[2]
+    sha256 = file_fingerprint(path)['sha256']
+    _CONTENT_TOKENS[fp['path']] = (fp['mtime'], fp['size'], sha256)
+    return sha256
+
+def _entry_paths(path, sheet_name):
+    key = hashlib.sha1(f"{os.path.abspath(path)}|{sheet_name}".encode('utf-8')).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, key + '.json'), os.path.join(CACHE_DIR, key + '.pkl')
+
+def cached_load(path, sheet_name, loader, version=None):
+    """
+    Returns the cleaned DataFrame for (path, sheet_name) from the local snapshot if the
+    workbook did not change, otherwise calls loader() and stores a new snapshot.
+    - mtime + size unchanged -> hit without reading the workbook
+    - mtime/size changed but same content hash (e.g. file touched / copied) -> hit
+    version: version of the loader's output (e.g. data_normalize.SCHEMA_VERSION);
+    a snapshot written by another version is a miss, whatever the workbook state.
+    """
+    meta_file, data_file = _entry_paths(path, sheet_name)
+
+    try:
+        meta = None
+        if os.path.exists(meta_file) and os.path.exists(data_file):
+            with open(meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+
+        if meta and meta.get('version') == version:
+            fp = file_fingerprint(path, with_hash=False)
+            if fp['mtime'] == meta['mtime'] and fp['size'] == meta['size']:
+                CACHE_STATS['hits'] += 1
+                return pd.read_pickle(data_file)
+
+            fp = file_fingerprint(path)
+            if fp['sha256'] == meta.get('sha256'):
+                CACHE_STATS['hits'] += 1
+                meta.update(fp)
+                with open(meta_file, 'w', encoding='utf-8') as f:
+                    json.dump(meta, f, ensure_ascii=False)
+                return pd.read_pickle(data_file)
+    except Exception as e:
+        print(f"Snapshot cache read error (reloading): {e}")
+
+    CACHE_STATS['misses'] += 1
+    df = loader()
+
+    # Don't cache failed loads (loaders return an empty frame on error)
+    if df is None or df.empty:
+        return df
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fp = file_fingerprint(path)
+        tmp_file = data_file + '.tmp'
+        df.to_pickle(tmp_file, protocol=5)
+        os.replace(tmp_file, data_file)
+        meta = dict(fp, sheet_name=sheet_name, rows=len(df), version=version)
+        with open(meta_file, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+    except Exception as e:
+        print(f"Snapshot cache write error: {e}")
+
+    return df
+
+def invalidate(path, sheet_name):
+    """Drops the snapshot of one sheet (e.g. right after we saved the workbook ourselves)."""
+    for p in _entry_paths(path, sheet_name):
+        if os.path.exists(p):
+            os.remove(p)
+
+def purge_cache():
+    """Deletes every snapshot. Returns the number of snapshots removed."""
+    if not os.path.isdir(CACHE_DIR):
+        return 0
+    count = len([f for f in os.listdir(CACHE_DIR) if f.endswith('.pkl')])
+    shutil.rmtree(CACHE_DIR)
+    return count
+
+def list_cache():
+    entries = []
+    if os.path.isdir(CACHE_DIR):
+        for name in sorted(os.listdir(CACHE_DIR)):
+            if name.endswith('.json'):
+                with open(os.path.join(CACHE_DIR, name), 'r', encoding='utf-8') as f:
+                    entries.append(json.load(f))
+    return entries
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot cache for the T_RawData loader")
+    parser.add_argument('--purge', action='store_true', help="Delete all cached snapshots")
+    args = parser.parse_args()
+
+    if args.purge:
+        print(f"🗑️ Removed {purge_cache()} snapshot(s) from {CACHE_DIR}")
+    else:
+        entries = list_cache()
+        print(f"📦 {len(entries)} snapshot(s) in {CACHE_DIR}")
+        for e in entries:
+            print(f"   - {e['path']} [{e['sheet_name']}] {e['rows']} rows, {e['size']:,} bytes, sha256 {e['sha256'][:12]}")
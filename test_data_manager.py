@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+import data_manager
+
+# Offline tests of the Google Sheets backend's write formatting (worksheet calls are captured, nothing is sent)
+
+HEADERS = ['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모', 'Flow_Filter', 'Tx_ID']
+
+@pytest.fixture
+def calls(monkeypatch):
+    sent = []
+    monkeypatch.setattr(data_manager, '_ws_call', lambda method, *args, **kwargs: sent.append((method, args, kwargs)))
+    monkeypatch.setattr(data_manager, '_LAST_SYNCED', {'columns': None, 'rows': None, 'index': None, 'header': None})
+    return sent
+
+def appended(calls):
+    (method, args, _), = calls
+    assert method == 'append_rows'
+    return [dict(zip(HEADERS, row)) for row in args[0]]
+
+def test_add_row_with_a_partial_dict_fills_every_column(calls):
+    assert data_manager.add_row_optimized({'날짜': '2024-01-02', '구분': '지출', '내용': '커피', '금액': -4500})
+    (row,) = appended(calls)
+    assert len(row) == len(HEADERS)
+    assert (row['날짜'], row['시간'], row['구분'], row['내용'], row['금액']) == ('2024-01-02', '', '지출', '커피', -4500)
+    assert row['대분류'] == row['소분류'] == row['결제수단'] == row['메모'] == ''
+    assert row['Flow_Filter'] == 1
+    assert row['Tx_ID']
+
+def test_add_row_keeps_a_given_flow_filter(calls):
+    data_manager.add_row_optimized({'날짜': '2024-01-02', '구분': '이동', '금액': 1000, 'Flow_Filter': 0})
+    assert appended(calls)[0]['Flow_Filter'] == 0
+
+def test_append_rows_lines_up_a_frame_without_some_columns(calls):
+    df = pd.DataFrame({'날짜': ['2024-01-03'], '내용': ['점심'], '금액': [-12000], 'Tx_ID': ['abc']}, index=[10])
+    assert data_manager.append_rows(df)
+    (row,) = appended(calls)
+    assert (row['날짜'], row['내용'], row['금액'], row['Tx_ID']) == ('2024-01-03', '점심', -12000, 'abc')
+    assert row['구분'] == ''
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from date_index import DateIndex
+
+# Binary-searched date ranges vs a plain boolean mask, for the orders the app and dashboards use
+
+def frame(order):
+    dates = pd.to_datetime(['2024-01-01', '2024-01-15', '2024-01-15', '2024-02-01', '2024-02-29', '2024-03-10', None])
+    df = pd.DataFrame({'날짜': dates, 'n': range(len(dates))})
+    if order == 'descending':
+        return df.sort_values('날짜', ascending=False, kind='stable').reset_index(drop=True)
+    if order == 'ascending':
+        return df.dropna().reset_index(drop=True)
+    return df.sample(frac=1, random_state=3).reset_index(drop=True)
+
+RANGES = [(None, None), ('2024-01-15', '2024-02-29'), ('2024-01-15', '2024-01-15'), ('2024-02-02', '2024-02-28'),
+          (None, '2024-01-31'), ('2024-03-01', None)]
+
+def expected(df, start, end):
+    mask = df['날짜'].notna()
+    if start is not None:
+        mask &= df['날짜'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df['날짜'] < pd.Timestamp(end) + pd.Timedelta(days=1)
+    return df[mask]
+
+@pytest.mark.parametrize('order', ['descending', 'ascending', 'unsorted'])
+@pytest.mark.parametrize('start,end', RANGES)
+def test_slices_match_a_mask(order, start, end):
+    df = frame(order)
+    index = DateIndex(df['날짜'])
+    want = expected(df, start, end)
+    assert index.slice(df, start, end).equals(want)
+    assert index.positions(start, end).tolist() == [df.index.get_loc(l) for l in want.index]
+    assert index.count(start, end) == len(want)
+
+def test_descending_frame_slices_without_sorting():
+    df = frame('descending')
+    index = DateIndex(df['날짜'])
+    assert index.descending and index.contiguous
+    assert index.min() == pd.Timestamp('2024-01-01') and index.max() == pd.Timestamp('2024-03-10')
+    assert index.months() == ['2024-03', '2024-02', '2024-01']
+    # A plain iloc range: a view-like slice, not a gathered copy
+    assert np.shares_memory(index.slice(df, '2024-01-15', '2024-02-29')['n'].to_numpy(), df['n'].to_numpy())
+
+def test_unsorted_frame_is_not_contiguous():
+    index = DateIndex(frame('unsorted')['날짜'])
+    assert not index.descending and not index.contiguous
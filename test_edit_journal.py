@@ -0,0 +1,162 @@
+import pandas as pd
+import pytest
+
+from edit_journal import fold_ops, changes_for, EditJournal, JournaledStore
+from change_set import empty_change_set, apply_change_set, is_empty
+from data_manager_sqlite import to_db_row
+from data_normalize import assign_tx_ids, normalize_frame, expand_frame
+
+# Offline tests of the edit journal (temporary journal files, an in-memory backend)
+
+def ledger(rows):
+    columns = ['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모', 'Flow_Filter']
+    return assign_tx_ids(normalize_frame(pd.DataFrame(rows, columns=columns)))
+
+SAMPLE = [
+    ['2024-01-01', '09:00', '지출', '식비', '외식', '점심', 12000, '카드', '', 1],
+    ['2024-01-02', '18:30', '수입', '급여', '', '월급', 3000000, '계좌', '', 1],
+    ['2024-01-03', '', '지출', '교통', '버스', '버스', 1500, '카드', '', 1],
+]
+
+def entry(text, amount=1000):
+    return ledger([['2024-01-04', '10:00', '지출', '식비', '카페', text, amount, '카드', '', 1]])
+
+def row_of(df, text):
+    return to_db_row(expand_frame(df[df['내용'] == text]).to_dict('records')[0])
+
+class MemoryBackend:
+    """data_manager_excel's backend API over a frame."""
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self.saves = 0
+        self.fail = False
+
+    def load_data(self):
+        return self.df.copy()
+
+    def change_token(self):
+        return self.saves
+
+    def save_changes(self, df, changes):
+        if self.fail:
+            return False
+        self.df = df.copy()
+        self.saves += 1
+        return True
+
+# ----------------- fold_ops / changes_for -----------------
+
+def test_fold_ops():
+    a, b = ('a',), ('b',)
+    assert fold_ops([('add', 't', a, None), ('update', 't', b, None)]) == {'t': ('add', b, None)}
+    assert fold_ops([('add', 't', a, None), ('delete', 't', None, None)]) == {}
+    assert fold_ops([('update', 't', a, b), ('delete', 't', None, None)]) == {'t': ('delete', None, b)}
+    assert fold_ops([('delete', 't', None, b), ('add', 't', a, None)]) == {'t': ('add', a, b)}
+
+def test_changes_for_is_idempotent():
+    df = ledger(SAMPLE)
+    lunch = row_of(df, '점심')
+    edited = lunch[:6] + (13000,) + lunch[7:]
+    added = row_of(entry('커피'), '커피')
+    intents = fold_ops([('update', lunch[-1], edited, None), ('add', added[-1], added, None),
+                        ('delete', row_of(df, '버스')[-1], None, None)])
+    once = apply_change_set(df, changes_for(df, intents))
+    assert sorted(once['내용']) == ['월급', '점심', '커피']
+    assert once.loc[once['내용'] == '점심', '금액'].iloc[0] == 13000
+    # Replaying the same ops over the result changes nothing
+    assert is_empty(changes_for(once, intents))
+
+# ----------------- EditJournal -----------------
+
+def test_torn_tail_is_dropped_on_the_next_append(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    journal = EditJournal(str(path))
+    journal.append([('delete', 't1', None)])
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"seq": 2, "op": "del')
+    journal = EditJournal(str(path))
+    journal.append([('delete', 't2', None)])
+    assert [(e['seq'], e['Tx_ID']) for e in journal.entries()] == [(1, 't1'), (2, 't2')]
+
+def test_truncate_through_keeps_later_entries(tmp_path):
+    journal = EditJournal(str(tmp_path / 'journal.jsonl'))
+    journal.append([('delete', f't{i}', None) for i in range(5)])
+    journal.truncate_through(3)
+    assert [e['seq'] for e in journal.entries()] == [4, 5]
+    assert journal.count == 2
+
+# ----------------- JournaledStore -----------------
+
+@pytest.fixture
+def backend():
+    return MemoryBackend(ledger(SAMPLE))
+
+@pytest.fixture
+def store(tmp_path, backend):
+    s = JournaledStore(backend=backend, path=str(tmp_path / 'journal.jsonl'), threshold=10 ** 6)
+    s.start = lambda: None          # compacted explicitly by the tests
+    return s
+
+def edit_and_add(store):
+    working = store.load_data()
+    changes = empty_change_set()
+    lunch = working.index[working['내용'] == '점심'][0]
+    changes['updated'] = working.loc[[lunch]].copy()
+    changes['updated']['금액'] = 13000.0
+    changes['added'] = entry('커피').set_axis([int(working.index.max()) + 1])
+    bus = working.index[working['내용'] == '버스'][0]
+    changes['deleted'] = [bus]
+    changes['deleted_ids'] = {bus: working.at[bus, 'Tx_ID']}
+    assert store.save_changes(apply_change_set(working, changes), changes)
+
+def test_saves_are_journaled_and_replayed(store, backend):
+    edit_and_add(store)
+    assert backend.saves == 0
+    df = store.load_data()
+    assert sorted(df['내용']) == ['월급', '점심', '커피']
+    assert df.loc[df['내용'] == '점심', '금액'].iloc[0] == 13000
+
+def test_compact_folds_the_journal_into_the_backend(store, backend):
+    edit_and_add(store)
+    expected = store.load_data()
+    assert store.compact() == 3
+    assert store.journal.entries() == []
+    assert sorted(backend.df['내용']) == sorted(expected['내용'])
+    assert set(store.load_data()['Tx_ID']) == set(expected['Tx_ID'])
+
+def test_compaction_interrupted_before_truncation_is_replayed_safely(store, backend):
+    edit_and_add(store)
+    expected = sorted(store.load_data()['내용'])
+    # Saved into the backend, but the journal wasn't truncated (crash in between)
+    truncate = store.journal.truncate_through
+    store.journal.truncate_through = lambda seq: None
+    store.compact()
+    store.journal.truncate_through = truncate
+    assert sorted(store.load_data()['내용']) == expected
+    store.compact()
+    assert sorted(backend.df['내용']) == expected and len(backend.df) == len(expected)
+
+def test_failed_compaction_keeps_the_journal(store, backend):
+    edit_and_add(store)
+    backend.fail = True
+    with pytest.raises(RuntimeError):
+        store.compact()
+    assert len(store.journal.entries()) == 3
+    assert sorted(store.load_data()['내용']) == ['월급', '점심', '커피']
+
+def test_rows_without_a_date_dont_stop_replay_or_compaction(tmp_path):
+    # Blank rows / unparsable dates are loaded as NaT
+    df = ledger(SAMPLE)
+    df.loc[df['내용'] == '월급', '날짜'] = pd.NaT
+    backend = MemoryBackend(df)
+    store = JournaledStore(backend=backend, path=str(tmp_path / 'journal.jsonl'), threshold=10 ** 6)
+    store.start = lambda: None
+    edit_and_add(store)
+    assert sorted(store.load_data()['내용']) == ['월급', '점심', '커피']
+    assert store.compact() == 3
+    assert sorted(backend.df['내용']) == ['월급', '점심', '커피']
+    assert backend.df.loc[backend.df['내용'] == '월급', '날짜'].isna().all()
+
+def test_unreadable_backend_loads_an_empty_frame(store, backend):
+    backend.load_data = lambda: 1 / 0
+    assert store.load_data().empty
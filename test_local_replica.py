@@ -0,0 +1,190 @@
+import pandas as pd
+import pytest
+
+from local_replica import LocalReplica
+from change_set import empty_change_set, apply_change_set
+from data_normalize import assign_tx_ids, normalize_frame
+from revision_cache import MemoryRevisions
+
+# Offline tests of the local replica: a temporary SQLite file synced with an in-memory stand-in for the sheet
+
+def ledger(rows):
+    columns = ['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모', 'Flow_Filter']
+    return assign_tx_ids(normalize_frame(pd.DataFrame(rows, columns=columns)))
+
+def entry(text, amount=1000, day='2024-01-04'):
+    return ledger([[day, '10:00', '지출', '식비', '카페', text, amount, '카드', '', 1]])
+
+class FakeSheet:
+    """data_manager's backend API over a frame; offline = loads fail the way data_manager's do."""
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self.revisions = MemoryRevisions()
+        self.online = True
+        self.saves = 0
+
+    def load_data(self):
+        return self.df.copy() if self.online else pd.DataFrame()
+
+    def change_token(self):
+        if not self.online:
+            raise ConnectionError("offline")
+        return self.revisions.token()
+
+    def save_changes(self, df, changes):
+        if not self.online:
+            return False
+        self.df = df.copy()
+        self.saves += 1
+        self.revisions.bump()
+        return True
+
+    def edit(self, df):
+        """Someone else changed the sheet."""
+        self.df = df.reset_index(drop=True)
+        self.revisions.bump()
+
+    def texts(self):
+        return sorted(self.df['내용'])
+
+@pytest.fixture
+def sheet():
+    return FakeSheet(ledger([
+        ['2024-01-01', '09:00', '지출', '식비', '외식', '점심', 12000, '카드', '', 1],
+        ['2024-01-02', '18:30', '수입', '급여', '', '월급', 3000000, '계좌', '', 1],
+        ['2024-01-03', '', '지출', '교통', '버스', '버스', 1500, '카드', '', 1],
+    ]))
+
+@pytest.fixture
+def replica(tmp_path, sheet):
+    rep = LocalReplica(db_file=str(tmp_path / 'replica.db'), remote=sheet)
+    rep.start = lambda: None        # synced explicitly by the tests
+    return rep
+
+def texts(rep):
+    return sorted(rep.load_data()['내용'])
+
+def save(rep, working, changes):
+    assert rep.save_changes(apply_change_set(working, changes), changes)
+    return apply_change_set(working, changes)
+
+def add(rep, working, text, amount=1000):
+    """Adds a row the way the app does (label = max label + 1). Returns (working frame, label)."""
+    label = int(working.index.max()) + 1
+    changes = empty_change_set()
+    changes['added'] = entry(text, amount).set_axis([label])
+    return save(rep, working, changes), label
+
+def delete(rep, working, label):
+    changes = empty_change_set()
+    changes['deleted'] = [label]
+    changes['deleted_ids'] = {label: working.at[label, 'Tx_ID']}
+    return save(rep, working, changes)
+
+def edit(rep, working, label, **values):
+    changes = empty_change_set()
+    changes['updated'] = working.loc[[label]].copy()
+    for column, value in values.items():
+        changes['updated'][column] = value
+    return save(rep, working, changes)
+
+def remote_add(sheet, text):
+    sheet.edit(pd.concat([sheet.df, entry(text, 990000)], ignore_index=True))
+
+def test_first_load_pulls_the_sheet(replica, sheet):
+    df = replica.load_data()
+    assert sorted(df['내용']) == sheet.texts()
+    assert set(df['Tx_ID']) == set(sheet.df['Tx_ID'])
+    assert replica.pending() == 0
+
+def test_offline_add_is_pushed_when_back_online(replica, sheet):
+    working = replica.load_data()
+    sheet.online = False
+    working, _ = add(replica, working, '커피')
+    with pytest.raises(Exception):
+        replica.sync_once()
+    assert replica.pending() == 1
+    assert '커피' in texts(replica)
+
+    sheet.online = True
+    replica.sync_once()
+    assert replica.pending() == 0
+    assert sheet.texts() == texts(replica)
+
+def test_pull_applies_remote_edits_and_skips_unchanged_sheet(replica, sheet):
+    replica.load_data()
+    remote = sheet.df.copy()
+    remote.loc[remote['내용'] == '점심', '금액'] = 13000.0
+    sheet.edit(remote[remote['내용'] != '버스'])
+    replica.sync_once()
+    df = replica.load_data()
+    assert sorted(df['내용']) == ['월급', '점심']
+    assert df.loc[df['내용'] == '점심', '금액'].iloc[0] == 13000
+
+    pulls = replica.stats['pulls']
+    replica.sync_once()
+    assert replica.stats['pulls'] == pulls
+
+def test_round_trip_keeps_tx_ids(replica, sheet):
+    working = replica.load_data()
+    working, label = add(replica, working, '커피')
+    tx_id = working.at[label, 'Tx_ID']
+    replica.sync_once()
+    assert tx_id in set(sheet.df['Tx_ID'])
+    assert tx_id in set(replica.load_data()['Tx_ID'])
+
+def test_add_then_delete_after_a_pull_keeps_the_pulled_row(replica, sheet):
+    working = replica.load_data()
+    # Another device adds a row: the pull stores it under the id the session will use for its next label
+    remote_add(sheet, 'PHONE')
+    replica.sync_once()
+    working, label = add(replica, working, '커피')
+    working = delete(replica, working, label)
+    assert 'PHONE' in texts(replica) and '커피' not in texts(replica)
+
+    replica.sync_once()
+    assert 'PHONE' in sheet.texts() and '커피' not in sheet.texts()
+
+def test_add_then_edit_after_a_pull_edits_only_the_added_row(replica, sheet):
+    working = replica.load_data()
+    remote_add(sheet, 'PHONE')
+    replica.sync_once()
+    working, label = add(replica, working, '커피')
+    working = edit(replica, working, label, 금액=4500.0)
+    replica.sync_once()
+    for df in (replica.load_data(), sheet.df):
+        assert (df['내용'] == '커피').sum() == 1
+        assert df.loc[df['내용'] == '커피', '금액'].iloc[0] == 4500
+        assert df.loc[df['내용'] == 'PHONE', '금액'].iloc[0] == 990000
+
+def test_local_and_remote_edits_of_one_row_are_merged(replica, sheet):
+    working = replica.load_data()
+    label = working.index[working['내용'] == '점심'][0]
+    sheet.online = False
+    edit(replica, working, label, 메모='회식')
+    sheet.online = True
+    remote = sheet.df.copy()
+    remote.loc[remote['내용'] == '점심', '금액'] = 13000.0
+    sheet.edit(remote)
+    replica.sync_once()
+    row = sheet.df[sheet.df['내용'] == '점심'].iloc[0]
+    assert row['메모'] == '회식' and row['금액'] == 13000
+    assert replica.stats['conflicts'] == 1
+
+def test_sheet_rows_without_a_date_sync(replica, sheet):
+    # One unparsable date on the sheet (loaded as NaT) must not stop push / pull
+    remote = sheet.df.copy()
+    remote.loc[remote['내용'] == '버스', '날짜'] = pd.NaT
+    sheet.edit(remote)
+    working = replica.load_data()
+    assert texts(replica) == sheet.texts()
+    working, _ = add(replica, working, '커피')
+    replica.sync_once()
+    assert replica.pending() == 0 and '커피' in sheet.texts()
+    assert replica.status()['last_error'] is None
+
+def test_failed_first_sync_shows_in_the_status(replica, sheet):
+    sheet.online = False
+    assert replica.load_data().empty
+    status = replica.status()
+    assert status['last_error'] and status['failures'] == 1
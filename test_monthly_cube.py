@@ -0,0 +1,28 @@
+import pandas as pd
+
+import monthly_cube
+
+# The cube's month table vs the ledger it was built from
+
+def ledger():
+    return pd.DataFrame({
+        '날짜': pd.to_datetime(['2024-01-05', '2024-01-20', '2024-04-02', '2024-04-30']),
+        '구분': ['지출', '수입', '지출', '지출'],
+        '대분류': ['식비', '급여', '교통', '식비'],
+        '금액': [-12000, 3000000, -1500, -8000],
+    })
+
+def test_monthly_pivot_fills_empty_months():
+    pivot = monthly_cube.monthly_pivot(monthly_cube.build_cube(ledger()))
+    assert list(pivot.index.strftime('%Y-%m')) == ['2024-01', '2024-02', '2024-03', '2024-04']
+    assert pivot.loc['2024-02-01'].tolist() == [0, 0]
+    assert pivot.loc['2024-04-01', '지출'] == -9500
+    assert pivot.loc['2024-01-01', '수입'] == 3000000
+
+def test_monthly_pivot_months_with_data_only():
+    pivot = monthly_cube.monthly_pivot(monthly_cube.build_cube(ledger()), fill_months=False)
+    assert list(pivot.index.strftime('%Y-%m')) == ['2024-01', '2024-04']
+
+def test_monthly_pivot_of_an_empty_cube():
+    pivot = monthly_cube.monthly_pivot(monthly_cube.build_cube(ledger().iloc[:0]))
+    assert pivot.empty and list(pivot.columns) == ['수입', '지출']
@@ -0,0 +1,40 @@
+import pandas as pd
+
+from revision_cache import RevisionCache, MemoryRevisions
+
+# The token-validated cache with an in-memory backend (no clock: every get() checks the token)
+
+class Loader:
+    def __init__(self, frame):
+        self.frame = frame
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.frame
+
+def test_fetches_only_when_the_token_moves():
+    revisions, loader = MemoryRevisions(), Loader(pd.DataFrame({'날짜': [1]}))
+    cache = RevisionCache(revisions.token, loader)
+    cache.get(), cache.get()
+    assert loader.calls == 1 and cache.version == 1
+    revisions.bump()
+    cache.get()
+    assert loader.calls == 2 and cache.version == 2
+
+def test_an_empty_ledger_is_cached():
+    revisions, loader = MemoryRevisions(), Loader(pd.DataFrame(columns=['날짜', '금액']))
+    cache = RevisionCache(revisions.token, loader)
+    assert cache.get().empty
+    cache.get()
+    assert loader.calls == 1 and cache.version == 1
+
+def test_a_failed_load_is_not_cached_and_keeps_the_good_value():
+    revisions, loader = MemoryRevisions(), Loader(pd.DataFrame({'날짜': [1]}))
+    cache = RevisionCache(revisions.token, loader)
+    good = cache.get()
+    revisions.bump()
+    loader.frame = pd.DataFrame()
+    assert cache.get() is good
+    cache.get()
+    assert loader.calls == 3 and cache.version == 1
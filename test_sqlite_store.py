@@ -0,0 +1,156 @@
+import pandas as pd
+import pytest
+
+import data_manager_sqlite as store
+from change_set import empty_change_set, apply_change_set
+from data_normalize import assign_tx_ids, normalize_frame
+
+# Offline tests of the SQLite backend (temporary database files only)
+
+def ledger(rows):
+    columns = ['날짜', '시간', '구분', '대분류', '소분류', '내용', '금액', '결제수단', '메모', 'Flow_Filter']
+    return pd.DataFrame(rows, columns=columns)
+
+SAMPLE = [
+    ['2024-01-03', '09:00', '지출', '식비', '외식', '점심', 12000, '카드', '', 1],
+    ['2024-01-02', '18:30', '수입', '급여', '', '월급', 3000000, '계좌', '', 1],
+    ['2024-01-01', '', '이동', '이동', '이체', '저축 이체', 500000, '계좌', '', 0],
+]
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / 'store.db')
+    assert store.save_data(ledger(SAMPLE), db_file=path)
+    return path
+
+def test_save_and_load_round_trip(db):
+    df = store.load_data(db_file=db)
+    assert list(df['내용']) == ['점심', '월급', '저축 이체']
+    assert list(df['금액']) == [12000, 3000000, 500000]
+    assert list(df['Flow_Filter']) == [1, 1, 0]
+    assert list(df['Is_Active']) == [True, True, False]
+    assert df['Tx_ID'].notna().all() and df['Tx_ID'].is_unique
+
+def test_tx_ids_are_stable_across_loads(db):
+    first = store.load_data(db_file=db)
+    second = store.load_data(db_file=db)
+    assert list(first['Tx_ID']) == list(second['Tx_ID'])
+
+def test_save_data_overwrites(db):
+    assert store.save_data(ledger(SAMPLE[:1]), db_file=db)
+    df = store.load_data(db_file=db)
+    assert list(df['내용']) == ['점심']
+
+def test_compact_load(db):
+    df = store.load_data(compact=True, db_file=db)
+    assert len(df) == 3
+    assert isinstance(df['구분'].dtype, pd.CategoricalDtype)
+
+# ----------------- save_changes / apply_changes -----------------
+
+def new_row(text, amount=1000):
+    row = ledger([['2024-01-04', '10:00', '지출', '식비', '카페', text, amount, '카드', '', 1]])
+    return assign_tx_ids(normalize_frame(row))
+
+def save(db, df, changes):
+    assert store.save_changes(apply_change_set(df, changes), changes, db_file=db)
+    return store.load_data(db_file=db)
+
+def add(db, df, text):
+    """Adds one row the way the app does (label = max label + 1). Returns (frame after reload, label)."""
+    changes = empty_change_set()
+    label = int(df.index.max()) + 1
+    changes['added'] = new_row(text).set_axis([label])
+    return save(db, df, changes), label
+
+def delete_newest(db):
+    """Deletes the row with the highest id: the next app label no longer matches AUTOINCREMENT."""
+    df = store.load_data(db_file=db)
+    changes = empty_change_set()
+    newest = int(df.index.max())
+    changes['deleted'] = [newest]
+    changes['deleted_ids'] = {newest: df.at[newest, 'Tx_ID']}
+    return save(db, df, changes)
+
+def test_add_keeps_the_frame_label_as_row_id(db):
+    df = delete_newest(db)
+    df, label = add(db, df, '커피')
+    assert df.at[label, '내용'] == '커피'
+
+def test_edit_of_an_added_row_updates_it(db):
+    df = delete_newest(db)
+    before = df
+    changes = empty_change_set()
+    label = int(df.index.max()) + 1
+    changes['added'] = new_row('커피').set_axis([label])
+    store.save_changes(apply_change_set(df, changes), changes, db_file=db)
+    # The session keeps its own frame (labels from the change set) and edits the new row
+    working = apply_change_set(before, changes)
+    edit = working.loc[[label]].copy()
+    edit['금액'] = 4500.0
+    changes = empty_change_set()
+    changes['updated'] = edit
+    df = save(db, working, changes)
+    assert (df['내용'] == '커피').sum() == 1
+    assert df.loc[df['내용'] == '커피', '금액'].iloc[0] == 4500
+
+def test_delete_of_an_added_row_deletes_only_it(db):
+    df = delete_newest(db)
+    working_ids = set(df['Tx_ID'])
+    df, label = add(db, df, '커피')
+    changes = empty_change_set()
+    changes['deleted'] = [label]
+    changes['deleted_ids'] = {label: df.at[label, 'Tx_ID']}
+    df = save(db, df, changes)
+    assert set(df['Tx_ID']) == working_ids
+
+def test_delete_by_tx_id_when_the_label_points_elsewhere(db):
+    df = store.load_data(db_file=db)
+    target = df.index[0]
+    other = df.index[1]
+    changes = empty_change_set()
+    # Stale label (another row owns it now), correct Tx_ID
+    changes['deleted'] = [other]
+    changes['deleted_ids'] = {other: df.at[target, 'Tx_ID']}
+    df_after = save(db, df, changes)
+    assert df.at[target, 'Tx_ID'] not in set(df_after['Tx_ID'])
+    assert df.at[other, 'Tx_ID'] in set(df_after['Tx_ID'])
+
+def test_edit_of_a_missing_row_is_skipped_not_inserted(db):
+    df = store.load_data(db_file=db)
+    ghost = new_row('없는 거래').set_axis([999])
+    changes = empty_change_set()
+    changes['updated'] = ghost
+    assert store.save_changes(df, changes, db_file=db)
+    assert len(store.load_data(db_file=db)) == len(df)
+
+def test_add_sent_twice_is_not_duplicated(db):
+    df = store.load_data(db_file=db)
+    changes = empty_change_set()
+    changes['added'] = new_row('커피').set_axis([int(df.index.max()) + 1])
+    store.save_changes(df, changes, db_file=db)
+    store.save_changes(df, changes, db_file=db)
+    assert (store.load_data(db_file=db)['내용'] == '커피').sum() == 1
+
+# ----------------- missing dates / single-row adds / queries -----------------
+
+def test_rows_without_a_date_are_saved(tmp_path):
+    # The streaming Excel loader keeps blank rows / unparsable dates as NaT
+    df = normalize_frame(ledger(SAMPLE))
+    df.loc[df.index[1], ['날짜', '시간']] = pd.NaT
+    path = str(tmp_path / 'nat.db')
+    assert store.save_data(df, db_file=path)
+    assert len(store.load_data(db_file=path)) == 3
+    assert store.to_db_row({'날짜': pd.NaT, '시간': None, '금액': 1})[:2] == ('', '')
+
+def test_add_row_optimized_assigns_a_free_tx_id(db):
+    row = {'날짜': '2024-01-05', '시간': '08:00', '구분': '지출', '대분류': '식비', '내용': '빵', '금액': 3000}
+    assert store.add_row_optimized(row, db_file=db)
+    assert store.add_row_optimized(row, db_file=db)
+    added = store.load_data(db_file=db).query("내용 == '빵'")
+    assert len(added) == 2
+    assert added['Tx_ID'].notna().all() and added['Tx_ID'].is_unique
+
+def test_query_range_on_a_given_store(db):
+    df = store.query_range(start='2024-01-02', types=['지출', '수입'], db_file=db)
+    assert sorted(df['내용']) == ['월급', '점심']
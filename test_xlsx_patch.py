@@ -0,0 +1,126 @@
+from datetime import datetime, time
+
+import openpyxl
+import pytest
+from openpyxl.styles import PatternFill
+from openpyxl.worksheet.table import Table, TableStyleInfo
+from openpyxl.utils.datetime import CALENDAR_MAC_1904
+
+from xlsx_patch import patch_sheet_rows, patch_row_values, PatchNotSupported
+
+# Round trips of the XLSX part patcher: workbooks written by openpyxl, patched, read back with openpyxl
+
+SHEET = 'T_RawData'
+HEADER = ['날짜', '시간', '구분', '내용', '금액', '메모']
+STRIPES = ('FFEEEEEE', 'FFFFFFFF')
+
+def make_workbook(path, n_rows=4, epoch=None, table=False):
+    wb = openpyxl.Workbook()
+    if epoch is not None:
+        wb.epoch = epoch
+    ws = wb.active
+    ws.title = SHEET
+    ws.append(['가계부 데이터 엔진 (T_RawData)'])
+    ws.append(HEADER)
+    for i in range(n_rows):
+        ws.append([datetime(2024, 1, i + 1), time(9, i), '지출', f'거래 {i}', -1000 * (i + 1), None])
+        for cell in ws[ws.max_row]:
+            cell.fill = PatternFill('solid', fgColor=STRIPES[ws.max_row % 2])
+        ws.cell(ws.max_row, 1).number_format = 'yyyy-mm-dd'
+        ws.cell(ws.max_row, 2).number_format = 'hh:mm'
+    if table:
+        # Like create_formula_engine.py: the header and data rows are the Excel Table T_RawData
+        t = Table(displayName='T_RawData', ref=f'A2:F{ws.max_row}')
+        t.tableStyleInfo = TableStyleInfo(name='TableStyleMedium9', showRowStripes=True)
+        ws.add_table(t)
+    dash = wb.create_sheet('Dashboard')
+    dash['A1'] = '=SUM(T_RawData!E3:E1000)'
+    wb.save(path)
+    return path
+
+def values(path, sheet=SHEET):
+    ws = openpyxl.load_workbook(path)[sheet]
+    return [tuple(c.value for c in row) for row in ws.iter_rows()]
+
+@pytest.fixture
+def workbook(tmp_path):
+    return make_workbook(str(tmp_path / 'ledger.xlsx'))
+
+ROWS = [
+    (datetime(2024, 2, 1, 0, 0), time(8, 30), '수입', '월급 <보너스> & 수당', 3000000, '메모'),
+    (datetime(2024, 2, 2, 0, 0), time(12, 0), '지출', '점심', -12000.5, None),
+]
+
+def test_patch_sheet_rows_round_trip(workbook):
+    patch_sheet_rows(workbook, SHEET, ROWS)
+    rows = values(workbook)
+    assert rows[0][0] == '가계부 데이터 엔진 (T_RawData)'
+    assert list(rows[1]) == HEADER
+    # Fewer rows than before: nothing of the old data is left
+    assert rows[2:] == ROWS
+
+def test_patch_sheet_rows_keeps_stripes_and_other_sheets(workbook):
+    rows = ROWS * 3
+    patch_sheet_rows(workbook, SHEET, rows)
+    wb = openpyxl.load_workbook(workbook)
+    ws = wb[SHEET]
+    assert ws.max_row == 2 + len(rows)
+    for r in range(3, ws.max_row + 1):
+        assert ws.cell(r, 4).fill.fgColor.rgb == STRIPES[r % 2]
+        assert ws.cell(r, 1).number_format == 'yyyy-mm-dd'
+    assert wb['Dashboard']['A1'].value == '=SUM(T_RawData!E3:E1000)'
+    assert wb.calculation.fullCalcOnLoad
+
+def test_patch_sheet_rows_writes_the_header(workbook):
+    header = HEADER + ['Flow_Filter']
+    patch_sheet_rows(workbook, SHEET, [r + (1,) for r in ROWS], header=header)
+    rows = values(workbook)
+    assert list(rows[1]) == header
+    assert [r[-1] for r in rows[2:]] == [1, 1]
+
+def test_patch_row_values_replaces_only_the_given_rows(workbook):
+    before = values(workbook)
+    patch_row_values(workbook, SHEET, {4: ROWS[1]})
+    after = values(workbook)
+    assert after[3] == ROWS[1]
+    assert after[:3] == before[:3] and after[4:] == before[4:]
+    assert openpyxl.load_workbook(workbook)[SHEET].cell(4, 4).fill.fgColor.rgb == STRIPES[0]
+
+def test_missing_row_leaves_the_workbook_untouched(workbook):
+    before = values(workbook)
+    with pytest.raises(PatchNotSupported):
+        patch_row_values(workbook, SHEET, {99: ROWS[0]})
+    assert values(workbook) == before
+
+def test_too_few_rows_to_take_styles_from(tmp_path):
+    path = make_workbook(str(tmp_path / 'short.xlsx'), n_rows=1)
+    with pytest.raises(PatchNotSupported):
+        patch_sheet_rows(path, SHEET, ROWS)
+
+def test_1904_date_system(tmp_path):
+    path = make_workbook(str(tmp_path / 'mac.xlsx'), epoch=CALENDAR_MAC_1904)
+    patch_sheet_rows(path, SHEET, ROWS)
+    assert values(path)[2:] == ROWS
+
+def table_refs(path):
+    table = openpyxl.load_workbook(path)[SHEET].tables['T_RawData']
+    return table.ref, table.autoFilter.ref
+
+@pytest.mark.parametrize('n_rows', [1, 2, 6])
+def test_table_is_resized_to_the_new_rows(tmp_path, n_rows):
+    path = make_workbook(str(tmp_path / 'table.xlsx'), table=True)
+    rows = (ROWS * 3)[:n_rows]
+    patch_sheet_rows(path, SHEET, rows)
+    assert values(path)[2:] == rows
+    assert table_refs(path) == (f'A2:F{2 + n_rows}', f'A2:F{2 + n_rows}')
+
+def test_table_keeps_one_data_row_when_emptied(tmp_path):
+    path = make_workbook(str(tmp_path / 'table.xlsx'), table=True)
+    patch_sheet_rows(path, SHEET, [], n_cols=len(HEADER))
+    assert table_refs(path) == ('A2:F3', 'A2:F3')
+
+def test_table_with_a_new_header_is_not_patched(tmp_path):
+    path = make_workbook(str(tmp_path / 'table.xlsx'), table=True)
+    with pytest.raises(PatchNotSupported):
+        patch_sheet_rows(path, SHEET, [r + (1,) for r in ROWS], header=HEADER + ['Flow_Filter'])
+    assert table_refs(path) == ('A2:F6', 'A2:F6')
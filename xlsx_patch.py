@@ -0,0 +1,286 @@
+import os
+import re
+import math
+import numbers
+import tempfile
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+from datetime import datetime, date, time
+from xml.sax.saxutils import escape
+
+import pandas as pd
+from openpyxl.utils import get_column_letter
+
+# Rewrites the rows of ONE worksheet directly inside the XLSX zip.
+# Every other part (Dashboard, month sheets, charts, styles, shared strings) is copied unchanged,
+# so save time depends on the raw data size, not on the whole workbook.
+#
+# Only the changed pieces are touched:
+# - the worksheet part: <sheetData> rows from start_row on + <dimension>
+# - calcChain.xml is dropped (Excel rebuilds it; it lists the replaced formula cells)
+# - workbook.xml <calcPr> gets fullCalcOnLoad="1" so dashboard formulas recalc on open (openpyxl does the same)
+# - table parts on the sheet (T_RawData is an Excel Table): the ref of the table and of its
+#   <autoFilter> / <sortState> end at the new last row
+
+NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+CALC_CHAIN_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/calcChain'
+TABLE_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/table'
+
+ROW_RE = re.compile(rb'<(?:\w+:)?row\b[^>]*?\br="(\d+)"[^>]*?(?:/>|>.*?</(?:\w+:)?row>)', re.S)
+CELL_RE = re.compile(rb'<(?:\w+:)?c\b[^>]*?\br="([A-Z]+)\d+"[^>]*>')
+STYLE_RE = re.compile(rb'\bs="(\d+)"')
+REF_RE = re.compile(rb'(\bref="\$?[A-Z]+\$?)(\d+)(:\$?[A-Z]+\$?)(\d+)(")')
+ILLEGAL_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+class PatchNotSupported(Exception):
+    """The sheet can't be patched safely (caller should fall back to a full openpyxl save)."""
+
+def _sheet_part_name(zf, sheet_name):
+    wb_xml = ET.fromstring(zf.read('xl/workbook.xml'))
+    rid = None
+    for sheet in wb_xml.iter(f'{{{NS_MAIN}}}sheet'):
+        if sheet.get('name') == sheet_name:
+            rid = sheet.get(f'{{{NS_REL}}}id')
+            break
+    if rid is None:
+        raise PatchNotSupported(f"Sheet '{sheet_name}' not found")
+
+    rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    for rel in rels.iter(f'{{{NS_PKG_REL}}}Relationship'):
+        if rel.get('Id') == rid:
+            target = rel.get('Target')
+            if target.startswith('/'):
+                return target.lstrip('/')
+            return posixpath.normpath(posixpath.join('xl', target))
+    raise PatchNotSupported(f"Relationship {rid} not found")
+
+def _table_parts(zf, part):
+    """Part names of the tables on a worksheet (from the worksheet's .rels)."""
+    rels_name = posixpath.join(posixpath.dirname(part), '_rels', posixpath.basename(part) + '.rels')
+    if rels_name not in zf.namelist():
+        return []
+    tables = []
+    for rel in ET.fromstring(zf.read(rels_name)).iter(f'{{{NS_PKG_REL}}}Relationship'):
+        if rel.get('Type') == TABLE_TYPE:
+            target = rel.get('Target')
+            tables.append(target.lstrip('/') if target.startswith('/')
+                          else posixpath.normpath(posixpath.join(posixpath.dirname(part), target)))
+    return tables
+
+def _resize_table_xml(table_xml, start_row, last_row):
+    """Ends the table's ref (and its autoFilter / sortState refs) at last_row; the header row stays."""
+    m = re.search(rb'<(?:\w+:)?table\b[^>]*>', table_xml)
+    ref = REF_RE.search(m.group(0)) if m else None
+    if ref is None:
+        raise PatchNotSupported("Table part without a ref")
+    if re.search(rb'\btotalsRowCount="[1-9]', m.group(0)):
+        raise PatchNotSupported("Table has a totals row")
+    header_row = int(ref.group(2))
+    if header_row >= start_row:
+        raise PatchNotSupported("Table header inside the rewritten rows")
+    # A table keeps at least one (empty) data row
+    end = str(max(last_row, header_row + 1)).encode()
+
+    def resize(tag):
+        return REF_RE.sub(lambda r: r.group(1) + r.group(2) + r.group(3) + end + r.group(5), tag.group(0), count=1)
+    table_xml = table_xml[:m.start()] + resize(m) + table_xml[m.end():]
+    return re.sub(rb'<(?:\w+:)?(?:autoFilter|sortState)\b[^>]*>', resize, table_xml)
+
+def _resized_tables(zf, part, start_row, last_row, header):
+    """{table part: new xml} for the tables on the worksheet."""
+    tables = _table_parts(zf, part)
+    if tables and header is not None:
+        # The table's columns (names, count) would have to change with the header
+        raise PatchNotSupported("Table columns changed")
+    return {t: _resize_table_xml(zf.read(t), start_row, last_row) for t in tables}
+
+def _uses_1904_dates(zf):
+    return re.search(rb'<(?:\w+:)?workbookPr\b[^>]*\bdate1904="(1|true)"', zf.read('xl/workbook.xml')) is not None
+
+def _row_styles(row_xml):
+    """{column letter: style id} of one existing <row>."""
+    styles = {}
+    for m in CELL_RE.finditer(row_xml):
+        col = m.group(1).decode()
+        s = STYLE_RE.search(m.group(0))
+        styles[col] = s.group(1).decode() if s else None
+    return styles
+
+def _cell_xml(ref, value, style, epoch):
+    s = f' s="{style}"' if style is not None else ''
+    if value is None or value is pd.NaT or (isinstance(value, numbers.Real) and math.isnan(value)):
+        return f'<c r="{ref}"{s}/>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}"{s} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Integral):
+        return f'<c r="{ref}"{s}><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Real):
+        return f'<c r="{ref}"{s}><v>{float(value)!r}</v></c>'
+    if isinstance(value, datetime):
+        serial = (value - epoch).total_seconds() / 86400
+        return f'<c r="{ref}"{s}><v>{serial!r}</v></c>'
+    if isinstance(value, date):
+        return f'<c r="{ref}"{s}><v>{(value - epoch.date()).days}</v></c>'
+    if isinstance(value, time):
+        fraction = (value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6) / 86400
+        return f'<c r="{ref}"{s}><v>{fraction!r}</v></c>'
+    text = escape(ILLEGAL_XML_CHARS.sub('', str(value)))
+    return f'<c r="{ref}"{s} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+def _rows_xml(rows, start_row, n_cols, styles_odd, styles_even, epoch):
+    letters = [get_column_letter(i) for i in range(1, n_cols + 1)]
+    odd = [styles_odd.get(l) for l in letters]
+    even = [styles_even.get(l) for l in letters]
+    parts = []
+    for r, row in enumerate(rows, start_row):
+        styles = even if r % 2 == 0 else odd
+        cells = ''.join(_cell_xml(f'{letters[c]}{r}', v, styles[c], epoch) for c, v in enumerate(row))
+        parts.append(f'<row r="{r}">{cells}</row>')
+    return ''.join(parts).encode('utf-8')
+
+def _patch_sheet_xml(sheet_xml, rows, start_row, n_cols, epoch):
+    m_open = re.search(rb'<(\w+:)?sheetData\b[^>]*?(/?)>', sheet_xml)
+    if not m_open:
+        raise PatchNotSupported("No <sheetData> in worksheet")
+    if m_open.group(1):
+        # Generated rows are written without a namespace prefix
+        raise PatchNotSupported("Prefixed SpreadsheetML namespace")
+
+    if m_open.group(2) == b'/':
+        body, close_end = b'', m_open.end()
+    else:
+        close = re.compile(rb'</(?:\w+:)?sheetData>').search(sheet_xml, m_open.end())
+        body, close_end = sheet_xml[m_open.end():close.start()], close.end()
+
+    # Keep rows above the data (title / header), take the stripe styles from the first two data rows
+    kept, template_odd, template_even = [], None, None
+    for m in ROW_RE.finditer(body):
+        r = int(m.group(1))
+        if r < start_row:
+            kept.append(m.group(0))
+        elif r % 2 == 1 and template_odd is None:
+            template_odd = _row_styles(m.group(0))
+        elif r % 2 == 0 and template_even is None:
+            template_even = _row_styles(m.group(0))
+        if template_odd is not None and template_even is not None:
+            break
+    if template_odd is None or template_even is None:
+        raise PatchNotSupported("Not enough existing data rows to take styles from")
+
+    new_body = b''.join(kept) + _rows_xml(rows, start_row, n_cols, template_odd, template_even, epoch)
+    sheet_data = b'<sheetData>' + new_body + b'</sheetData>'
+    out = sheet_xml[:m_open.start()] + sheet_data + sheet_xml[close_end:]
+
+    last_row = max(start_row + len(rows) - 1, start_row - 1)
+    dim = f'A1:{get_column_letter(max(n_cols, 1))}{last_row}'.encode()
+    out = re.sub(rb'(<(?:\w+:)?dimension\b[^>]*?\bref=")[^"]*(")', lambda m: m.group(1) + dim + m.group(2), out, count=1)
+    return out
+
+def _drop_calc_chain(name, data):
+    """Removes calcChain references from [Content_Types].xml / workbook.xml.rels."""
+    if name == '[Content_Types].xml':
+        return re.sub(rb'<Override\b[^>]*PartName="/xl/calcChain\.xml"[^>]*/>', b'', data)
+    if name == 'xl/_rels/workbook.xml.rels':
+        return re.sub(rb'<Relationship\b[^>]*Type="' + re.escape(CALC_CHAIN_TYPE.encode()) + rb'"[^>]*/>', b'', data)
+    return data
+
+def _force_full_calc(data):
+    m = re.search(rb'<((?:\w+:)?)calcPr\b([^>]*?)(/?)>', data)
+    if m:
+        if b'fullCalcOnLoad' in m.group(2):
+            attrs = re.sub(rb'fullCalcOnLoad="[^"]*"', b'fullCalcOnLoad="1"', m.group(2))
+        else:
+            attrs = m.group(2) + b' fullCalcOnLoad="1"'
+        return data[:m.start()] + b'<' + m.group(1) + b'calcPr' + attrs + m.group(3) + b'>' + data[m.end():]
+    # No calcPr yet: it follows definedNames / externalReferences / functionGroups / sheets (schema order)
+    for anchor in (rb'</(?:\w+:)?definedNames>', rb'</(?:\w+:)?externalReferences>', rb'</(?:\w+:)?functionGroups>', rb'</(?:\w+:)?sheets>'):
+        m = re.search(anchor, data)
+        if m:
+            prefix = re.match(rb'</(\w+:)?', m.group(0)).group(1) or b''
+            return data[:m.end()] + b'<' + prefix + b'calcPr fullCalcOnLoad="1"/>' + data[m.end():]
+    return data
+
+def _replace_rows_xml(sheet_xml, rows_by_number, n_cols, epoch):
+    """Replaces individual existing <row> elements, each keeping its own cell styles."""
+    if re.search(rb'<\w+:sheetData\b', sheet_xml):
+        raise PatchNotSupported("Prefixed SpreadsheetML namespace")
+    letters = [get_column_letter(i) for i in range(1, n_cols + 1)]
+    parts, last, found = [], 0, 0
+    for m in ROW_RE.finditer(sheet_xml):
+        r = int(m.group(1))
+        if r not in rows_by_number:
+            continue
+        styles = _row_styles(m.group(0))
+        cells = ''.join(_cell_xml(f'{letters[c]}{r}', v, styles.get(letters[c]), epoch)
+                        for c, v in enumerate(rows_by_number[r]))
+        parts += [sheet_xml[last:m.start()], f'<row r="{r}">{cells}</row>'.encode('utf-8')]
+        last = m.end()
+        found += 1
+    if found != len(rows_by_number):
+        raise PatchNotSupported("Row to update not found in the sheet")
+    return b''.join(parts) + sheet_xml[last:]
+
+def _rewrite_package(path, zin, replaced):
+    """Writes a copy of the package with the parts in replaced ({part name: data}) to a temp file (caller swaps it in)."""
+    fd, tmp_path = tempfile.mkstemp(suffix='.xlsx', dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zout:
+            for info in zin.infolist():
+                if info.filename == 'xl/calcChain.xml':
+                    continue
+                if info.filename in replaced:
+                    data = replaced[info.filename]
+                else:
+                    data = _drop_calc_chain(info.filename, zin.read(info.filename))
+                    if info.filename == 'xl/workbook.xml':
+                        data = _force_full_calc(data)
+                zout.writestr(info, data, compress_type=zipfile.ZIP_DEFLATED)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
+
+def patch_sheet_rows(path, sheet_name, rows, start_row=3, n_cols=None, header=None):
+    """
+    Replaces the rows from start_row on in sheet_name with rows (list of tuples, plain Python values).
+    header: column names to write into the row above start_row as well (e.g. after a column was added).
+    Writes to a temp file and swaps it in, so a failed save never truncates the workbook.
+    Raises PatchNotSupported if the sheet layout can't be patched safely.
+    """
+    if n_cols is None:
+        n_cols = max((len(r) for r in rows), default=0)
+
+    with zipfile.ZipFile(path) as zin:
+        part = _sheet_part_name(zin, sheet_name)
+        epoch = datetime(1904, 1, 1) if _uses_1904_dates(zin) else datetime(1899, 12, 30)
+        new_sheet_xml = _patch_sheet_xml(zin.read(part), rows, start_row, n_cols, epoch)
+        if header is not None:
+            new_sheet_xml = _replace_rows_xml(new_sheet_xml, {start_row - 1: tuple(header)}, len(header), epoch)
+        replaced = _resized_tables(zin, part, start_row, start_row + len(rows) - 1, header)
+        replaced[part] = new_sheet_xml
+        tmp_path = _rewrite_package(path, zin, replaced)
+
+    os.replace(tmp_path, path)
+    return True
+
+def patch_row_values(path, sheet_name, rows_by_number, n_cols=None):
+    """
+    Overwrites single rows in place ({sheet row number: tuple of values}), e.g. edited transactions.
+    Row order, the other rows and all other parts stay as they are.
+    Raises PatchNotSupported if a row doesn't exist or the sheet can't be patched safely.
+    """
+    if n_cols is None:
+        n_cols = max((len(r) for r in rows_by_number.values()), default=0)
+
+    with zipfile.ZipFile(path) as zin:
+        part = _sheet_part_name(zin, sheet_name)
+        epoch = datetime(1904, 1, 1) if _uses_1904_dates(zin) else datetime(1899, 12, 30)
+        new_sheet_xml = _replace_rows_xml(zin.read(part), rows_by_number, n_cols, epoch)
+        tmp_path = _rewrite_package(path, zin, {part: new_sheet_xml})
+
+    os.replace(tmp_path, path)
+    return True